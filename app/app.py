@@ -1,7 +1,16 @@
 import os
+import hmac
+import time
 import requests
 import logging
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from catalog_cache import CatalogCache
+import compression
+import http_client
+import instrumentation
+from fanout import fan_out_settled
+from health import BackendHealth
+from singleflight import SingleFlight
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -9,50 +18,280 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
+# gzip/brotli negociado para las respuestas JSON de /api/*
+compression.init_app(app)
+# X-Request-Id, una línea JSON por petición y /metrics
+instrumentation.init_app(app)
 
 # La URL del API Gateway se inyecta como variable de entorno desde Terraform
 API_GATEWAY_URL = os.environ.get('API_GATEWAY_URL', '')
 
-def make_api_request(method, endpoint, data=None, timeout=30):
-    """
-    Helper function para hacer peticiones al API Gateway
-    """
+# Paginación del catálogo
+PRODUCTS_PAGE_SIZE = int(os.environ.get('PRODUCTS_PAGE_SIZE', '100'))
+# Columnas que realmente pinta index.html
+INDEX_FIELDS = 'id,name,price,stock'
+# Resultados de búsqueda por página
+SEARCH_LIMIT = int(os.environ.get('SEARCH_LIMIT', '20'))
+# Filtros y orden que /products resuelve en SQL
+PRODUCT_FILTERS = ('category', 'min_price', 'max_price', 'in_stock', 'sort')
+# Productos por llamada a /api/products/batch (un GET /item concurrente por id)
+BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', '50'))
+
+# Readiness: ping al backend como mucho cada HEALTH_PING_INTERVAL segundos
+backend_health = BackendHealth(
+    ping=lambda: make_api_request('GET', '/ping', timeout=5),
+    interval=float(os.environ.get('HEALTH_PING_INTERVAL', '15'))
+)
+
+# Caché read-through del catálogo (CATALOG_CACHE_TTL=0 la desactiva)
+catalog_cache = CatalogCache(
+    ttl=float(os.environ.get('CATALOG_CACHE_TTL', '30')),
+    stale_ttl=float(os.environ.get('CATALOG_CACHE_STALE_TTL', '300')),
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '256')),
+    # Fichero común a los workers para la invalidación del flujo de cambios (gunicorn.conf.py lo crea)
+    shared_path=os.environ.get('CATALOG_CACHE_SHARED_FILE') or None
+)
+# Token de POST /api/cache/invalidate (scripts/cdc_consumer.py); sin él el endpoint no existe
+CACHE_INVALIDATION_TOKEN = os.environ.get('CACHE_INVALIDATION_TOKEN', '')
+
+# Precalentamiento de cada worker de gunicorn (ver warm_up); acotado para no
+# superar el GUNICORN_TIMEOUT con el backend caído
+STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', 'true').lower() in ('true', '1', 'yes')
+STARTUP_WARMUP_TIMEOUT = float(os.environ.get('STARTUP_WARMUP_TIMEOUT', '10'))
+
+# GET idénticos concurrentes comparten una única llamada al API Gateway (API_SINGLEFLIGHT=false la desactiva)
+inflight = SingleFlight(enabled=os.environ.get('API_SINGLEFLIGHT', 'true').lower() in ('true', '1', 'yes'))
+
+class ApiError(Exception):
+    """Respuesta de error del API Gateway, con su código y el cuerpo JSON devuelto"""
+    def __init__(self, message, status_code, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+def api_url(endpoint):
+    """URL completa de un endpoint del API Gateway"""
     if not API_GATEWAY_URL:
         raise Exception("API_GATEWAY_URL no configurada")
+    return f"{API_GATEWAY_URL.rstrip('/')}/{endpoint.lstrip('/')}"
+
+def make_api_request(method, endpoint, data=None, timeout=None, params=None):
+    """
+    Helper function para hacer peticiones al API Gateway.
+    Usa la sesión keep-alive del worker; ``timeout`` sustituye al timeout de lectura.
+    Los GET se revalidan con If-None-Match cuando hay un ETag guardado, y los
+    GET idénticos en vuelo a la vez se agrupan en una sola llamada.
+    """
+    url = api_url(endpoint)
     
-    url = f"{API_GATEWAY_URL.rstrip('/')}/{endpoint.lstrip('/')}"
-    
-    try:
+    # Tiempo que la petición pasa esperando al backend (incluida la espera a una llamada agrupada)
+    with instrumentation.span('upstream'):
         if method.upper() == 'GET':
-            response = requests.get(url, timeout=timeout)
-        elif method.upper() == 'POST':
-            response = requests.post(url, json=data, timeout=timeout)
-        else:
-            raise Exception(f"Método HTTP no soportado: {method}")
+            return inflight.do(
+                http_client.validator_key(url, params),
+                lambda: send_api_request(method, endpoint, data, timeout, params)
+            )
+        return send_api_request(method, endpoint, data, timeout, params)
+
+def send_api_request(method, endpoint, data=None, timeout=None, params=None):
+    """
+    Una llamada real al API Gateway (sin agrupar), medida por endpoint y con
+    el X-Request-Id de la petición en curso.
+    """
+    url = api_url(endpoint)
+    session = http_client.get_session()
+    timeout = http_client.default_timeout(timeout)
+    headers = instrumentation.propagation_headers()
+    
+    with instrumentation.upstream_call('/' + endpoint.strip('/'), method) as call:
+        try:
+            if method.upper() == 'GET':
+                # Revalidación: con el ETag guardado, un catálogo sin cambios responde 304 sin cuerpo
+                key = http_client.validator_key(url, params)
+                cached = http_client.get_validator(key)
+                if cached:
+                    headers['If-None-Match'] = cached[0]
+                response = session.get(url, params=params, timeout=timeout, headers=headers)
+                call['status'] = response.status_code
+                if response.status_code == 304 and cached:
+                    http_client.count_not_modified()
+                    return cached[1]
+                if response.status_code == 304:
+                    # 304 sin copia propia (validador sustituido por otra petición o
+                    # un intermediario que revalidó por su cuenta): se pide el cuerpo completo
+                    headers.pop('If-None-Match', None)
+                    headers['Cache-Control'] = 'no-cache'
+                    response = session.get(url, params=params, timeout=timeout, headers=headers)
+                    call['status'] = response.status_code
+                    if response.status_code == 304:
+                        raise Exception("Respuesta 304 del API sin copia en caché")
+            elif method.upper() == 'POST':
+                response = session.post(url, json=data, timeout=timeout, headers=headers)
+                call['status'] = response.status_code
+            else:
+                raise Exception(f"Método HTTP no soportado: {method}")
         
-        response.raise_for_status()
-        return response.json()
+            response.raise_for_status()
+            result = response.json()
+            if method.upper() == 'GET' and response.headers.get('ETag'):
+                http_client.store_validator(key, response.headers['ETag'], result)
+            return result
         
-    except requests.exceptions.Timeout:
-        raise Exception("Timeout al conectar con el API")
-    except requests.exceptions.ConnectionError:
-        raise Exception("Error de conexión con el API")
-    except requests.exceptions.HTTPError as e:
-        try:
-            error_data = e.response.json()
-            raise Exception(error_data.get('error', f'Error HTTP {e.response.status_code}'))
-        except:
-            raise Exception(f'Error HTTP {e.response.status_code}')
-    except Exception as e:
-        raise Exception(f"Error inesperado: {str(e)}")
+        except requests.exceptions.Timeout:
+            raise Exception("Timeout al conectar con el API")
+        except requests.exceptions.ConnectionError:
+            raise Exception("Error de conexión con el API")
+        except requests.exceptions.HTTPError as e:
+            try:
+                error_data = e.response.json()
+            except ValueError:
+                error_data = {}
+            raise ApiError(
+                error_data.get('error', f'Error HTTP {e.response.status_code}'),
+                e.response.status_code,
+                error_data
+            )
+        except Exception as e:
+            raise Exception(f"Error inesperado: {str(e)}")
+
+def product_filters(args):
+    """Filtros de catálogo presentes (y no vacíos) en los argumentos de la petición"""
+    return {name: args[name] for name in PRODUCT_FILTERS if args.get(name)}
+
+def fetch_products_page(limit=PRODUCTS_PAGE_SIZE, after=None, fields=None, filters=None, compact=False,
+                        timeout=None):
+    """
+    Obtiene una página del catálogo usando la paginación por keyset de /products.
+    ``filters`` (category, min_price, max_price, in_stock, sort) se aplican en SQL.
+    Devuelve {'products': [...], 'next_cursor': ...}, o con ``compact``
+    {'fields': [...], 'rows': [[...]], 'next_cursor': ...} (precio en céntimos).
+    """
+    filters = filters or {}
+    params = {'limit': limit, **filters}
+    if after:
+        params['after'] = after
+    if fields:
+        params['fields'] = fields
+    if compact:
+        params['format'] = 'compact'
+    return catalog_cache.get(
+        ('products', limit, after, fields, tuple(sorted(filters.items())), compact),
+        lambda: make_api_request('GET', '/products', params=params, timeout=timeout)
+    )
+
+def fetch_all_products(fields=None, filters=None, compact=False):
+    """Recorre todas las páginas del catálogo"""
+    products = []
+    after = None
+    while True:
+        page = fetch_products_page(after=after, fields=fields, filters=filters, compact=compact)
+        products.extend(page['rows'] if compact else page['products'])
+        after = page.get('next_cursor')
+        if not after:
+            return {'fields': page['fields'], 'rows': products} if compact else products
+
+def fetch_product(product_id):
+    """Detalle de un producto (cacheado)"""
+    return catalog_cache.get(
+        ('product', product_id),
+        lambda: make_api_request('GET', '/item', params={'id': product_id})
+    )
+
+def fetch_with_product(load_listing, product_id=None):
+    """
+    Carga el listado y, si se pide, el detalle de un producto a la vez.
+    Devuelve (listado, producto); si el detalle falla se muestra el listado igualmente.
+    """
+    if not product_id:
+        return load_listing(), None
+
+    (listing, listing_error), (product, product_error) = fan_out_settled(
+        load_listing,
+        lambda: fetch_product(product_id)
+    )
+    if listing_error:
+        raise listing_error
+    if product_error:
+        logger.warning(f"Detalle del producto {product_id} no disponible: {str(product_error)}")
+        flash(f"Producto {product_id} no disponible", "warning")
+    return listing, product
+
+def search_products(query, limit=SEARCH_LIMIT):
+    """Búsqueda por relevancia vía GET /search (cacheada por texto y límite)"""
+    query = ' '.join(query.split())
+    return catalog_cache.get(
+        ('search', query.lower(), limit),
+        lambda: make_api_request('GET', '/search', params={'q': query, 'limit': limit})
+    )
+
+def fetch_stats(category=None, low_stock_limit=None):
+    """Agregados del catálogo vía GET /stats (vistas materializadas, cacheados como el listado)"""
+    params = {name: value for name, value in (('category', category), ('low_stock_limit', low_stock_limit))
+              if value is not None}
+    return catalog_cache.get(
+        ('stats', category, low_stock_limit),
+        lambda: make_api_request('GET', '/stats', params=params)
+    )
+
+def invalidate_catalog(*product_ids, broadcast=False):
+    """
+    Invalida los listados, las búsquedas y el detalle de los productos indicados.
+    Con ``broadcast`` el resto de workers vacían también su caché.
+    """
+    product_ids = set(product_ids)
+    removed = catalog_cache.invalidate(
+        lambda key: key[0] in ('products', 'search') or (key[0] == 'product' and key[1] in product_ids),
+        broadcast=broadcast
+    )
+    logger.info(f"Caché del catálogo invalidada ({removed} entradas)")
+    return removed
+
+def warm_up():
+    """
+    Prepara el worker antes de que acepte peticiones (hook post_worker_init
+    de gunicorn.conf.py): el ping y la primera página de la portada se piden
+    en paralelo, lo que abre las primeras conexiones keep-alive del pool
+    hacia el API Gateway y deja cacheados la readiness y el listado, y
+    mientras tanto se compilan las plantillas Jinja.
+    Un fallo sólo se registra: el worker arranca igual y cargará bajo demanda.
+    """
+    if not API_GATEWAY_URL or not STARTUP_WARMUP:
+        return
+    start = time.perf_counter()
+    (health, _), (_, page_error), _ = fan_out_settled(
+        backend_health.status,
+        lambda: fetch_products_page(fields=INDEX_FIELDS, filters={}, timeout=STARTUP_WARMUP_TIMEOUT),
+        lambda: [app.jinja_env.get_template(name) for name in app.jinja_env.list_templates()]
+    )
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    if page_error:
+        logger.warning(f"Warm-up del worker {os.getpid()} sin catálogo ({elapsed_ms} ms): {str(page_error)}")
+    else:
+        logger.info(f"Worker {os.getpid()} precalentado en {elapsed_ms} ms (backend {health['status']})")
 
 @app.route('/')
 def index():
     """Página principal del e-commerce"""
     products = []
+    next_cursor = None
+    detail = None
+    filters = product_filters(request.args)
+    query = request.args.get('q', '').strip()
+    product_id = request.args.get('product', type=int)
     try:
-        if API_GATEWAY_URL:
-            products = make_api_request('GET', '/products')
+        if API_GATEWAY_URL and query:
+            results, detail = fetch_with_product(lambda: search_products(query), product_id)
+            products = results['results']
+            logger.info(f"Búsqueda '{query}': {len(products)} resultados")
+        elif API_GATEWAY_URL:
+            # Los argumentos se leen aquí: el fan-out corre fuera del contexto de la petición
+            after = request.args.get('after')
+            page, detail = fetch_with_product(
+                lambda: fetch_products_page(after=after, fields=INDEX_FIELDS, filters=filters),
+                product_id
+            )
+            products = page['products']
+            next_cursor = page.get('next_cursor')
             logger.info(f"Cargados {len(products)} productos exitosamente")
         else:
             flash("API Gateway no configurado", "warning")
@@ -62,7 +301,8 @@ def index():
         logger.error(error_msg)
         flash(error_msg, "danger")
     
-    return render_template('index.html', products=products)
+    return render_template('index.html', products=products, next_cursor=next_cursor, filters=filters,
+                           query=query, detail=detail)
 
 @app.route('/add', methods=['POST'])
 def add_product():
@@ -89,6 +329,8 @@ def add_product():
         # Llamar al API
         result = make_api_request('POST', '/add', product_data)
         
+        invalidate_catalog()
+        
         success_msg = result.get('message', 'Producto añadido exitosamente')
         flash(success_msg, "success")
         logger.info(f"Producto añadido: {name}")
@@ -121,6 +363,7 @@ def buy_product():
         
         # Llamar al API (endpoint /item con POST para compras)
         result = make_api_request('POST', '/item', buy_data)
+        invalidate_catalog(int(product_id))
         
         success_msg = result.get('message', 'Compra exitosa')
         flash(success_msg, "success")
@@ -135,39 +378,136 @@ def buy_product():
     
     return redirect(url_for('index'))
 
-@app.route('/health')
-def health_check():
-    """Health check endpoint para Cloud Run"""
+def parse_checkout_form(form):
+    """
+    Convierte los campos qty_<product_id> del formulario del catálogo en
+    líneas de pedido, ignorando las cantidades vacías o a cero
+    """
+    lines = []
+    for key, value in form.items():
+        if key.startswith('qty_') and value.strip():
+            quantity = int(value)
+            if quantity > 0:
+                lines.append({"product_id": int(key[len('qty_'):]), "quantity": quantity})
+    return lines
+
+def submit_checkout(lines):
+    """Envía el pedido a /checkout e invalida la caché de los productos afectados"""
+    result = make_api_request('POST', '/checkout', {"lines": lines})
+    invalidate_catalog(*(line['product_id'] for line in lines))
+    return result
+
+@app.route('/checkout', methods=['POST'])
+def checkout():
+    """Comprar varios productos a la vez desde el formulario del catálogo"""
     try:
-        # Verificar conectividad con API Gateway
-        api_status = "unknown"
-        if API_GATEWAY_URL:
-            try:
-                make_api_request('GET', '/products')
-                api_status = "healthy"
-            except:
-                api_status = "unhealthy"
+        lines = parse_checkout_form(request.form)
         
-        return jsonify({
-            'status': 'healthy',
-            'service': 'DP-3 E-commerce Frontend',
-            'api_gateway_status': api_status,
-            'api_gateway_url': API_GATEWAY_URL if API_GATEWAY_URL else 'not_configured'
-        }), 200
+        if not lines:
+            flash("Indica la cantidad de al menos un producto", "warning")
+            return redirect(url_for('index'))
         
+        result = submit_checkout(lines)
+        
+        flash(result.get('message', 'Pedido procesado'), "success")
+        logger.info(f"Pedido procesado: {len(lines)} líneas")
+        
+    except ValueError:
+        flash("Cantidades de pedido inválidas", "danger")
+    except ApiError as e:
+        # Detalle por línea devuelto por la Lambda (stock insuficiente, no encontrado)
+        details = [
+            f"{line.get('name', line['product_id'])}: disponible {line['available']}"
+            if line['status'] == 'insufficient_stock'
+            else f"{line['product_id']}: no encontrado"
+            for line in e.payload.get('lines', [])
+            if line['status'] in ('insufficient_stock', 'not_found')
+        ]
+        error_msg = f"Error en el pedido: {str(e)}" + (f" ({'; '.join(details)})" if details else "")
+        logger.error(error_msg)
+        flash(error_msg, "danger")
+    except Exception as e:
+        error_msg = f"Error en el pedido: {str(e)}"
+        logger.error(error_msg)
+        flash(error_msg, "danger")
+    
+    return redirect(url_for('index'))
+
+@app.route('/api/checkout', methods=['POST'])
+def api_checkout():
+    """API endpoint para pedidos de varias líneas: {"lines": [{"product_id", "quantity"}]}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = submit_checkout(data.get('lines', []))
+        return jsonify(result)
+    except ApiError as e:
+        return jsonify(e.payload or {'error': str(e)}), e.status_code
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error(f"API checkout error: {str(e)}")
         return jsonify({
-            'status': 'unhealthy',
             'error': str(e)
         }), 500
 
+@app.route('/health')
+@app.route('/health/live')
+def health_check():
+    """
+    Liveness para Docker HEALTHCHECK y Cloud Run: no hace ninguna I/O.
+    El estado del API Gateway es el último resultado cacheado de /health/ready.
+    """
+    return jsonify({
+        'status': 'healthy',
+        'service': 'DP-3 E-commerce Frontend',
+        'api_gateway_status': backend_health.last_status() if API_GATEWAY_URL else 'unknown',
+        'api_gateway_url': API_GATEWAY_URL if API_GATEWAY_URL else 'not_configured'
+    }), 200
+
+@app.route('/health/ready')
+def readiness_check():
+    """Readiness: resultado cacheado del ping al backend (GET /ping -> SELECT 1)"""
+    if not API_GATEWAY_URL:
+        return jsonify({
+            'status': 'unhealthy',
+            'error': 'API_GATEWAY_URL no configurada'
+        }), 503
+    
+    result = backend_health.status()
+    return jsonify(result), 200 if result['status'] == 'healthy' else 503
+
 @app.route('/api/products')
 def api_products():
-    """API endpoint para obtener productos (para uso programático)"""
+    """
+    API endpoint para obtener productos (para uso programático).
+    Con ?limit= o ?after= devuelve una sola página con su next_cursor;
+    sin ellos recorre todas las páginas y devuelve la lista completa.
+    category, min_price, max_price, in_stock y sort se pasan tal cual a /products.
+    Con ?format=compact se devuelve el formato columnar de la Lambda.
+    """
     try:
-        products = make_api_request('GET', '/products')
+        fields = request.args.get('fields')
+        filters = product_filters(request.args)
+        fmt = request.args.get('format', 'json')
+        if fmt not in ('json', 'compact'):
+            return jsonify({'error': 'format debe ser json o compact'}), 400
+        compact = fmt == 'compact'
+        if 'limit' in request.args or 'after' in request.args:
+            page = fetch_products_page(
+                limit=request.args.get('limit', PRODUCTS_PAGE_SIZE, type=int),
+                after=request.args.get('after'),
+                fields=fields,
+                filters=filters,
+                compact=compact
+            )
+            return jsonify(page)
+
+        products = fetch_all_products(fields=fields, filters=filters, compact=compact)
         return jsonify(products)
+    except ApiError as e:
+        # Filtros inválidos: se devuelve el 400 de la Lambda tal cual
+        if e.status_code < 500:
+            return jsonify(e.payload or {'error': str(e)}), e.status_code
+        logger.error(f"API products error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
     except Exception as e:
         logger.error(f"API products error: {str(e)}")
         return jsonify({
@@ -178,9 +518,8 @@ def api_products():
 def api_product_detail(product_id):
     """API endpoint para obtener un producto específico"""
     try:
-        # Hacer petición GET al endpoint /item con query parameter
-        url = f"/item?id={product_id}"
-        product = make_api_request('GET', url)
+        # GET /item?id= a través de la caché
+        product = fetch_product(product_id)
         return jsonify(product)
     except Exception as e:
         logger.error(f"API product detail error: {str(e)}")
@@ -188,6 +527,118 @@ def api_product_detail(product_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/products/batch')
+def api_products_batch():
+    """
+    Detalle de varios productos: ?ids=1,2,3. Los GET /item se lanzan a la vez,
+    así que la latencia es la del más lento y no la suma.
+    """
+    try:
+        ids = list(dict.fromkeys(int(i) for i in request.args.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        return jsonify({'error': 'ids debe ser una lista de enteros separados por comas'}), 400
+    if not ids:
+        return jsonify({'error': 'El parámetro ids es obligatorio'}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'Máximo {BATCH_MAX_IDS} ids por petición'}), 400
+
+    products = []
+    missing = []
+    for product_id, (product, error) in zip(ids, fan_out_settled(*[
+        (lambda product_id=product_id: fetch_product(product_id)) for product_id in ids
+    ])):
+        if error is None:
+            products.append(product)
+        elif isinstance(error, ApiError) and error.status_code == 404:
+            missing.append(product_id)
+        else:
+            logger.error(f"API products batch error: {str(error)}")
+            return jsonify({'error': str(error)}), 500
+    return jsonify({'products': products, 'missing': missing})
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint de búsqueda: ?q=texto&limit=N, resultados ordenados por relevancia"""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'El parámetro q es obligatorio'}), 400
+    try:
+        return jsonify(search_products(query, request.args.get('limit', SEARCH_LIMIT, type=int)))
+    except ApiError as e:
+        if e.status_code < 500:
+            return jsonify(e.payload or {'error': str(e)}), e.status_code
+        logger.error(f"API search error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        logger.error(f"API search error: {str(e)}")
+        return jsonify({
+            'error': str(e)
+        }), 500
+
+@app.route('/api/stats')
+def api_stats():
+    """
+    Estadísticas del catálogo para dashboards: por categoría y en total
+    (productos, stock, tramos de stock y precio) y productos con stock bajo.
+    ?category= y ?low_stock_limit= se pasan tal cual a /stats. Se calculan
+    en vistas materializadas, así que no recorren la tabla de productos.
+    """
+    try:
+        return jsonify(fetch_stats(request.args.get('category') or None,
+                                   request.args.get('low_stock_limit', type=int)))
+    except ApiError as e:
+        if e.status_code < 500:
+            return jsonify(e.payload or {'error': str(e)}), e.status_code
+        logger.error(f"API stats error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        logger.error(f"API stats error: {str(e)}")
+        return jsonify({
+            'error': str(e)
+        }), 500
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Métricas de la caché del catálogo (ratio de aciertos, latencia de refresco)"""
+    return jsonify(catalog_cache.stats())
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def api_cache_invalidate():
+    """
+    Invalidación desde el flujo de cambios de productos (scripts/cdc_consumer.py):
+    {"product_ids": [...]} invalida listados, búsquedas y esos detalles;
+    {"all": true} vacía la caché. Requiere la cabecera X-Invalidation-Token.
+    A diferencia de la de /add y /buy llega a todos los workers: el que recibe
+    la petición invalida esas claves y el resto vacía su caché (CATALOG_CACHE_SHARED_FILE).
+    """
+    if not CACHE_INVALIDATION_TOKEN:
+        return jsonify({'error': 'Invalidación deshabilitada'}), 404
+    token = request.headers.get('X-Invalidation-Token', '').encode('utf-8')
+    if not hmac.compare_digest(token, CACHE_INVALIDATION_TOKEN.encode('utf-8')):
+        return jsonify({'error': 'Token de invalidación inválido'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get('all'):
+        removed = catalog_cache.invalidate(broadcast=True)
+        logger.info(f"Caché del catálogo vaciada por el flujo de cambios ({removed} entradas)")
+        return jsonify({'invalidated': removed})
+
+    try:
+        product_ids = [int(product_id) for product_id in data.get('product_ids', [])]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'product_ids debe ser una lista de enteros'}), 400
+    return jsonify({'invalidated': invalidate_catalog(*product_ids, broadcast=True)})
+
+@app.route('/api/http/stats')
+def api_http_stats():
+    """Métricas del pool HTTP hacia el API Gateway (reutilización de conexiones)"""
+    return jsonify(http_client.get_stats())
+
+@app.route('/api/singleflight/stats')
+def api_singleflight_stats():
+    """Métricas de agrupación de GET concurrentes (llamadas ahorradas al backend)"""
+    return jsonify(inflight.stats())
+
 @app.errorhandler(404)
 def not_found_error(error):
     """Manejador de errores 404"""
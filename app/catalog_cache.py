@@ -0,0 +1,216 @@
+"""
+Caché read-through en proceso para el catálogo del frontend.
+
+Cada worker de gunicorn tiene su propia instancia: la invalidación explícita
+sólo afecta al worker que procesa /add o /buy, y el resto converge como
+máximo en ``ttl`` segundos. Con ``shared_path`` (un fichero común a los
+workers) ``invalidate(broadcast=True)`` incrementa un contador compartido y
+los demás workers vacían su caché en su siguiente ``get``.
+"""
+
+import os
+import mmap
+import fcntl
+import struct
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SharedGeneration:
+    """
+    Contador de invalidaciones compartido entre procesos: 8 bytes de un
+    fichero mapeado en memoria. Leerlo no hace llamadas al sistema; el
+    incremento se serializa con un lock POSIX sobre el fichero.
+    """
+
+    _format = struct.Struct('=Q')
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < self._format.size:
+            os.ftruncate(self._fd, self._format.size)
+        self._map = mmap.mmap(self._fd, self._format.size)
+
+    def value(self):
+        return self._format.unpack_from(self._map)[0]
+
+    def bump(self):
+        """Incrementa el contador y devuelve el nuevo valor"""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            value = self.value() + 1
+            self._format.pack_into(self._map, 0, value)
+            return value
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+
+class CatalogCache:
+    """
+    Caché LRU acotada con TTL y stale-while-revalidate.
+
+    - Entrada fresca (edad < ttl): se sirve directamente.
+    - Entrada caducada pero dentro de ``stale_ttl``: se sirve la copia vieja
+      y se refresca en un hilo de fondo (un único refresco por clave).
+    - Sin entrada o demasiado vieja: se carga de forma síncrona.
+    """
+
+    def __init__(self, ttl=30, stale_ttl=300, max_entries=256, shared_path=None):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        # Se incrementa en cada invalidate(): un valor cargado antes no se guarda
+        self._generation = 0
+        self._shared = SharedGeneration(shared_path) if shared_path else None
+        self._shared_seen = self._shared.value() if self._shared else 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'discarded_loads': 0,
+            'shared_invalidations': 0,
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'refresh_seconds_total': 0.0,
+            'refresh_seconds_max': 0.0
+        }
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key, loader):
+        """Devuelve el valor cacheado para ``key`` o lo obtiene con ``loader()``"""
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            self._sync_shared()
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry:
+                age = now - entry[1]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                if age < self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, loader, generation), daemon=True
+                        ).start()
+                    return entry[0]
+            self._stats['misses'] += 1
+
+        value = self._load(loader)
+        self._store(key, value, generation)
+        return value
+
+    def _load(self, loader):
+        """Ejecuta el loader midiendo su latencia"""
+        start = time.perf_counter()
+        try:
+            return loader()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats['refreshes'] += 1
+                self._stats['refresh_seconds_total'] += elapsed
+                self._stats['refresh_seconds_max'] = max(self._stats['refresh_seconds_max'], elapsed)
+
+    def _refresh(self, key, loader, generation):
+        """Refresco en segundo plano; si falla se mantiene la copia vieja"""
+        try:
+            self._store(key, self._load(loader), generation)
+        except Exception as e:
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+            logger.warning(f"Refresco de caché fallido para {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, generation):
+        """
+        Guarda ``value`` salvo que haya habido un invalidate() desde
+        ``generation`` (la generación leída antes de llamar al loader): el
+        valor puede ser anterior a la escritura que invalidó la caché.
+        """
+        with self._lock:
+            if generation != self._generation:
+                self._stats['discarded_loads'] += 1
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _sync_shared(self):
+        """Con el lock tomado: vacía la caché si otro worker ha invalidado con broadcast"""
+        if self._shared is None:
+            return
+        shared = self._shared.value()
+        if shared != self._shared_seen:
+            self._shared_seen = shared
+            self._generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._stats['shared_invalidations'] += 1
+            self._entries.clear()
+
+    def invalidate(self, predicate=None, broadcast=False):
+        """
+        Elimina las entradas cuya clave cumple ``predicate`` (todas si es None).
+        Con ``broadcast`` (y ``shared_path``) el resto de workers vacían su
+        caché entera, ya que no conocen ``predicate``.
+        Devuelve el número de entradas eliminadas en este worker.
+        """
+        with self._lock:
+            self._sync_shared()
+            self._generation += 1
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for k in keys:
+                del self._entries[k]
+            self._stats['invalidations'] += len(keys)
+            if broadcast and self._shared is not None:
+                seen = self._shared_seen
+                self._shared_seen = self._shared.bump()
+                if self._shared_seen != seen + 1:
+                    # Otro worker invalidó entre _sync_shared y bump
+                    self._stats['invalidations'] += len(self._entries)
+                    self._stats['shared_invalidations'] += 1
+                    self._entries.clear()
+            return len(keys)
+
+    def stats(self):
+        """Métricas de la caché: ratio de aciertos y latencia de refresco"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        stats['refresh_seconds_avg'] = (
+            round(stats['refresh_seconds_total'] / stats['refreshes'], 4) if stats['refreshes'] else 0.0
+        )
+        stats['refresh_seconds_total'] = round(stats['refresh_seconds_total'], 4)
+        stats['refresh_seconds_max'] = round(stats['refresh_seconds_max'], 4)
+        stats['ttl'] = self.ttl
+        stats['stale_ttl'] = self.stale_ttl
+        stats['max_entries'] = self.max_entries
+        stats['shared'] = self._shared is not None
+        return stats
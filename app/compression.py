@@ -0,0 +1,52 @@
+"""
+Compresión negociada de las respuestas JSON de /api/*.
+
+Un hook ``after_request`` comprime con brotli (si está instalado) o gzip
+según el ``Accept-Encoding`` del cliente. Las respuestas pequeñas, las de
+error y las que ya traen ``Content-Encoding`` se envían tal cual.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def compress(data, encoding):
+    """Comprime ``data`` (bytes) con la codificación indicada"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def init_app(app, prefix='/api/'):
+    """Registra la compresión para las rutas que empiezan por ``prefix``"""
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if (not request.path.startswith(prefix)
+                or response.status_code != 200
+                or response.direct_passthrough
+                or response.mimetype != 'application/json'
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        data = response.get_data()
+        if not encoding or len(data) < MIN_SIZE:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
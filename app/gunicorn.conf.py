@@ -0,0 +1,74 @@
+"""
+Configuración de gunicorn del frontend (``gunicorn -c gunicorn.conf.py app:app``).
+
+Dos modos de servicio, elegidos con GUNICORN_WORKER_CLASS:
+
+- ``gthread`` (por defecto): WEB_CONCURRENCY procesos × GUNICORN_THREADS hilos.
+  Cada hilo queda bloqueado durante el viaje completo a la Lambda, así que
+  las peticiones en vuelo están acotadas a procesos × hilos (2 × 4 = 8).
+- ``gevent``: cada proceso atiende hasta GUNICORN_WORKER_CONNECTIONS peticiones
+  como greenlets. requests queda parcheado por gevent y cede el control
+  mientras espera al API Gateway, de modo que un único proceso mantiene
+  cientos de llamadas pendientes al backend sin un hilo por cada una.
+
+La aplicación se importa una vez en el master (``preload_app``) y cada
+worker, tras el fork, se precalienta antes de aceptar peticiones
+(``post_worker_init`` -> app.warm_up; STARTUP_WARMUP=false lo desactiva).
+
+El master crea el fichero CATALOG_CACHE_SHARED_FILE antes de importar la
+aplicación: los workers lo usan como contador de invalidaciones común de la
+caché del catálogo (POST /api/cache/invalidate llega a todos) y se borra al
+parar el servidor.
+"""
+
+import os
+import tempfile
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Antes de que preload_app importe requests, urllib3, ssl y threading en el master
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+preload_app = True
+
+# Peticiones concurrentes por proceso: dimensiona el fan-out y el pool
+# keep-alive hacia el API Gateway, que atiende tanto a las peticiones como a
+# los hilos del fan-out. Con gevent se acota para no guardar cientos de
+# conexiones ociosas; las que superen el pool se abren y se cierran al vuelo.
+concurrency = min(worker_connections, 256) if worker_class == 'gevent' else threads
+fanout_workers = max(concurrency, 8)
+os.environ.setdefault('FANOUT_MAX_WORKERS', str(fanout_workers))
+os.environ.setdefault('API_POOL_SIZE', str(concurrency + fanout_workers))
+
+# Contador de invalidaciones compartido por los workers (ver catalog_cache.SharedGeneration)
+if not os.environ.get('CATALOG_CACHE_SHARED_FILE'):
+    fd, shared_cache_file = tempfile.mkstemp(prefix='catalog-cache-')
+    os.close(fd)
+    os.environ['CATALOG_CACHE_SHARED_FILE'] = shared_cache_file
+else:
+    shared_cache_file = None
+
+
+def post_worker_init(worker):
+    """
+    Ya en el worker (tras el fork y, con gevent, tras reinicializar su hub):
+    abre el pool HTTP y precarga la portada antes de la primera petición.
+    """
+    from app import warm_up
+    warm_up()
+
+
+def on_exit(server):
+    """Borra el contador de invalidaciones si lo creó esta configuración"""
+    if shared_cache_file:
+        try:
+            os.unlink(shared_cache_file)
+        except OSError:
+            pass
@@ -0,0 +1,80 @@
+"""
+Estado de readiness del backend con resultado cacheado.
+
+El ping al backend (GET /ping -> SELECT 1) se ejecuta como mucho una vez
+cada ``interval`` segundos y en un hilo de fondo, de modo que las sondas de
+Docker y Cloud Run nunca esperan a un viaje de ida y vuelta a AWS salvo en
+la primera comprobación del worker.
+"""
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackendHealth:
+    def __init__(self, ping, interval=15):
+        self.ping = ping
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._result = None
+        # Se activa con el primer resultado: las sondas que llegan mientras
+        # se hace la primera comprobación esperan a ella en lugar de repetirla
+        self._first_result = threading.Event()
+
+    def _check(self):
+        """Ejecuta el ping y guarda el resultado con su marca de tiempo"""
+        start = time.perf_counter()
+        try:
+            details = self.ping()
+            result = {'status': 'healthy', 'details': details}
+        except Exception as e:
+            result = {'status': 'unhealthy', 'error': str(e)}
+        except BaseException:
+            # gevent.Timeout y similares: la siguiente llamada vuelve a comprobar
+            with self._lock:
+                self._refreshing = False
+            raise
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        result['checked_at'] = time.time()
+
+        with self._lock:
+            self._result = result
+            self._refreshing = False
+        self._first_result.set()
+        return result
+
+    def status(self):
+        """
+        Último resultado conocido. Si ha caducado se lanza un refresco en
+        segundo plano y se devuelve el anterior. Sin resultado todavía, la
+        primera llamada hace la comprobación y las concurrentes esperan a
+        ella como mucho ``interval`` segundos ('starting' si no llega).
+        """
+        with self._lock:
+            result = self._result
+            first = result is None and not self._refreshing
+            if first:
+                self._refreshing = True
+            elif result is not None and time.time() - result['checked_at'] >= self.interval and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._check, daemon=True).start()
+
+        if first:
+            return self._check()
+
+        if result is None:
+            if not self._first_result.wait(self.interval):
+                return {'status': 'starting'}
+            with self._lock:
+                result = self._result
+
+        return {**result, 'age_seconds': round(time.time() - result['checked_at'], 2)}
+
+    def last_status(self):
+        """Resultado cacheado sin disparar ninguna comprobación ('unknown' si no hay)"""
+        with self._lock:
+            return self._result['status'] if self._result else 'unknown'
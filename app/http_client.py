@@ -0,0 +1,149 @@
+"""
+Cliente HTTP con pool de conexiones keep-alive hacia el API Gateway.
+
+Cada proceso (worker de gunicorn) crea su propia ``requests.Session`` de forma
+perezosa: con ``--preload`` el módulo se importa antes del fork y compartir
+sockets entre procesos no es seguro. Los hilos de un mismo worker comparten
+la sesión y su pool de conexiones.
+
+Las respuestas GET con ``ETag`` se guardan junto a su validador: la siguiente
+petición a la misma URL envía ``If-None-Match`` y, si el catálogo no ha
+cambiado, el API responde 304 sin cuerpo y se reutiliza el JSON guardado.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Tamaño del pool por host: por defecto, uno por hilo de gunicorn
+POOL_SIZE = int(os.environ.get('API_POOL_SIZE', '4'))
+# Timeouts separados: fallar rápido al conectar, esperar a la Lambda al leer
+CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', '30'))
+# Reintentos sólo para GET (idempotente); nunca para compras ni altas
+GET_RETRIES = int(os.environ.get('API_GET_RETRIES', '2'))
+RETRY_BACKOFF = float(os.environ.get('API_RETRY_BACKOFF', '0.2'))
+RETRY_JITTER = float(os.environ.get('API_RETRY_JITTER', '0.1'))
+# URLs distintas (página, filtros, búsqueda) cuyo ETag se recuerda; 0 desactiva la revalidación
+VALIDATOR_MAX_ENTRIES = int(os.environ.get('API_VALIDATOR_MAX_ENTRIES', '512'))
+
+_local = {'pid': None, 'session': None}
+_lock = threading.Lock()
+_retries = {'count': 0}
+# {(url, params): (etag, datos)} en orden LRU
+_validators = OrderedDict()
+_validator_stats = {'revalidations': 0, 'not_modified': 0}
+
+
+class _CountingRetry(Retry):
+    """Retry de urllib3 que cuenta los reintentos efectuados"""
+
+    def increment(self, *args, **kwargs):
+        _retries['count'] += 1
+        return super().increment(*args, **kwargs)
+
+
+def _build_session():
+    """Crea una sesión con pool keep-alive y reintentos con backoff y jitter"""
+    retry = _CountingRetry(
+        total=GET_RETRIES,
+        connect=GET_RETRIES,
+        read=GET_RETRIES,
+        status=GET_RETRIES,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_JITTER,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def get_session():
+    """Sesión del proceso actual (se recrea tras un fork)"""
+    pid = os.getpid()
+    if _local['pid'] != pid:
+        with _lock:
+            if _local['pid'] != pid:
+                _local['session'] = _build_session()
+                _local['pid'] = pid
+    return _local['session']
+
+
+def default_timeout(read_timeout=None):
+    """Tupla (connect, read) para requests"""
+    return (CONNECT_TIMEOUT, read_timeout if read_timeout is not None else READ_TIMEOUT)
+
+
+def validator_key(url, params=None):
+    """Clave de la representación: URL y parámetros normalizados"""
+    return url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+
+def get_validator(key):
+    """(etag, datos) guardados para ``key`` o None"""
+    with _lock:
+        entry = _validators.get(key)
+        if entry:
+            _validators.move_to_end(key)
+            _validator_stats['revalidations'] += 1
+        return entry
+
+
+def store_validator(key, etag, data):
+    """Recuerda el ETag y el JSON de una respuesta 200"""
+    if VALIDATOR_MAX_ENTRIES <= 0:
+        return
+    with _lock:
+        _validators[key] = (etag, data)
+        _validators.move_to_end(key)
+        while len(_validators) > VALIDATOR_MAX_ENTRIES:
+            _validators.popitem(last=False)
+
+
+def count_not_modified():
+    with _lock:
+        _validator_stats['not_modified'] += 1
+
+
+def get_stats():
+    """
+    Contadores de reutilización de conexiones del worker actual.
+    ``requests - connections_opened`` son las peticiones que no pagaron handshake.
+    """
+    opened = 0
+    served = 0
+    session = _local['session'] if _local['pid'] == os.getpid() else None
+
+    if session:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    served += pool.num_requests
+
+    return {
+        'pid': os.getpid(),
+        'pool_size': POOL_SIZE,
+        'connect_timeout': CONNECT_TIMEOUT,
+        'read_timeout': READ_TIMEOUT,
+        'requests': served,
+        'connections_opened': opened,
+        'connections_reused': max(served - opened, 0),
+        'reuse_ratio': round((served - opened) / served, 4) if served else 0.0,
+        'retries': _retries['count'],
+        'validators': len(_validators),
+        'revalidations': _validator_stats['revalidations'],
+        'not_modified': _validator_stats['not_modified']
+    }
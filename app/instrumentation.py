@@ -0,0 +1,201 @@
+"""
+Instrumentación por petición del frontend.
+
+- Id de petición: se toma de la cabecera ``X-Request-Id`` entrante (si es
+  válida) o se genera uno; se devuelve en la respuesta y se envía en cada
+  llamada al API Gateway, que lo entrega a la Lambda (ver tracing.py en la
+  capa común). Así una línea del frontend y las de las Lambdas que provocó
+  comparten ``request_id`` en los logs.
+- Spans: al terminar cada petición se escribe en stdout una línea JSON con
+  la ruta, el estado, el total y el tiempo pasado esperando al backend
+  (``upstream``; con fan-out las llamadas se solapan y la suma puede superar
+  el total).
+- ``/metrics``: histogramas de latencia en formato de texto de Prometheus,
+  por ruta de Flask y por endpoint del API Gateway.
+
+La traza activa vive en un ``ContextVar``: fanout.py copia el contexto a sus
+hilos, de modo que las llamadas en paralelo se atribuyen a su petición. Las
+métricas son de cada worker de gunicorn, como /api/cache/stats.
+"""
+
+import contextvars
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+# Ids aceptados de clientes: nada que pueda romper una cabecera o un log
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+# Límites (segundos) de los buckets: de una respuesta cacheada a un catálogo completo
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_trace = contextvars.ContextVar('trace', default=None)
+
+# Líneas JSON sin prefijo de logging para que Cloud Logging las interprete
+span_logger = logging.getLogger('spans')
+span_logger.propagate = False
+if not span_logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    span_logger.addHandler(_handler)
+    span_logger.setLevel(logging.INFO)
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas, exportable en formato Prometheus"""
+
+    def __init__(self, name, description, labels, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += seconds
+            series['count'] += 1
+
+    def render(self):
+        """Líneas del formato de exposición de texto de Prometheus"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, dict(s, buckets=list(s['buckets']))) for key, s in self._series.items())
+        for key, s in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key))
+            for bound, count in zip(self.buckets, s['buckets']):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {s["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {s["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {s["count"]}')
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_latency = Histogram(
+    'frontend_request_duration_seconds',
+    'Latencia de las peticiones al frontend por ruta',
+    ('route', 'method', 'status')
+)
+upstream_latency = Histogram(
+    'frontend_upstream_request_duration_seconds',
+    'Latencia de las llamadas al API Gateway por endpoint',
+    ('endpoint', 'method', 'status')
+)
+
+
+def current_request_id():
+    trace = _trace.get()
+    return trace['request_id'] if trace else None
+
+
+def propagation_headers():
+    """Cabeceras a añadir a una llamada al backend"""
+    request_id = current_request_id()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+@contextmanager
+def span(name):
+    """Suma la duración del bloque a la fase ``name`` de la petición en curso"""
+    trace = _trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            with trace['lock']:
+                trace['phases'][name] = trace['phases'].get(name, 0.0) + elapsed
+                trace['counts'][name] = trace['counts'].get(name, 0) + 1
+
+
+@contextmanager
+def upstream_call(endpoint, method):
+    """
+    Mide una llamada real al API Gateway. El bloque recibe un dict en el que
+    anota ``status`` con el código HTTP; si lanza sin anotarlo cuenta como error.
+    """
+    call = {'status': 'error'}
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        upstream_latency.observe(time.perf_counter() - start,
+                                 endpoint=endpoint, method=method.upper(), status=call['status'])
+
+
+def render_metrics():
+    lines = request_latency.render() + upstream_latency.render()
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Registra el id de petición, la línea de span por petición y /metrics"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_trace():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        trace = {
+            'request_id': incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex,
+            'phases': {},
+            'counts': {},
+            'lock': threading.Lock(),
+            'start': time.perf_counter()
+        }
+        g.trace_token = _trace.set(trace)
+
+    @app.after_request
+    def finish_trace(response):
+        trace = _trace.get()
+        if trace is None:
+            return response
+
+        elapsed = time.perf_counter() - trace['start']
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_latency.observe(elapsed, route=route, method=request.method, status=response.status_code)
+        response.headers[REQUEST_ID_HEADER] = trace['request_id']
+
+        with trace['lock']:
+            phases = {name: round(ms, 3) for name, ms in trace['phases'].items()}
+            counts = dict(trace['counts'])
+        span_logger.info(json.dumps({
+            'span': 'frontend',
+            'request_id': trace['request_id'],
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 3),
+            'phases': phases,
+            'calls': counts
+        }))
+        return response
+
+    @app.teardown_request
+    def reset_trace(exc):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _trace.reset(token)
+
+    @app.route('/metrics')
+    def metrics():
+        """Histogramas de latencia del worker en formato Prometheus"""
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,112 @@
+"""
+Agrupación de llamadas idénticas concurrentes al backend (single-flight).
+
+Cuando caduca la caché del catálogo o llega un pico de tráfico, todos los
+hilos del worker piden a la vez el mismo ``GET /products`` y cada uno
+dispara su propia Lambda y su propia consulta a RDS. Con ``SingleFlight``
+la primera petición de una clave hace la llamada real y las que llegan
+mientras está en vuelo esperan y reciben el mismo resultado (o la misma
+excepción).
+
+No es una caché: en cuanto la llamada termina la clave se libera, y la
+siguiente petición vuelve a salir al backend. Con el worker gevent los
+``threading.Event`` están parcheados y las esperas ceden el control.
+"""
+
+import threading
+
+
+class LeaderInterrupted(Exception):
+    """
+    La llamada compartida se interrumpió con una BaseException (gevent.Timeout,
+    GreenletExit, KeyboardInterrupt...). La reciben los que esperaban en lugar
+    de la original, que sólo tiene sentido en el hilo o greenlet que la hizo.
+    """
+
+
+class _Call:
+    """Llamada en vuelo: resultado compartido con todos los que esperan"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'in_flight_max': 0,
+            'waiters_max': 0
+        }
+
+    def do(self, key, fn):
+        """
+        Ejecuta ``fn()`` para ``key`` salvo que ya haya una llamada en vuelo
+        con la misma clave; en ese caso espera a que termine y devuelve su
+        resultado. Los errores de la llamada se propagan a todos; si se
+        interrumpe con una BaseException, quienes esperaban reciben
+        ``LeaderInterrupted`` y nunca un resultado ``None``.
+        """
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                self._stats['waiters_max'] = max(self._stats['waiters_max'], call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+                self._stats['in_flight_max'] = max(self._stats['in_flight_max'], len(self._calls))
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            if isinstance(e, Exception):
+                call.error = e
+            else:
+                call.error = LeaderInterrupted(f"Llamada compartida interrumpida: {type(e).__name__}")
+                call.error.__cause__ = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            # Se libera la clave antes de despertar: quien llegue después hace una llamada nueva
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Contadores del worker actual. ``coalesced`` son las peticiones que no
+        salieron al backend por compartir una llamada ya en vuelo.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        stats['enabled'] = self.enabled
+        stats['coalesced_ratio'] = round(stats['coalesced'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
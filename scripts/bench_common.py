@@ -0,0 +1,46 @@
+"""
+Utilidades compartidas por los benchmarks y scripts de medición: percentiles
+de latencia, su resumen habitual (p50/p95/p99/máximo en ms) y la conexión
+psycopg2 a partir de las mismas variables de entorno que las Lambdas.
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import math
+
+import psycopg2
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada (None si está vacía)"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100.0 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, percentiles=(50, 95, 99), digits=3):
+    """
+    Percentiles y máximo de una lista de latencias en ms, con claves
+    ``p50_ms``, ``p95_ms``... y ``max_ms``. None si no hay muestras.
+    """
+    if not latencies:
+        return None
+    latencies = sorted(latencies)
+    summary = {f'p{pct}_ms': round(percentile(latencies, pct), digits) for pct in percentiles}
+    summary['max_ms'] = round(latencies[-1], digits)
+    return summary
+
+
+def connect(host=None, port=None, autocommit=False):
+    """Conexión psycopg2 a partir de las variables de entorno (host y puerto opcionales)"""
+    conn = psycopg2.connect(
+        host=host or os.getenv('DB_HOST'),
+        port=port or os.getenv('DB_PORT', '5432'),
+        database=os.getenv('DB_NAME', 'ecommercedb'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD')
+    )
+    conn.autocommit = autocommit
+    return conn
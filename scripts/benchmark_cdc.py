@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce CDC Benchmark
+=============================
+Mide el flujo de cambios de productos (productos_changes + cdc_consumer.py)
+contra un PostgreSQL local:
+
+- overhead de escritura: una compra (UPDATE de una fila) y un UPDATE masivo
+  con y sin los triggers que registran los cambios
+- lag de sincronización: --changes productos distintos modificados a --rate
+  por segundo mientras el consumidor, en un hilo, invalida el frontend real
+  (app/app.py servido en un hilo) y escribe lotes JSONL. Lag = commit ->
+  invalidación recibida por el frontend y commit -> fichero escrito. Se
+  comprueba que el detalle cacheado de cada producto desaparece.
+- compras concurrentes: --buyers conexiones repiten la transacción de
+  checkout (SELECT ... FOR UPDATE + UPDATE) sin los triggers, con los
+  triggers y con los triggers más NOTIFY (dp3.productos_changes_notify);
+  compras por segundo, su latencia y, con CDC, el lag medido como arriba
+  mientras dura el tráfico
+- throughput: un UPDATE masivo de --bulk-rows filas, commit -> todos los
+  cambios leídos y commit -> todos los registros escritos
+- lo que cuesta hoy sin el flujo: leer productos_analytics entera
+
+Las escrituras son ``stock = stock`` (sólo cambian updated_at y la versión
+del catálogo). Al terminar se borra el consumidor del benchmark y, si no hay
+otros consumidores registrados, los cambios que generó.
+
+Uso:
+    python benchmark_cdc.py [--changes 200] [--rate 50] [--bulk-rows 100000]
+                            [--buyers 8] [--batch-seconds 1] [--output cdc.json]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+from bench_common import connect, summarize
+from cdc_consumer import ChangeConsumer, http_invalidator
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).parent.parent / 'app'
+CONSUMER_NAME = 'benchmark_cdc'
+INVALIDATION_TOKEN = 'benchmark-cdc'
+
+CDC_TRIGGERS = ('record_productos_inserts', 'record_productos_updates',
+                'record_productos_deletes', 'record_productos_truncates')
+TOUCH_QUERY = "UPDATE productos SET stock = stock WHERE id = %s"
+# Transacción de checkout (lambda_src/checkout) con cantidad 0 para no agotar el stock
+LOCK_QUERY = "SELECT id, name, price, stock FROM productos WHERE id = ANY(%s) ORDER BY id FOR UPDATE"
+RESERVE_QUERY = """
+    UPDATE productos AS p
+    SET stock = p.stock - l.quantity
+    FROM unnest(%s::int[], %s::int[]) AS l(id, quantity)
+    WHERE p.id = l.id
+"""
+NOTIFY_SETTING = "SET dp3.productos_changes_notify = %s"
+# Productos de las compras concurrentes, aparte de los de las pruebas de lag
+BUY_PRODUCTS = 1000
+BULK_QUERY = "UPDATE productos SET stock = stock WHERE id IN (SELECT id FROM productos ORDER BY id LIMIT %s)"
+
+
+def set_cdc_triggers(conn, enabled):
+    cursor = conn.cursor()
+    for trigger in CDC_TRIGGERS:
+        cursor.execute(f"ALTER TABLE productos {'ENABLE' if enabled else 'DISABLE'} TRIGGER {trigger}")
+    conn.commit()
+
+
+def bench_write_overhead(conn, product_ids, bulk_rows, iterations):
+    """Compra de una fila y UPDATE masivo, con los triggers de CDC y sin ellos"""
+    cursor = conn.cursor()
+    results = {}
+    try:
+        for label, enabled in (('sin CDC', False), ('con CDC', True)):
+            set_cdc_triggers(conn, enabled)
+            latencies = []
+            for product_id in random.choices(product_ids, k=iterations):
+                start = time.perf_counter()
+                cursor.execute(TOUCH_QUERY, (product_id,))
+                conn.commit()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            cursor.execute(BULK_QUERY, (bulk_rows,))
+            conn.commit()
+            results[label] = {'compra': summarize(latencies),
+                              'bulk_s': round(time.perf_counter() - start, 3)}
+    finally:
+        set_cdc_triggers(conn, True)
+    return results
+
+
+def start_buyers(product_ids, buyers, notify):
+    """
+    ``buyers`` hilos, cada uno con su conexión, repitiendo la transacción de
+    checkout sobre 1-3 productos al azar. Devuelve (stop, resultados): tras
+    llamar a ``stop()`` los resultados tienen compras/s y latencias.
+    """
+    stopped = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+    ready = threading.Barrier(buyers + 1)
+
+    def buyer():
+        conn = connect()
+        cursor = conn.cursor()
+        cursor.execute(NOTIFY_SETTING, ('on' if notify else 'off',))
+        conn.commit()
+        local = []
+        ready.wait()
+        while not stopped.is_set():
+            ids = sorted(random.sample(product_ids, random.randint(1, 3)))
+            start = time.perf_counter()
+            cursor.execute(LOCK_QUERY, (ids,))
+            cursor.fetchall()
+            cursor.execute(RESERVE_QUERY, (ids, [0] * len(ids)))
+            conn.commit()
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=buyer, daemon=True) for _ in range(buyers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.monotonic()
+    results = {}
+
+    def stop():
+        stopped.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        results.update({'buys': len(latencies), 'buys_per_s': round(len(latencies) / elapsed, 1),
+                        'latency': summarize(latencies)})
+        return results
+
+    return stop, results
+
+
+def bench_concurrent(conn, frontend, received, written, probe_ids, buy_ids, buyers, rate, timeout):
+    """
+    Compras concurrentes sin CDC, con CDC y con CDC + NOTIFY; con CDC se mide
+    a la vez el lag de ``probe_ids`` (un grupo distinto por modo)
+    """
+    duration = len(probe_ids[0]) / rate
+    results = {}
+    cursor = conn.cursor()
+    try:
+        for (label, enabled, notify), probe in zip(
+                (('sin CDC', False, False), ('CDC', True, False), ('CDC + NOTIFY', True, True)), probe_ids):
+            set_cdc_triggers(conn, enabled)
+            cursor.execute(NOTIFY_SETTING, ('on' if notify else 'off',))
+            conn.commit()
+            stop, buys = start_buyers(buy_ids, buyers, notify)
+            if enabled:
+                lag = bench_lag(conn, frontend, received, written, probe, rate, timeout)
+            else:
+                time.sleep(duration)
+                lag = None
+            results[label] = {**stop(), 'lag': lag}
+    finally:
+        set_cdc_triggers(conn, True)
+        cursor.execute(NOTIFY_SETTING, ('off',))
+        conn.commit()
+    return results
+
+
+def start_frontend():
+    """
+    app/app.py servido en un hilo con la invalidación habilitada. Devuelve
+    (módulo, url, {product_id: instante de la invalidación})
+    """
+    from werkzeug.serving import make_server
+
+    os.environ['CACHE_INVALIDATION_TOKEN'] = INVALIDATION_TOKEN
+    sys.path.insert(0, str(APP_DIR))
+    import app as frontend
+    for name in ('spans', 'werkzeug', 'app'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    received = {}
+    invalidate_catalog = frontend.invalidate_catalog
+
+    def timed_invalidate_catalog(*product_ids, **kwargs):
+        now = time.monotonic()
+        for product_id in product_ids:
+            received.setdefault(product_id, now)
+        return invalidate_catalog(*product_ids, **kwargs)
+
+    frontend.invalidate_catalog = timed_invalidate_catalog
+    server = make_server('127.0.0.1', 0, frontend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return frontend, f'http://127.0.0.1:{server.server_port}', received
+
+
+def start_consumer(frontend_url, output_dir, batch_seconds):
+    """Consumidor en un hilo; devuelve (consumidor, hilo, {product_id: instante de escritura})"""
+    consumer = ChangeConsumer(CONSUMER_NAME, output_dir=output_dir,
+                              invalidators=[http_invalidator(frontend_url, INVALIDATION_TOKEN)],
+                              batch_seconds=batch_seconds)
+    written = {}
+    write_batch = consumer.write_batch
+
+    def timed_write_batch():
+        path = write_batch()
+        now = time.monotonic()
+        for record in consumer.batch:
+            written[record.get('id')] = now
+        return path
+
+    consumer.write_batch = timed_write_batch
+    consumer.connect()
+    consumer.load_offset()
+    thread = threading.Thread(target=consumer.run, daemon=True)
+    thread.start()
+    return consumer, thread, written
+
+
+def wait_until(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def bench_lag(conn, frontend, received, written, product_ids, rate, timeout):
+    """Cambios de productos distintos a ``rate`` por segundo; lag hasta el frontend y hasta el fichero"""
+    cached = object()
+    for product_id in product_ids:
+        frontend.catalog_cache.get(('product', product_id), lambda: cached)
+
+    cursor = conn.cursor()
+    committed = {}
+    interval = 1.0 / rate if rate else 0
+    next_write = time.monotonic()
+    for product_id in product_ids:
+        time.sleep(max(0.0, next_write - time.monotonic()))
+        cursor.execute(TOUCH_QUERY, (product_id,))
+        conn.commit()
+        committed[product_id] = time.monotonic()
+        next_write += interval
+
+    complete = wait_until(lambda: all(p in received and p in written for p in product_ids), timeout)
+    stale = sum(frontend.catalog_cache.get(('product', p), lambda: None) is cached for p in product_ids)
+    invalidated = [(received[p] - committed[p]) * 1000 for p in product_ids if p in received]
+    persisted = [(written[p] - committed[p]) * 1000 for p in product_ids if p in written]
+    return {
+        'changes': len(product_ids),
+        'complete': complete,
+        'stale_cache_entries': stale,
+        'commit_to_invalidation': summarize(invalidated),
+        'commit_to_file': summarize(persisted)
+    }
+
+
+def bench_throughput(conn, consumer, bulk_rows, timeout):
+    """UPDATE masivo: segundos hasta leer todos los cambios y hasta escribirlos"""
+    changes, records = consumer.stats['changes'], consumer.stats['records']
+    cursor = conn.cursor()
+    start = time.monotonic()
+    cursor.execute(BULK_QUERY, (bulk_rows,))
+    conn.commit()
+    committed = time.monotonic()
+
+    wait_until(lambda: consumer.stats['changes'] - changes >= bulk_rows, timeout)
+    read_s = time.monotonic() - committed
+    wait_until(lambda: consumer.stats['records'] - records >= bulk_rows, timeout)
+    written_s = time.monotonic() - committed
+    moved = consumer.stats['records'] - records
+    return {
+        'rows': bulk_rows,
+        'update_s': round(committed - start, 3),
+        'read_s': round(read_s, 3),
+        'written_s': round(written_s, 3),
+        'records': moved,
+        'rows_per_s': round(moved / written_s) if written_s else None
+    }
+
+
+def bench_full_poll(conn):
+    """Lo que hay que hacer sin el flujo de cambios: leer productos_analytics entera"""
+    cursor = conn.cursor(name='full_poll')
+    cursor.itersize = 10000
+    start = time.perf_counter()
+    cursor.execute("SELECT * FROM productos_analytics")
+    rows = sum(1 for _ in cursor)
+    cursor.close()
+    conn.commit()
+    return {'rows': rows, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def cleanup(conn, start_txid):
+    """Borra el consumidor del benchmark y, si no queda ningún otro, los cambios que generó"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM productos_changes_offsets WHERE consumer = %s", (CONSUMER_NAME,))
+    cursor.execute("SELECT COUNT(*) FROM productos_changes_offsets")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("DELETE FROM productos_changes WHERE txid >= %s::XID8", (start_txid,))
+        logger.info(f"🧹 {cursor.rowcount} cambios del benchmark eliminados")
+    else:
+        cursor.execute("SELECT prune_productos_changes()")
+    conn.commit()
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Lag y throughput del flujo de cambios de productos')
+
+    parser.add_argument('--changes', type=int, default=200,
+                       help='Productos distintos modificados en la prueba de lag (default: 200)')
+    parser.add_argument('--rate', type=float, default=50,
+                       help='Cambios por segundo en la prueba de lag (default: 50)')
+    parser.add_argument('--bulk-rows', type=int, default=100000,
+                       help='Filas del UPDATE masivo (default: 100000)')
+    parser.add_argument('--batch-seconds', type=float, default=1.0,
+                       help='Antigüedad máxima de un lote del consumidor (default: 1.0)')
+    parser.add_argument('--buyers', type=int, default=8,
+                       help='Conexiones con compras concurrentes (default: 8)')
+    parser.add_argument('--iterations', type=int, default=200,
+                       help='Compras por modo en la prueba de overhead (default: 200)')
+    parser.add_argument('--timeout', type=float, default=120,
+                       help='Espera máxima a que el consumidor entregue los cambios (default: 120)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT")
+    start_txid = cursor.fetchone()[0]
+    cursor.execute("SELECT id FROM productos ORDER BY random() LIMIT %s", (config.changes * 3 + BUY_PRODUCTS,))
+    product_ids = [row[0] for row in cursor.fetchall()]
+    lag_ids = [product_ids[i * config.changes:(i + 1) * config.changes] for i in range(3)]
+    buy_ids = product_ids[config.changes * 3:]
+    cursor.execute("DELETE FROM productos_changes_offsets WHERE consumer = %s", (CONSUMER_NAME,))
+    conn.commit()
+
+    results = {}
+    consumer = None
+    try:
+        logger.info("✍️  Overhead de escritura de los triggers de CDC...")
+        results['write_overhead'] = bench_write_overhead(conn, product_ids, config.bulk_rows, config.iterations)
+        for label, stats in results['write_overhead'].items():
+            logger.info(f"✍️  {label:<8} compra p50 {stats['compra']['p50_ms']} ms, "
+                        f"p95 {stats['compra']['p95_ms']} ms; UPDATE de {config.bulk_rows} filas {stats['bulk_s']} s")
+
+        frontend, frontend_url, received = start_frontend()
+        with tempfile.TemporaryDirectory() as output_dir:
+            consumer, thread, written = start_consumer(frontend_url, output_dir, config.batch_seconds)
+
+            logger.info(f"⏱️  Lag: {config.changes} cambios a {config.rate}/s...")
+            results['lag'] = bench_lag(conn, frontend, received, written, lag_ids[0],
+                                       config.rate, config.timeout)
+            lag = results['lag']
+            logger.info(f"⏱️  commit -> invalidación: {lag['commit_to_invalidation']}")
+            logger.info(f"⏱️  commit -> fichero:      {lag['commit_to_file']}")
+            logger.info(f"🗑️  Detalles cacheados sin invalidar: {lag['stale_cache_entries']}")
+
+            logger.info(f"🛒 Compras concurrentes ({config.buyers} conexiones) con y sin CDC y NOTIFY...")
+            received.clear()
+            written.clear()
+            results['concurrent'] = bench_concurrent(conn, frontend, received, written, lag_ids, buy_ids,
+                                                     config.buyers, config.rate, config.timeout)
+            for label, stats in results['concurrent'].items():
+                lag = stats['lag']
+                logger.info(f"🛒 {label:<12} {stats['buys_per_s']} compras/s, p50 {stats['latency']['p50_ms']} ms, "
+                            f"p95 {stats['latency']['p95_ms']} ms"
+                            + (f"; commit -> invalidación p50 {lag['commit_to_invalidation']['p50_ms']} ms, "
+                               f"p95 {lag['commit_to_invalidation']['p95_ms']} ms" if lag else ""))
+
+            logger.info(f"🚚 Throughput: UPDATE de {config.bulk_rows} filas...")
+            results['throughput'] = bench_throughput(conn, consumer, config.bulk_rows, config.timeout)
+            throughput = results['throughput']
+            logger.info(f"🚚 Leídos en {throughput['read_s']} s, escritos en {throughput['written_s']} s "
+                        f"({throughput['rows_per_s']} filas/s)")
+
+            consumer.stop()
+            thread.join()
+            results['consumer'] = dict(consumer.stats)
+            consumer.close()
+            consumer = None
+
+        logger.info("🐢 Sondeo completo de productos_analytics...")
+        results['full_poll'] = bench_full_poll(conn)
+        stats = results['consumer']
+        logger.info(f"🐢 Sondeo completo: {results['full_poll']['rows']} filas en {results['full_poll']['seconds']} s; "
+                    f"flujo de cambios: {stats['records']} registros en {stats['files']} ficheros "
+                    f"({stats['bytes'] / max(stats['records'], 1):.1f} bytes/registro con gzip)")
+    finally:
+        if consumer:
+            consumer.stop()
+            consumer.close()
+        cleanup(conn, start_txid)
+        conn.close()
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+    lags = [results['lag']] + [stats['lag'] for stats in results['concurrent'].values() if stats['lag']]
+    if any(not lag['complete'] or lag['stale_cache_entries'] for lag in lags):
+        logger.error("❌ El consumidor no entregó todos los cambios")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Frontend Benchmark
+==================================
+Compara los modos de servicio del frontend Flask bajo carga: gunicorn con
+hilos (gthread, el modo de siempre: 2 procesos × 4 hilos) frente a gunicorn
+con gevent, donde cada proceso mantiene cientos de llamadas pendientes al
+API Gateway.
+
+Para cada modo se arranca gunicorn con app/gunicorn.conf.py apuntando a un
+API (normalmente local_api.py con --delay-ms para simular el viaje de ida y
+vuelta a AWS) y se lanza carga con distintos números de clientes
+concurrentes. La caché del catálogo se desactiva (CATALOG_CACHE_TTL=0) para
+que cada petición llegue al backend.
+
+Rutas medidas por defecto:
+  - /api/products?limit=20       una llamada al backend
+  - /?product=<id>               listado + detalle en paralelo (fan-out)
+
+Uso:
+    python local_api.py --port 8080 --delay-ms 50 &
+    python benchmark_frontend.py --api-url http://127.0.0.1:8080
+                                 [--modes gthread gevent] [--clients 8 64 256]
+                                 [--duration 10] [--output frontend.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import subprocess
+import threading
+from pathlib import Path
+
+import requests
+
+from bench_common import percentile
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+DEFAULT_PATHS = ['/api/products?limit=20', '/?product={id}']
+
+
+def sample_product_ids(api_url, limit=200):
+    """Ids reales para las rutas con {id}"""
+    response = requests.get(f"{api_url.rstrip('/')}/products",
+                            params={'limit': limit, 'fields': 'id'}, timeout=30)
+    response.raise_for_status()
+    return [p['id'] for p in response.json()['products']] or [1]
+
+
+def start_frontend(config, mode, port):
+    """Arranca gunicorn en el modo indicado y espera a /health/live"""
+    env = {
+        **os.environ,
+        'API_GATEWAY_URL': config.api_url,
+        'PORT': str(port),
+        'GUNICORN_WORKER_CLASS': mode,
+        'WEB_CONCURRENCY': str(config.workers),
+        'GUNICORN_THREADS': str(config.threads),
+        'GUNICORN_WORKER_CONNECTIONS': str(config.worker_connections),
+        'CATALOG_CACHE_TTL': '0'
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn ({mode}) terminó con código {process.returncode}')
+        try:
+            if requests.get(f'{url}/health/live', timeout=1).status_code == 200:
+                return process, url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError(f'gunicorn ({mode}) no respondió en 30 s')
+
+
+def stop_frontend(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(url, path, clients, duration, product_ids):
+    """``clients`` hilos lanzando peticiones sin pausa durante ``duration`` segundos"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        while time.monotonic() < stop_at:
+            target = url + path.format(id=random.choice(product_ids))
+            start = time.perf_counter()
+            try:
+                response = session.get(target, timeout=60, allow_redirects=False)
+                ok = response.status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            local_errors += 0 if ok else 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        'path': path,
+        'clients': clients,
+        'requests': total,
+        'errors': sum(errors),
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if total else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if total else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if total else None
+    }
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Benchmark del frontend: gthread frente a gevent')
+
+    parser.add_argument('--api-url', default=os.getenv('API_GATEWAY_URL', 'http://127.0.0.1:8080'),
+                       help='API al que llama el frontend (default: local_api en :8080)')
+    parser.add_argument('--modes', nargs='+', default=['gthread', 'gevent'],
+                       choices=['gthread', 'gevent'],
+                       help='Clases de worker a comparar (default: gthread gevent)')
+    parser.add_argument('--clients', type=int, nargs='+', default=[8, 64, 256],
+                       help='Clientes concurrentes (default: 8 64 256)')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS,
+                       help='Rutas a medir; {id} se sustituye por un producto real')
+    parser.add_argument('--duration', type=float, default=10,
+                       help='Segundos de carga por combinación (default: 10)')
+    parser.add_argument('--workers', type=int, default=2,
+                       help='Procesos de gunicorn (default: 2)')
+    parser.add_argument('--threads', type=int, default=4,
+                       help='Hilos por proceso en modo gthread (default: 4)')
+    parser.add_argument('--worker-connections', type=int, default=1000,
+                       help='Peticiones simultáneas por proceso en modo gevent (default: 1000)')
+    parser.add_argument('--port', type=int, default=8100,
+                       help='Puerto del frontend durante la prueba (default: 8100)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    try:
+        product_ids = sample_product_ids(config.api_url)
+    except Exception as e:
+        logger.error(f"❌ No se pudo consultar {config.api_url}/products: {e}")
+        sys.exit(1)
+
+    results = []
+    for mode in config.modes:
+        process, url = start_frontend(config, mode, config.port)
+        logger.info(f"🚀 gunicorn {mode} en {url} ({config.workers} procesos, "
+                    f"{config.threads if mode == 'gthread' else config.worker_connections} "
+                    f"{'hilos' if mode == 'gthread' else 'conexiones'} por proceso)")
+        try:
+            for path in config.paths:
+                for clients in config.clients:
+                    result = run_load(url, path, clients, config.duration, product_ids)
+                    result['mode'] = mode
+                    results.append(result)
+                    logger.info(f"  {path:<26} {clients:>4} clientes  {result['throughput_rps']:>8} req/s  "
+                                f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+                                f"p99 {result['p99_ms']} ms  errores {result['errors']}")
+        finally:
+            stop_frontend(process)
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump({'api_url': config.api_url, 'results': results}, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
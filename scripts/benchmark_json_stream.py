@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce JSON Serialization Benchmark
+============================================
+Compara la serialización actual de getProducts (fetchall + dict por fila +
+json.dumps) con el serializador incremental de json_stream (lotes desde
+cursor de servidor + escritura directa de JSON).
+
+Cada caso se ejecuta en un subproceso nuevo para que el pico de RSS de un
+caso no contamine al siguiente.
+
+Uso:
+    python benchmark_json_stream.py [--rows 10000 100000 1000000] [--batch-size 1000]
+
+    Contra una base de datos real (lee las filas de productos con LIMIT):
+    DB_HOST=localhost DB_USER=postgres DB_PASSWORD=postgres python benchmark_json_stream.py --from-db
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# Módulos compartidos de las Lambdas (Lambda layer)
+sys.path.insert(0, str(Path(__file__).parent.parent / 'terraform' / 'lambda_src' / 'common' / 'python'))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FIELDS = ('id', 'name', 'category', 'price', 'stock', 'created_at', 'updated_at')
+CATEGORIES = ['Vitaminas', 'Omega', 'Proteínas', 'Minerales', 'Antioxidantes', 'Probióticos', 'Energía', 'Inmunidad']
+QUERY = "SELECT id, name, category, price, stock, created_at, updated_at FROM productos ORDER BY id ASC LIMIT %s"
+
+
+def synthetic_row(i):
+    """Fila con los mismos tipos que devuelve el driver de PostgreSQL"""
+    ts = datetime(2024, 1, 1) + timedelta(seconds=i)
+    return (i, f'Producto sintético {i}', CATEGORIES[i % len(CATEGORIES)],
+            Decimal(f'{10 + i % 90}.99'), i % 50, ts, ts)
+
+
+def synthetic_batches(rows, batch_size):
+    """Simula FETCH FORWARD: sólo un lote vive en memoria a la vez"""
+    for start in range(1, rows + 1, batch_size):
+        yield [synthetic_row(i) for i in range(start, min(start + batch_size, rows + 1))]
+
+
+def db_connection():
+    """Conexión psycopg2 usando las mismas variables de entorno que el resto de scripts"""
+    import psycopg2
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST'),
+        port=os.getenv('DB_PORT', '5432'),
+        database=os.getenv('DB_NAME', 'ecommercedb'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD')
+    )
+
+
+def run_current(rows, batch_size, from_db):
+    """Enfoque actual: fetchall, lista de dicts y json.dumps de todo el catálogo"""
+    if from_db:
+        conn = db_connection()
+        cursor = conn.cursor()
+        cursor.execute(QUERY, (rows,))
+        data = cursor.fetchall()
+        cursor.close()
+    else:
+        data = [synthetic_row(i) for i in range(1, rows + 1)]
+
+    products = []
+    for row in data:
+        products.append({
+            'id': row[0],
+            'name': row[1],
+            'category': row[2],
+            'price': float(row[3]),
+            'stock': row[4],
+            'created_at': row[5].isoformat() if row[5] else None,
+            'updated_at': row[6].isoformat() if row[6] else None
+        })
+    body = json.dumps(products)
+
+    if from_db:
+        conn.close()
+    return len(body)
+
+
+def run_streaming(rows, batch_size, from_db):
+    """Serializador incremental de json_stream"""
+    import io
+    from json_stream import iter_server_side, write_json_array
+
+    if from_db:
+        conn = db_connection()
+        batches = iter_server_side(conn, QUERY, (rows,), batch_size)
+    else:
+        batches = synthetic_batches(rows, batch_size)
+
+    out = io.StringIO()
+    write_json_array(batches, FIELDS, out)
+    body = out.getvalue()
+
+    if from_db:
+        conn.rollback()
+        conn.close()
+    return len(body)
+
+
+APPROACHES = {
+    'actual': run_current,
+    'streaming': run_streaming
+}
+
+
+def worker(approach, rows, batch_size, from_db):
+    """Ejecuta un único caso y escribe el resultado como JSON en stdout"""
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    body_size = APPROACHES[approach](rows, batch_size, from_db)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        'approach': approach,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'delta_rss_mb': round((peak_kb - baseline_kb) / 1024, 1),
+        'body_mb': round(body_size / 1024 / 1024, 1)
+    }))
+
+
+def check_equivalence():
+    """Ambos enfoques deben producir exactamente el mismo JSON"""
+    import io
+    from json_stream import write_json_array
+
+    data = [synthetic_row(i) for i in range(1, 501)]
+    expected = json.dumps([{
+        'id': r[0], 'name': r[1], 'category': r[2], 'price': float(r[3]), 'stock': r[4],
+        'created_at': r[5].isoformat(), 'updated_at': r[6].isoformat()
+    } for r in data])
+
+    out = io.StringIO()
+    write_json_array(synthetic_batches(500, 64), FIELDS, out)
+    return out.getvalue() == expected
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON de productos')
+
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                       help='Tamaños de catálogo a medir (default: 10k 100k 1M)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                       help='Filas por lote en el enfoque streaming (default: 1000)')
+    parser.add_argument('--from-db', action='store_true',
+                       help='Leer filas reales de productos en lugar de sintéticas')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+    parser.add_argument('--worker', nargs=2, metavar=('APPROACH', 'ROWS'),
+                       help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    if config.worker:
+        worker(config.worker[0], int(config.worker[1]), config.batch_size, config.from_db)
+        return
+
+    if not check_equivalence():
+        logger.error("❌ El JSON en streaming no coincide con json.dumps")
+        sys.exit(1)
+    logger.info("✅ Salida en streaming idéntica a json.dumps")
+
+    results = []
+    for rows in config.rows:
+        for approach in APPROACHES:
+            cmd = [sys.executable, __file__, '--worker', approach, str(rows),
+                   '--batch-size', str(config.batch_size)]
+            if config.from_db:
+                cmd.append('--from-db')
+
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                logger.error(f"❌ {approach} con {rows} filas falló: {proc.stderr.strip()}")
+                continue
+
+            result = json.loads(proc.stdout)
+            results.append(result)
+            logger.info(f"📊 {approach:>9} | {rows:>8} filas | {result['seconds']:>7.3f} s | "
+                        f"pico RSS {result['peak_rss_mb']:>7.1f} MB (+{result['delta_rss_mb']} MB) | "
+                        f"body {result['body_mb']} MB")
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
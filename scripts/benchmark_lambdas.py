@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Lambda Micro-benchmark
+======================================
+Invoca los handlers de getProducts, getItem y addProduct en el propio proceso
+con eventos AWS_PROXY (los mismos que construye local_api.py) contra un
+PostgreSQL local, y desglosa cada invocación en fases:
+
+- import:    carga del módulo del handler y de la capa (sólo en frío)
+- connect:   get_connection / get_read_connection (connect nuevo o sonda de la conexión reutilizada)
+- execute:   viajes a la BD (execute, commit, rollback)
+- fetch:     lectura de filas del cursor
+- serialize: json.dumps y json_stream.write_json_array
+- handler:   el resto (validación, conversión de filas, construcción de la respuesta)
+
+Las fases son exclusivas: un FETCH lanzado desde el serializador en streaming
+cuenta como execute, no como serialize. Una invocación en frío descarga el
+handler, db_pool, json_stream y pg8000 de ``sys.modules`` y cierra las
+conexiones, como un contenedor Lambda nuevo.
+
+Uso:
+    python benchmark_lambdas.py [--cold 5] [--warm 50] [--cases get_products_page get_item]
+                                [--output run.json] [--baseline prev.json --max-regression 0.25]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from contextlib import contextmanager
+
+from bench_common import connect, percentile
+from local_api import build_event, load_handler
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PHASES = ('import', 'connect', 'execute', 'fetch', 'serialize', 'handler')
+BENCHMARK_SKU = 'Benchmark SKU (lambdas)'
+BENCHMARK_CATEGORY = 'Benchmark'
+# Módulos que se descargan para simular un contenedor nuevo
+COLD_MODULE_PREFIXES = ('db_pool', 'json_stream', 'etag', 'compression', 'tracing',
+                        'query_log', 'data_access', 'responses',
+                        'pg8000', 'scramp', 'asn1crypto')
+
+
+class PhaseTimer:
+    """Acumula tiempo exclusivo por fase; las fases anidadas se descuentan de la externa"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self._stack.append([name, 0.0])
+        try:
+            yield
+        finally:
+            _, nested = self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed - nested
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return fn(*args, **kwargs)
+        timed.__wrapped__ = fn
+        return timed
+
+
+class _TimedJson:
+    """Sustituye al módulo json del handler para medir json.dumps"""
+
+    def __init__(self, timer):
+        self.dumps = timer.wrap('serialize', json.dumps)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+def instrument(module, timer):
+    """Instala los puntos de medida sobre el handler, la capa y pg8000"""
+    import pg8000.core
+    import pg8000.dbapi
+
+    for name in ('get_connection', 'get_read_connection'):
+        if hasattr(module, name):
+            setattr(module, name, timer.wrap('connect', getattr(module, name)))
+    module.json = _TimedJson(timer)
+    responses = sys.modules.get('responses')
+    if responses:
+        responses.json = _TimedJson(timer)
+
+    json_stream = sys.modules.get('json_stream')
+    if json_stream and not hasattr(json_stream.write_json_array, '__wrapped__'):
+        json_stream.write_json_array = timer.wrap('serialize', json_stream.write_json_array)
+
+    cursor, connection = pg8000.dbapi.Cursor, pg8000.dbapi.Connection
+    # data_access.query usa sentencias preparadas: PARSE y BIND/EXECUTE cuentan
+    # como execute y las filas llegan ya leídas (sin fase fetch)
+    for cls, names, phase in ((cursor, ('execute', 'executemany'), 'execute'),
+                              (cursor, ('fetchone', 'fetchmany', 'fetchall', '__next__'), 'fetch'),
+                              (connection, ('commit', 'rollback'), 'execute'),
+                              (pg8000.core.CoreConnection, ('prepare_statement', 'execute_named'), 'execute')):
+        for name in names:
+            method = getattr(cls, name)
+            if not hasattr(method, '__wrapped__'):
+                setattr(cls, name, timer.wrap(phase, method))
+
+
+def cold_load(name, timer):
+    """Descarga el handler y la capa y los vuelve a importar, midiendo el import"""
+    db_pool = sys.modules.get('db_pool')
+    if db_pool:
+        db_pool.close_all()
+    for module in list(sys.modules):
+        if module.split('.')[0] in COLD_MODULE_PREFIXES:
+            del sys.modules[module]
+
+    with timer.phase('import'):
+        module = load_handler(name, fresh=True)
+    instrument(module, timer)
+    return module
+
+
+def prepare_fixtures(stock):
+    """Crea el SKU de compras y devuelve (sku_id, id existente para lecturas)"""
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM productos WHERE name = %s", (BENCHMARK_SKU,))
+    cursor.execute(
+        "INSERT INTO productos (name, category, price, stock) VALUES (%s, %s, 1.00, %s) RETURNING id",
+        (BENCHMARK_SKU, BENCHMARK_CATEGORY, stock)
+    )
+    sku_id = cursor.fetchone()[0]
+    cursor.execute("SELECT MIN(id) FROM productos")
+    read_id = cursor.fetchone()[0]
+    conn.close()
+    return sku_id, read_id
+
+
+def cleanup_fixtures(started_at):
+    """Borra el SKU de compras y los productos creados por el caso add_product"""
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM productos WHERE category = %s AND (name = %s OR created_at >= %s)",
+        (BENCHMARK_CATEGORY, BENCHMARK_SKU, started_at)
+    )
+    deleted = cursor.rowcount
+    conn.close()
+    return deleted
+
+
+def build_cases(sku_id, read_id, full_catalog):
+    """Casos de prueba: (nombre, handler, función que genera el evento)"""
+    counter = {'n': 0}
+
+    def new_product():
+        counter['n'] += 1
+        return build_event('POST', '/add', body=json.dumps({
+            'name': f"Benchmark {os.getpid()}-{counter['n']}",
+            'category': BENCHMARK_CATEGORY,
+            'price': 9.99,
+            'stock': 10
+        }))
+
+    cases = {
+        'get_products_page': ('get_products', lambda: build_event('GET', '/products', {'limit': '100'})),
+        'get_products_fields': ('get_products', lambda: build_event(
+            'GET', '/products', {'limit': '500', 'fields': 'id,name,price'})),
+        'get_item': ('get_item', lambda: build_event('GET', '/item', {'id': str(read_id)})),
+        'get_item_buy': ('get_item', lambda: build_event(
+            'POST', '/item', body=json.dumps({'product_id': sku_id, 'quantity': 1}))),
+        'add_product': ('add_product', new_product),
+        'get_stats': ('get_stats', lambda: build_event('GET', '/stats'))
+    }
+    if full_catalog:
+        cases['get_products_all'] = ('get_products', lambda: build_event('GET', '/products'))
+    return cases
+
+
+def summarize(samples):
+    """p50/p95/media en ms por fase y del total"""
+    if not samples:
+        return None
+    summary = {'invocations': len(samples), 'status_codes': {}, 'phases': {}}
+    for sample in samples:
+        code = str(sample['status'])
+        summary['status_codes'][code] = summary['status_codes'].get(code, 0) + 1
+
+    for key in PHASES + ('total',):
+        values = sorted(s['ms'][key] for s in samples)
+        stats = {
+            'p50': round(percentile(values, 50), 3),
+            'p95': round(percentile(values, 95), 3),
+            'mean': round(sum(values) / len(values), 3)
+        }
+        if key == 'total':
+            summary['total'] = stats
+        else:
+            summary['phases'][key] = stats
+    return summary
+
+
+def run_case(handler_name, make_event, config, timer):
+    """Ejecuta las invocaciones en frío y después las warm sobre el último contenedor"""
+    samples = {'cold': [], 'warm': []}
+    module = None
+
+    for kind, count in (('cold', config.cold), ('warm', config.warm)):
+        for _ in range(count):
+            timer.reset()
+            start = time.perf_counter()
+            if kind == 'cold' or module is None:
+                module = cold_load(handler_name, timer)
+                if kind == 'warm':
+                    # Primera invocación para calentar el contenedor; no se mide
+                    module.lambda_handler(make_event(), None)
+                    timer.reset()
+                    start = time.perf_counter()
+            response = module.lambda_handler(make_event(), None)
+            total = time.perf_counter() - start
+
+            ms = {phase: seconds * 1000 for phase, seconds in timer.totals.items()}
+            ms['handler'] = max(total * 1000 - sum(ms.values()), 0.0)
+            ms['total'] = total * 1000
+            samples[kind].append({'status': response['statusCode'], 'ms': ms})
+
+    return {kind: summarize(values) for kind, values in samples.items()}
+
+
+def compare_with_baseline(results, baseline, max_regression):
+    """Lista de regresiones del p50 total respecto a una ejecución anterior"""
+    regressions = []
+    for case, kinds in results.items():
+        for kind, summary in kinds.items():
+            previous = (baseline.get(case) or {}).get(kind)
+            if not summary or not previous:
+                continue
+            before, after = previous['total']['p50'], summary['total']['p50']
+            if before and after > before * (1 + max_regression):
+                regressions.append(f"{case}/{kind}: p50 {before} ms -> {after} ms")
+    return regressions
+
+
+def log_results(results):
+    header = ' '.join(f"{phase:>9}" for phase in PHASES)
+    logger.info(f"{'caso':<22}{'tipo':<6}{header} {'total':>9}  (p50 ms)")
+    for case, kinds in results.items():
+        for kind, summary in kinds.items():
+            if not summary:
+                continue
+            cols = ' '.join(f"{summary['phases'][phase]['p50']:>9.3f}" for phase in PHASES)
+            logger.info(f"{case:<22}{kind:<6}{cols} {summary['total']['p50']:>9.3f}")
+
+
+def get_config(case_names):
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Desglose por fases de las Lambdas de DP-3')
+
+    parser.add_argument('--cold', type=int, default=5,
+                       help='Invocaciones en frío por caso (default: 5)')
+    parser.add_argument('--warm', type=int, default=50,
+                       help='Invocaciones warm por caso (default: 50)')
+    parser.add_argument('--cases', nargs='+', choices=case_names + ['get_products_all'],
+                       help='Casos a ejecutar (default: todos salvo get_products_all)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+    parser.add_argument('--baseline',
+                       help='Resultados JSON de una ejecución anterior para comparar')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                       help='Empeoramiento máximo del p50 frente al baseline (default: 0.25)')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+    default_cases = ['get_products_page', 'get_products_fields', 'get_item', 'get_item_buy', 'add_product', 'get_stats']
+    config = get_config(default_cases)
+    selected = config.cases or default_cases
+
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute("SELECT CURRENT_TIMESTAMP")
+    started_at = cursor.fetchone()[0]
+    conn.close()
+
+    sku_id, read_id = prepare_fixtures(stock=(config.cold + config.warm + 1) * len(selected) + 1000)
+    cases = build_cases(sku_id, read_id, 'get_products_all' in selected)
+    timer = PhaseTimer()
+    results = {}
+
+    try:
+        for case in selected:
+            handler_name, make_event = cases[case]
+            logger.info(f"⏱️  {case}: {config.cold} en frío + {config.warm} warm ({handler_name})")
+            results[case] = run_case(handler_name, make_event, config, timer)
+    finally:
+        deleted = cleanup_fixtures(started_at)
+        logger.info(f"🧹 {deleted} productos de prueba eliminados")
+
+    log_results(results)
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+    if config.baseline:
+        with open(config.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), config.max_regression)
+        for line in regressions:
+            logger.error(f"❌ Regresión {line}")
+        if regressions:
+            sys.exit(1)
+        logger.info("✅ Sin regresiones frente al baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Payload Benchmark
+=================================
+Compara tamaño y latencia de las respuestas de GET /products según el
+formato (JSON de siempre, JSON sin fechas, compacto columnar) y la
+codificación negociada (identity, gzip, brotli si está instalado).
+
+La Lambda getProducts se invoca en el propio proceso contra PostgreSQL.
+Para cada combinación se reportan:
+  - bytes: tamaño del body tal como sale hacia el cliente
+  - handler p50/p95: consulta + serialización + compresión en la Lambda
+  - cliente p50: descompresión + json.loads en el lado del frontend
+
+Uso:
+    python benchmark_payloads.py [--limits 100 500] [--category Vitaminas]
+                                 [--full] [--iterations 20] [--output payloads.json]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import base64
+import argparse
+import contextlib
+import logging
+
+from bench_common import percentile
+from local_api import build_event, load_handler
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Representaciones a comparar: nombre -> parámetros extra de /products
+FORMATS = {
+    'json': {},
+    'json_sin_fechas': {'fields': 'id,name,category,price,stock'},
+    'compact': {'format': 'compact'}
+}
+
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli else [])
+
+
+def decode_body(response):
+    """Body en bytes tal como viaja y su Content-Encoding"""
+    body = response['body']
+    data = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+    return data, response.get('headers', {}).get('Content-Encoding')
+
+
+def client_decode(data, encoding):
+    """Lo que hace requests en el frontend: descomprimir y parsear"""
+    if encoding == 'br':
+        data = brotli.decompress(data)
+    elif encoding == 'gzip':
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def run_case(module, query, encoding, iterations, warmup):
+    """Invoca la Lambda ``iterations`` veces con un Accept-Encoding dado"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # Sin las líneas de log_pool_stats que la Lambda escribe en cada invocación
+        return _run_case(module, query, encoding, iterations, warmup)
+
+
+def _run_case(module, query, encoding, iterations, warmup):
+    event = build_event('GET', '/products', query, headers={'Accept-Encoding': encoding})
+    for _ in range(warmup):
+        module.lambda_handler(event, None)
+
+    handler_ms = []
+    client_ms = []
+    size = None
+    used = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = module.lambda_handler(event, None)
+        handler_ms.append((time.perf_counter() - start) * 1000)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"{query}: HTTP {response['statusCode']} {response['body']}")
+
+        data, used = decode_body(response)
+        size = len(data)
+        start = time.perf_counter()
+        client_decode(data, used)
+        client_ms.append((time.perf_counter() - start) * 1000)
+
+    handler_ms.sort()
+    client_ms.sort()
+    return {
+        'encoding': used or 'identity',
+        'bytes': size,
+        'handler_p50_ms': round(percentile(handler_ms, 50), 3),
+        'handler_p95_ms': round(percentile(handler_ms, 95), 3),
+        'client_p50_ms': round(percentile(client_ms, 50), 3)
+    }
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Benchmark de tamaño y latencia de los formatos de /products')
+
+    parser.add_argument('--limits', type=int, nargs='+', default=[100, 500],
+                       help='Tamaños de página a medir (default: 100 500)')
+    parser.add_argument('--category',
+                       help='Filtrar por categoría (y catálogo completo de esa categoría con --full)')
+    parser.add_argument('--full', action='store_true',
+                       help='Medir también el catálogo completo sin paginar (requiere --category)')
+    parser.add_argument('--iterations', type=int, default=20,
+                       help='Invocaciones medidas por combinación (default: 20)')
+    parser.add_argument('--warmup', type=int, default=2,
+                       help='Invocaciones de calentamiento (default: 2)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+    if args.full and not args.category:
+        logger.error("❌ --full necesita --category para acotar el catálogo")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    module = load_handler('get_products')
+    if not brotli:
+        logger.warning("⚠️  Módulo brotli no instalado: sólo se mide gzip")
+
+    pages = [('limit', {'limit': str(limit)}) for limit in config.limits]
+    if config.full:
+        pages.append(('completo', {}))
+
+    results = []
+    for page_name, page_params in pages:
+        for fmt, fmt_params in FORMATS.items():
+            query = {**page_params, **fmt_params}
+            if config.category:
+                query['category'] = config.category
+            baseline = None
+            for encoding in ENCODINGS:
+                result = run_case(module, query, encoding, config.iterations, config.warmup)
+                baseline = baseline or result['bytes']
+                result.update({
+                    'page': f"{page_name}={page_params.get('limit', '-')}",
+                    'format': fmt,
+                    'accept': encoding,
+                    'ratio': round(result['bytes'] / baseline, 3)
+                })
+                results.append(result)
+                # Por debajo de COMPRESSION_MIN_SIZE la Lambda responde sin comprimir
+                logger.info(f"📦 {result['page']:<12} {fmt:<16} {encoding:>8} -> {result['encoding']:<8} "
+                            f"{result['bytes']:>10} B ({result['ratio']:.0%})  "
+                            f"handler p50 {result['handler_p50_ms']} ms  p95 {result['handler_p95_ms']} ms  "
+                            f"cliente p50 {result['client_p50_ms']} ms")
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump({'category': config.category, 'results': results}, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
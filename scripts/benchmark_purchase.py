@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Purchase Concurrency Benchmark
+==============================================
+Lanza N compradores en paralelo contra un único SKU y compara el flujo de
+compra anterior (BEGIN + SELECT FOR UPDATE + UPDATE + COMMIT) con la
+sentencia atómica de getItem (UPDATE condicional en autocommit).
+
+Mide throughput, compras aceptadas y rechazadas, y verifica que el stock
+final cuadra con las compras aceptadas y nunca es negativo.
+
+Uso:
+    python benchmark_purchase.py [--buyers 32] [--stock 500] [--attempts 50] [--rtt-ms 1.0]
+
+    Usa las mismas variables de entorno que el resto de scripts:
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import logging
+import psycopg2
+
+from bench_common import connect
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SKU = 'Benchmark SKU (compras concurrentes)'
+
+# Misma sentencia que PURCHASE_QUERY en lambda_src/get_item/main.py
+ATOMIC_PURCHASE = """
+    WITH target AS (
+        SELECT name, stock FROM productos WHERE id = %s
+    ), purchase AS (
+        UPDATE productos
+        SET stock = stock - %s
+        WHERE id = %s AND stock >= %s
+        RETURNING stock
+    )
+    SELECT target.name, target.stock, (SELECT stock FROM purchase) AS purchased_stock
+    FROM target
+"""
+
+
+def round_trip(rtt):
+    """Simula la latencia de red Lambda -> RDS antes de cada sentencia"""
+    if rtt:
+        time.sleep(rtt)
+
+
+def buy_legacy(conn, product_id, quantity, rtt):
+    """Flujo anterior: cuatro viajes de ida y vuelta con el lock de fila tomado"""
+    cursor = conn.cursor()
+    try:
+        round_trip(rtt)
+        cursor.execute("BEGIN")
+        round_trip(rtt)
+        cursor.execute("SELECT id, name, stock FROM productos WHERE id = %s FOR UPDATE", (product_id,))
+        row = cursor.fetchone()
+        if not row:
+            round_trip(rtt)
+            cursor.execute("ROLLBACK")
+            return 404, None
+        if row[2] < quantity:
+            round_trip(rtt)
+            cursor.execute("ROLLBACK")
+            return 409, None
+        new_stock = row[2] - quantity
+        round_trip(rtt)
+        cursor.execute("UPDATE productos SET stock = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                       (new_stock, product_id))
+        round_trip(rtt)
+        cursor.execute("COMMIT")
+        return 200, new_stock
+    finally:
+        cursor.close()
+
+
+def buy_atomic(conn, product_id, quantity, rtt):
+    """Flujo actual: una sentencia en autocommit"""
+    cursor = conn.cursor()
+    try:
+        round_trip(rtt)
+        cursor.execute(ATOMIC_PURCHASE, (product_id, quantity, product_id, quantity))
+        row = cursor.fetchone()
+        if not row:
+            return 404, None
+        if row[2] is None:
+            return 409, None
+        return 200, row[2]
+    finally:
+        cursor.close()
+
+
+FLOWS = {
+    'legacy': buy_legacy,
+    'atomic': buy_atomic
+}
+
+
+def reset_sku(stock):
+    """Crea (o reinicia) el SKU de prueba y devuelve su id"""
+    conn = connect()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM productos WHERE name = %s", (BENCHMARK_SKU,))
+    row = cursor.fetchone()
+    if row:
+        cursor.execute("UPDATE productos SET stock = %s WHERE id = %s", (stock, row[0]))
+        product_id = row[0]
+    else:
+        cursor.execute(
+            "INSERT INTO productos (name, category, price, stock) VALUES (%s, 'Benchmark', 1.00, %s) RETURNING id",
+            (BENCHMARK_SKU, stock)
+        )
+        product_id = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return product_id
+
+
+def read_stock(product_id):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT stock FROM productos WHERE id = %s", (product_id,))
+    stock = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return stock
+
+
+def delete_sku(product_id):
+    conn = connect()
+    conn.autocommit = True
+    conn.cursor().execute("DELETE FROM productos WHERE id = %s", (product_id,))
+    conn.close()
+
+
+def run_flow(flow, config):
+    """Ejecuta un escenario completo y devuelve sus métricas"""
+    product_id = reset_sku(config.stock)
+    buy = FLOWS[flow]
+    rtt = config.rtt_ms / 1000.0
+    counters = {'ok': 0, 'conflict': 0, 'error': 0, 'min_stock_seen': config.stock}
+    lock = threading.Lock()
+    barrier = threading.Barrier(config.buyers)
+
+    def buyer():
+        conn = connect()
+        # El flujo legacy emite BEGIN/COMMIT explícitos, como hacía el handler
+        conn.autocommit = True
+        barrier.wait()
+        for _ in range(config.attempts):
+            try:
+                status, new_stock = buy(conn, product_id, config.quantity, rtt)
+            except psycopg2.Error:
+                conn.rollback()
+                status, new_stock = 500, None
+            with lock:
+                if status == 200:
+                    counters['ok'] += 1
+                    counters['min_stock_seen'] = min(counters['min_stock_seen'], new_stock)
+                elif status == 409:
+                    counters['conflict'] += 1
+                else:
+                    counters['error'] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=buyer) for _ in range(config.buyers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    final_stock = read_stock(product_id)
+    delete_sku(product_id)
+
+    total = counters['ok'] + counters['conflict'] + counters['error']
+    expected_stock = config.stock - counters['ok'] * config.quantity
+    return {
+        'flow': flow,
+        'buyers': config.buyers,
+        'requests': total,
+        'purchases': counters['ok'],
+        'rejected_409': counters['conflict'],
+        'errors': counters['error'],
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(total / elapsed, 1),
+        'purchases_per_second': round(counters['ok'] / elapsed, 1),
+        'initial_stock': config.stock,
+        'final_stock': final_stock,
+        'min_stock_seen': counters['min_stock_seen'],
+        'consistent': final_stock == expected_stock and final_stock >= 0 and counters['min_stock_seen'] >= 0
+    }
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Benchmark de compras concurrentes sobre un SKU')
+
+    parser.add_argument('--buyers', type=int, default=32,
+                       help='Compradores en paralelo (default: 32)')
+    parser.add_argument('--attempts', type=int, default=50,
+                       help='Intentos de compra por comprador (default: 50)')
+    parser.add_argument('--stock', type=int, default=500,
+                       help='Stock inicial del SKU (default: 500)')
+    parser.add_argument('--quantity', type=int, default=1,
+                       help='Unidades por compra (default: 1)')
+    parser.add_argument('--rtt-ms', type=float, default=1.0,
+                       help='Latencia simulada por viaje a la BD en ms (default: 1.0)')
+    parser.add_argument('--flows', nargs='+', choices=list(FLOWS), default=list(FLOWS),
+                       help='Flujos a comparar (default: ambos)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    results = []
+
+    for flow in config.flows:
+        logger.info(f"🛒 {flow}: {config.buyers} compradores x {config.attempts} intentos, stock {config.stock}")
+        result = run_flow(flow, config)
+        results.append(result)
+
+        status = "✅" if result['consistent'] else "❌"
+        logger.info(f"{status} {flow}: {result['requests_per_second']} req/s, "
+                    f"{result['purchases']} compras, {result['rejected_409']} rechazadas (409), "
+                    f"{result['errors']} errores, stock final {result['final_stock']} "
+                    f"(mínimo observado {result['min_stock_seen']}) en {result['seconds']} s")
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+    sys.exit(0 if all(r['consistent'] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
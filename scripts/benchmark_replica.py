@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Read Replica Benchmark
+======================================
+Prueba el enrutado de lecturas de las Lambdas (db_pool.get_read_connection)
+contra una primaria y una réplica locales (ver local_replica.py),
+invocando los handlers en el propio proceso:
+
+1. Carga mixta: lectores (getProducts por página y getItem GET) y
+   compradores (getItem POST sobre un SKU) en paralelo, primero con todas
+   las lecturas en la primaria y después con DB_READ_HOST. Se reporta
+   latencia y throughput de cada tipo y lo que ejecuta la primaria
+   (transacciones y filas leídas por segundo, de pg_stat_database).
+2. Retraso acotado: con la reproducción de WAL pausada en la réplica, un
+   producto recién creado en la primaria no existe en la réplica. Con un
+   DB_REPLICA_MAX_LAG holgado getItem lo lee de la réplica (404); con uno
+   ajustado cae a la primaria y lo encuentra (200).
+3. Réplica caída: con DB_READ_HOST apuntando a un puerto sin servidor las
+   lecturas siguen respondiendo desde la primaria y no se reintenta la
+   réplica hasta DB_REPLICA_RETRY_INTERVAL.
+
+Uso:
+    python benchmark_replica.py [--read-host 127.0.0.1:5433] [--duration 10]
+                                [--readers 4] [--buyers 2] [--output replica.json]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD (primaria)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import logging
+
+from bench_common import connect, summarize
+from local_api import build_event, load_handler
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SKU = 'Benchmark SKU (réplica)'
+BENCHMARK_CATEGORY = 'Benchmark'
+# Puerto sin servidor para simular una réplica caída
+DEAD_REPLICA = '127.0.0.1:1'
+
+PRIMARY_STATS_QUERY = """
+    SELECT xact_commit + xact_rollback, tup_returned + tup_fetched
+    FROM pg_stat_database WHERE datname = current_database()
+"""
+
+
+def connect_replica(read_host):
+    host, _, port = read_host.partition(':')
+    return connect(host, port or os.getenv('DB_PORT', '5432'), autocommit=True)
+
+
+def throughput(latencies, duration):
+    """Peticiones, peticiones por segundo y percentiles de latencia"""
+    if not latencies:
+        return {'requests': 0}
+    return {
+        'requests': len(latencies),
+        'per_second': round(len(latencies) / duration, 1),
+        **summarize(latencies, (50, 95))
+    }
+
+
+def primary_counters():
+    """Transacciones y filas leídas acumuladas por la primaria"""
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute(PRIMARY_STATS_QUERY)
+    counters = cursor.fetchone()
+    conn.close()
+    return counters
+
+
+def prepare_fixtures(stock):
+    """SKU para los compradores y rango de ids para las lecturas"""
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM productos WHERE name = %s", (BENCHMARK_SKU,))
+    cursor.execute(
+        "INSERT INTO productos (name, category, price, stock) VALUES (%s, %s, 1.00, %s) RETURNING id",
+        (BENCHMARK_SKU, BENCHMARK_CATEGORY, stock)
+    )
+    sku_id = cursor.fetchone()[0]
+    cursor.execute("SELECT MIN(id), MAX(id) FROM productos WHERE category <> %s", (BENCHMARK_CATEGORY,))
+    id_range = cursor.fetchone()
+    conn.close()
+    return sku_id, id_range
+
+
+def cleanup_fixtures(started_at):
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM productos WHERE category = %s AND (name = %s OR created_at >= %s)",
+        (BENCHMARK_CATEGORY, BENCHMARK_SKU, started_at)
+    )
+    deleted = cursor.rowcount
+    conn.close()
+    return deleted
+
+
+def run_load(handlers, sku_id, id_range, config):
+    """Lectores y compradores durante ``config.duration`` segundos"""
+    get_products, get_item = handlers
+    stop = threading.Event()
+    reads, purchases, errors = [], [], []
+    lock = threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            if rng.random() < 0.5:
+                event = build_event('GET', '/products', {'limit': '20', 'min_price': str(rng.randint(5, 140))})
+                handler = get_products
+            else:
+                event = build_event('GET', '/item', {'id': str(rng.randint(*id_range))})
+                handler = get_item
+            start = time.perf_counter()
+            status = handler.lambda_handler(event, None)['statusCode']
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (reads if status in (200, 404) else errors).append(elapsed)
+
+    def buyer():
+        body = json.dumps({'product_id': sku_id, 'quantity': 1})
+        while not stop.is_set():
+            start = time.perf_counter()
+            status = get_item.lambda_handler(build_event('POST', '/item', body=body), None)['statusCode']
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (purchases if status == 200 else errors).append(elapsed)
+
+    threads = ([threading.Thread(target=reader, args=(i,)) for i in range(config.readers)]
+               + [threading.Thread(target=buyer) for _ in range(config.buyers)])
+    before = primary_counters()
+    for thread in threads:
+        thread.start()
+    time.sleep(config.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    # pg_stat_database se actualiza como mucho una vez por segundo por backend
+    time.sleep(1.5)
+    after = primary_counters()
+
+    return {
+        'reads': throughput(reads, config.duration),
+        'purchases': throughput(purchases, config.duration),
+        'errors': len(errors),
+        'primary_transactions_per_second': round((after[0] - before[0]) / config.duration, 1),
+        'primary_rows_read_per_second': round((after[1] - before[1]) / config.duration, 1)
+    }
+
+
+def counters_delta(db_pool, before):
+    after = db_pool.get_pool_stats()
+    return {name: after[name] - before[name]
+            for name in ('replica_reads', 'replica_lagging', 'replica_errors', 'primary_fallbacks')}
+
+
+def check_lag_bound(db_pool, get_item, add_product, config):
+    """Producto creado con la réplica pausada: réplica (404) frente a fallback a la primaria (200)"""
+    replica = connect_replica(config.read_host)
+    cursor = replica.cursor()
+    cursor.execute("SELECT pg_wal_replay_pause()")
+    results = {}
+    try:
+        response = add_product.lambda_handler(build_event('POST', '/add', body=json.dumps({
+            'name': f'Benchmark réplica {os.getpid()}', 'category': BENCHMARK_CATEGORY,
+            'price': 1.0, 'stock': 1
+        })), None)
+        product_id = json.loads(response['body'])['product']['id']
+        time.sleep(config.max_lag + 0.5)
+
+        db_pool.REPLICA_LAG_CHECK_INTERVAL = 0
+        event = build_event('GET', '/item', {'id': str(product_id)})
+        for label, max_lag in (('max_lag_3600s', 3600.0), (f'max_lag_{config.max_lag}s', config.max_lag)):
+            db_pool.REPLICA_MAX_LAG = max_lag
+            before = db_pool.get_pool_stats()
+            status = get_item.lambda_handler(event, None)['statusCode']
+            results[label] = {'status': status, **counters_delta(db_pool, before)}
+            logger.info(f"⏸️  Réplica pausada, {label}: getItem {status} {results[label]}")
+    finally:
+        cursor.execute("SELECT pg_wal_replay_resume()")
+        replica.close()
+
+    # Con la réplica al día vuelve a leerse de ella
+    deadline = time.monotonic() + 30
+    before = db_pool.get_pool_stats()
+    while time.monotonic() < deadline:
+        status = get_item.lambda_handler(event, None)['statusCode']
+        delta = counters_delta(db_pool, before)
+        if status == 200 and delta['replica_reads']:
+            break
+        time.sleep(0.2)
+    results['resumed'] = {'status': status, **delta}
+    logger.info(f"▶️  Réplica reanudada: getItem {status} {results['resumed']}")
+    return results
+
+
+def check_replica_down(db_pool, get_products):
+    """Réplica inalcanzable: se sirve desde la primaria y no se reintenta en cada petición"""
+    read_host = db_pool.READ_HOST
+    db_pool.READ_HOST = DEAD_REPLICA
+    event = build_event('GET', '/products', {'limit': '20'})
+    results = {}
+    try:
+        for label in ('first', 'second'):
+            before = db_pool.get_pool_stats()
+            start = time.perf_counter()
+            status = get_products.lambda_handler(event, None)['statusCode']
+            results[label] = {'status': status, 'ms': round((time.perf_counter() - start) * 1000, 3),
+                              **counters_delta(db_pool, before)}
+            logger.info(f"💀 Réplica caída, petición {label}: getProducts {results[label]}")
+    finally:
+        db_pool.READ_HOST = read_host
+        db_pool._local.replica_retry_at = 0.0
+    return results
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Enrutado de lecturas a la réplica: carga, retraso y fallback')
+
+    parser.add_argument('--read-host', default=os.getenv('DB_READ_HOST', '127.0.0.1:5433'),
+                       help='Réplica, host:puerto (default: DB_READ_HOST o 127.0.0.1:5433)')
+    parser.add_argument('--duration', type=float, default=10,
+                       help='Segundos de carga por configuración (default: 10)')
+    parser.add_argument('--readers', type=int, default=4,
+                       help='Hilos lectores (default: 4)')
+    parser.add_argument('--buyers', type=int, default=2,
+                       help='Hilos compradores (default: 2)')
+    parser.add_argument('--max-lag', type=float, default=1.0,
+                       help='DB_REPLICA_MAX_LAG para la prueba de retraso (default: 1)')
+    parser.add_argument('--skip-load', action='store_true',
+                       help='Sólo las pruebas de retraso y réplica caída')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+    os.environ['DB_READ_HOST'] = config.read_host
+    os.environ['DB_CONNECT_ON_INIT'] = 'false'
+
+    replica = connect_replica(config.read_host)
+    cursor = replica.cursor()
+    cursor.execute("SELECT pg_is_in_recovery()")
+    if not cursor.fetchone()[0]:
+        logger.error(f"❌ {config.read_host} no es una réplica (pg_is_in_recovery() = false)")
+        sys.exit(1)
+    replica.close()
+
+    get_products = load_handler('get_products')
+    get_item = load_handler('get_item')
+    add_product = load_handler('add_product')
+    db_pool = sys.modules['db_pool']
+
+    cursor = connect(autocommit=True).cursor()
+    cursor.execute("SELECT now()")
+    started_at = cursor.fetchone()[0]
+    cursor.connection.close()
+
+    results = {'read_host': config.read_host}
+    try:
+        if not config.skip_load:
+            sku_id, id_range = prepare_fixtures(stock=10 ** 7)
+            results['load'] = {}
+            for label, read_host in (('primary_only', ''), ('read_replica', config.read_host)):
+                db_pool.READ_HOST = read_host
+                db_pool.close_all()
+                before = db_pool.get_pool_stats()
+                logger.info(f"🏋️  {label}: {config.readers} lectores + {config.buyers} compradores, "
+                            f"{config.duration:.0f} s")
+                result = run_load((get_products, get_item), sku_id, id_range, config)
+                result['routing'] = counters_delta(db_pool, before)
+                results['load'][label] = result
+                logger.info(f"   lecturas {result['reads']}")
+                logger.info(f"   compras  {result['purchases']}")
+                logger.info(f"   primaria {result['primary_transactions_per_second']} tx/s, "
+                            f"{result['primary_rows_read_per_second']} filas leídas/s, "
+                            f"enrutado {result['routing']}, errores {result['errors']}")
+
+        db_pool.READ_HOST = config.read_host
+        results['lag_bound'] = check_lag_bound(db_pool, get_item, add_product, config)
+        results['replica_down'] = check_replica_down(db_pool, get_products)
+    finally:
+        db_pool.close_all()
+        logger.info(f"🧹 {cleanup_fixtures(started_at)} productos de prueba eliminados")
+
+    lag = results['lag_bound']
+    down = results['replica_down']
+    ok = (lag['max_lag_3600s']['status'] == 404 and lag[f'max_lag_{config.max_lag}s']['status'] == 200
+          and lag['resumed']['status'] == 200
+          and down['first']['status'] == 200 and down['first']['replica_errors'] == 1
+          and down['second']['status'] == 200 and down['second']['replica_errors'] == 0)
+    logger.info("✅ Fallback a la primaria correcto" if ok else "❌ El fallback no se comportó como se esperaba")
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
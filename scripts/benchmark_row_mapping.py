@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Row Mapping Benchmark
+=====================================
+Coste por fila de convertir las filas de ``productos`` a JSON con el código
+anterior de las Lambdas frente a los conversores de data_access:
+
+- indexed:   dict escrito a mano con row[0]..row[6] (getItem / addProduct)
+- per_field: {campo: _to_json_value(campo, valor)} por cada columna (getProducts)
+- mapper:    data_access.product_mapper (dict(zip) y sólo precio y fechas)
+- compact_*: formato compacto de getProducts, por campo frente a compact_mapper
+
+Antes de medir se comprueba que todos producen exactamente el mismo JSON.
+
+Con ``--from-db`` las filas se leen de PostgreSQL y además se compara la
+latencia de la consulta de getItem y de una página de getProducts con
+``cursor.execute`` (PARSE en cada invocación) frente a ``data_access.query``
+(sentencia preparada por conexión: sólo BIND/EXECUTE).
+
+Uso:
+    python benchmark_row_mapping.py [--rows 1000] [--repeat 200]
+    DB_HOST=localhost DB_USER=postgres DB_PASSWORD=postgres \\
+        python benchmark_row_mapping.py --from-db [--queries 2000]
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from bench_common import percentile
+
+# Módulos compartidos de las Lambdas (Lambda layer)
+sys.path.insert(0, str(Path(__file__).parent.parent / 'terraform' / 'lambda_src' / 'common' / 'python'))
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['Vitaminas', 'Omega', 'Proteínas', 'Minerales', 'Antioxidantes', 'Probióticos', 'Energía', 'Inmunidad']
+ITEM_QUERY = "SELECT id, name, category, price, stock, created_at, updated_at FROM productos WHERE id = %s"
+PAGE_QUERY = ("SELECT id, name, category, price, stock, created_at, updated_at FROM productos "
+              "WHERE id > %s ORDER BY id ASC LIMIT %s")
+
+
+def synthetic_row(i):
+    """Fila con los mismos tipos que devuelve el driver de PostgreSQL"""
+    ts = datetime(2024, 1, 1) + timedelta(seconds=i)
+    return (i, f'Producto sintético {i}', CATEGORIES[i % len(CATEGORIES)],
+            Decimal(f'{10 + i % 90}.99'), i % 50, ts, ts)
+
+
+# --- Conversión anterior (copiada de los handlers antes de data_access) ---
+
+def indexed(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'category': row[2],
+        'price': float(row[3]),
+        'stock': row[4],
+        'created_at': row[5].isoformat() if row[5] else None,
+        'updated_at': row[6].isoformat() if row[6] else None
+    }
+
+
+def _to_json_value(field, value):
+    if field == 'price':
+        return float(value)
+    if field in ('created_at', 'updated_at'):
+        return value.isoformat() if value else None
+    return value
+
+
+def _to_compact_value(field, value):
+    if field == 'price':
+        return int(value * 100)
+    return _to_json_value(field, value)
+
+
+def per_field(fields):
+    return lambda row: {field: _to_json_value(field, value) for field, value in zip(fields, row)}
+
+
+def compact_per_field(fields):
+    return lambda row: [_to_compact_value(f, v) for f, v in zip(fields, row)]
+
+
+def per_row_ns(convert, rows, repeat):
+    """Mejor tiempo de ``repeat`` pasadas, en ns por fila"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for row in rows:
+            convert(row)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / len(rows)
+
+
+def bench_mapping(rows, repeat):
+    from data_access import PRODUCT_COLUMNS, product_mapper, compact_mapper
+
+    cases = [
+        ('indexed', indexed),
+        ('per_field', per_field(PRODUCT_COLUMNS)),
+        ('mapper', product_mapper(PRODUCT_COLUMNS)),
+        ('compact_per_field', compact_per_field(PRODUCT_COLUMNS)),
+        ('compact_mapper', compact_mapper(PRODUCT_COLUMNS)),
+    ]
+
+    expected = json.dumps([indexed(row) for row in rows])
+    for name, convert in cases[1:3]:
+        if json.dumps([convert(row) for row in rows]) != expected:
+            logger.error(f"❌ {name} no produce el mismo JSON que indexed")
+            sys.exit(1)
+    if json.dumps([cases[3][1](row) for row in rows]) != json.dumps([cases[4][1](row) for row in rows]):
+        logger.error("❌ compact_mapper no produce el mismo JSON que compact_per_field")
+        sys.exit(1)
+
+    results = {name: per_row_ns(convert, rows, repeat) for name, convert in cases}
+    logger.info(f"🧮 Conversión de {len(rows)} filas (mejor de {repeat} pasadas)")
+    for name, ns in results.items():
+        baseline = results['compact_per_field' if name.startswith('compact') else 'per_field']
+        logger.info(f"   {name:<18} {ns:>8.0f} ns/fila   x{baseline / ns:.2f} frente a "
+                    f"{'compact_per_field' if name.startswith('compact') else 'per_field'}")
+    return results
+
+
+def bench_queries(conn, queries, page_size):
+    from data_access import query, get_statement_stats
+
+    def unprepared(statement, params):
+        cursor = conn.cursor()
+        cursor.execute(statement, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    cases = [
+        ('getItem', ITEM_QUERY, lambda i: (1 + i % 1000,)),
+        ('getProducts page', PAGE_QUERY, lambda i: ((i % 1000) * page_size, page_size)),
+    ]
+    logger.info(f"🗄️  {queries} consultas por caso (autocommit, conexión reutilizada)")
+    for label, statement, make_params in cases:
+        for approach, run in (('cursor.execute', unprepared),
+                              ('data_access.query', lambda s, p: query(conn, s, p))):
+            run(statement, make_params(0))
+            samples = []
+            for i in range(queries):
+                start = time.perf_counter()
+                run(statement, make_params(i))
+                samples.append((time.perf_counter() - start) * 1e6)
+            samples.sort()
+            logger.info(f"   {label:<17} {approach:<18} p50 {percentile(samples, 50):>7.0f} µs  "
+                        f"p95 {percentile(samples, 95):>7.0f} µs")
+    logger.info(f"   sentencias preparadas: {get_statement_stats()}")
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Coste de conversión de filas y de sentencias preparadas')
+
+    parser.add_argument('--rows', type=int, default=1000,
+                       help='Filas a convertir (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=200,
+                       help='Pasadas de conversión; se toma la mejor (default: 200)')
+    parser.add_argument('--from-db', action='store_true',
+                       help='Leer las filas de PostgreSQL y medir también las consultas')
+    parser.add_argument('--queries', type=int, default=2000,
+                       help='Consultas por caso con --from-db (default: 2000)')
+    parser.add_argument('--page-size', type=int, default=20,
+                       help='Filas de la página de getProducts (default: 20)')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    if not config.from_db:
+        rows = [synthetic_row(i) for i in range(1, config.rows + 1)]
+        bench_mapping(rows, config.repeat)
+        return
+
+    from db_pool import get_connection, release_connection
+    conn = get_connection()
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute(PAGE_QUERY, (0, config.rows))
+        rows = cursor.fetchall()
+        cursor.close()
+        bench_mapping(rows, config.repeat)
+        bench_queries(conn, config.queries, config.page_size)
+    finally:
+        conn.autocommit = False
+        release_connection(conn)
+
+
+if __name__ == "__main__":
+    main()
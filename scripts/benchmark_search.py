@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Search Benchmark
+================================
+Mide la latencia de la Lambda searchProducts (tsvector + GIN y, si está
+disponible, pg_trgm) invocándola en el propio proceso contra un PostgreSQL
+con un catálogo grande (100k+ productos; ver setup_database.py --synthetic).
+
+Para cada búsqueda se reportan p50/p95/p99/máx, número de resultados y tipo
+de coincidencia. Con varios valores de --max-candidates se compara el coste
+de puntuar todas las coincidencias frente a una muestra acotada.
+
+Uso:
+    python benchmark_search.py [--iterations 50] [--queries vitamina "omega 3" magneso]
+                               [--max-candidates 1000 1000000] [--explain] [--output search.json]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+from bench_common import connect, summarize
+from local_api import build_event, load_handler
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Búsqueda general, prefijos, varias palabras, inglés, erratas y sin resultados
+DEFAULT_QUERIES = [
+    'vitamina', 'vitam', 'magn', 'vitamina c', 'ginseng rojo',
+    'probiotics', 'magneso', 'vitamna', 'xyzzy'
+]
+
+
+def inspect_database():
+    """Número de productos y si pg_trgm está instalado"""
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM productos")
+    total = cursor.fetchone()[0]
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+    has_trgm = cursor.fetchone()[0]
+    conn.close()
+    return total, has_trgm
+
+
+def explain(module, query, max_candidates, limit, prefix=False):
+    """Plan de la consulta de texto completo tal como la lanza la Lambda"""
+    tsquery = module.build_tsquery(module.parse_terms(query)[1], prefix)
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "EXPLAIN (ANALYZE, BUFFERS, COSTS OFF) " + module.FULLTEXT_QUERY,
+        (tsquery, tsquery, max_candidates, limit)
+    )
+    plan = '\n'.join(row[0] for row in cursor.fetchall())
+    conn.close()
+    return plan
+
+
+def run_query(module, query, limit, iterations, warmup):
+    """Invoca la Lambda ``iterations`` veces y resume las latencias"""
+    event = build_event('GET', '/search', {'q': query, 'limit': str(limit)})
+    for _ in range(warmup):
+        module.lambda_handler(event, None)
+
+    latencies = []
+    body = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = module.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"'{query}': HTTP {response['statusCode']} {response['body']}")
+        body = json.loads(response['body'])
+
+    matches = {}
+    for result in body['results']:
+        matches[result['match']] = matches.get(result['match'], 0) + 1
+
+    return {
+        'query': query,
+        'results': body['count'],
+        'matches': matches,
+        'top': body['results'][0]['name'] if body['results'] else None,
+        **summarize(latencies)
+    }
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Benchmark de la búsqueda de productos')
+
+    parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES,
+                       help='Búsquedas a medir')
+    parser.add_argument('--iterations', type=int, default=50,
+                       help='Invocaciones medidas por búsqueda (default: 50)')
+    parser.add_argument('--warmup', type=int, default=3,
+                       help='Invocaciones de calentamiento por búsqueda (default: 3)')
+    parser.add_argument('--limit', type=int, default=10,
+                       help='Resultados por búsqueda (default: 10)')
+    parser.add_argument('--max-candidates', type=int, nargs='+',
+                       help='Valores de SEARCH_MAX_CANDIDATES a comparar (default: el de la Lambda)')
+    parser.add_argument('--min-rows', type=int, default=100000,
+                       help='Productos mínimos para considerar válida la medida (default: 100000)')
+    parser.add_argument('--explain', action='store_true',
+                       help='Mostrar el plan de la consulta de texto completo')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    total, has_trgm = inspect_database()
+    logger.info(f"🗃️  {total} productos, pg_trgm {'instalado' if has_trgm else 'NO instalado'}")
+    if total < config.min_rows:
+        logger.error(f"❌ Se necesitan al menos {config.min_rows} productos: "
+                     f"python setup_database.py --synthetic {config.min_rows}")
+        sys.exit(1)
+    if not has_trgm:
+        # Sin la extensión sólo se mide la parte de texto completo
+        logger.warning("⚠️  Sin pg_trgm: búsqueda aproximada desactivada (SEARCH_FUZZY=false)")
+        os.environ['SEARCH_FUZZY'] = 'false'
+
+    module = load_handler('search_products')
+    results = []
+
+    for max_candidates in config.max_candidates or [module.MAX_CANDIDATES]:
+        module.MAX_CANDIDATES = max_candidates
+        logger.info(f"🔎 SEARCH_MAX_CANDIDATES={max_candidates}, {config.iterations} iteraciones por búsqueda")
+        for query in config.queries:
+            result = run_query(module, query, config.limit, config.iterations, config.warmup)
+            result['max_candidates'] = max_candidates
+            results.append(result)
+            logger.info(f"  {query!r:<16} {result['results']:>3} resultados {result['matches']}  "
+                        f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+                        f"p99 {result['p99_ms']} ms  máx {result['max_ms']} ms")
+            if config.explain:
+                for prefix in (False, True):
+                    logger.info(explain(module, query, max_candidates, config.limit, prefix))
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump({'products': total, 'pg_trgm': has_trgm, 'results': results}, f, indent=2)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Startup Benchmark
+=================================
+Mide el arranque en frío de las Lambdas y del frontend Flask:
+
+1. Tamaño del paquete: la capa común tal cual la instala pip frente a la
+   capa recortada y con bytecode (build_lambda_layer.py), sin comprimir y
+   en zip, y el zip de cada función (sólo su main.py).
+2. Import de cada handler (``python -X importtime``) desde la capa
+   construida, con PYTHONDONTWRITEBYTECODE como en /opt (sólo lectura) y
+   sin site-packages (-S), de modo que todo sale de la capa: con y sin
+   .pyc en la capa, y los módulos más costosos.
+3. Lambda en frío frente a warm: un proceso nuevo por muestra importa el
+   handler (fase init) y lo invoca; la primera invocación es el tiempo hasta
+   el primer byte de un contenedor nuevo y las siguientes son warm. Se
+   compara DB_CONNECT_ON_INIT=false (conexión en la primera invocación)
+   con DB_CONNECT_ON_INIT=true (conexión y PREPARE en la fase init).
+4. Frontend: gunicorn con un worker apuntando a --api-url, con y sin
+   STARTUP_WARMUP. Se mide el arranque hasta /health/live, el primer GET /
+   (frío) y los siguientes (warm).
+
+Uso:
+    python local_api.py --port 8091 --delay-ms 50 &
+    DB_HOST=localhost DB_USER=postgres DB_PASSWORD=postgres \\
+        python benchmark_startup.py --api-url http://127.0.0.1:8091
+                                    [--samples 5] [--warm 20] [--skip-frontend] [--output startup.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+
+import requests
+
+from bench_common import percentile
+from build_lambda_layer import build_layer
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+LAMBDA_SRC = ROOT / 'terraform' / 'lambda_src'
+APP_DIR = ROOT / 'app'
+
+# Handler y evento AWS_PROXY de cada caso
+LAMBDA_CASES = {
+    'get_products': ('GET', '/products', {'limit': '20'}),
+    'get_item': ('GET', '/item', {'id': '1'}),
+    'search_products': ('GET', '/search', {'q': 'vitamina', 'limit': '10'}),
+    'ping': ('GET', '/ping', None),
+}
+
+# Se ejecuta en un proceso nuevo: sys.path sólo con la capa construida y el handler
+LAMBDA_CHILD = '''
+import importlib.util, json, sys, time, uuid
+layer, handler_dir, method, path, query, warm = sys.argv[1:7]
+sys.path.insert(0, layer)
+
+def event():
+    return {"httpMethod": method, "path": path, "resource": path,
+            "queryStringParameters": json.loads(query), "headers": None, "body": None,
+            "isBase64Encoded": False, "requestContext": {"requestId": str(uuid.uuid4())}}
+
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("main", handler_dir + "/main.py")
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+init = time.perf_counter()
+status = module.lambda_handler(event(), None)["statusCode"]
+first = time.perf_counter()
+warm_ms = []
+for _ in range(int(warm)):
+    t = time.perf_counter()
+    module.lambda_handler(event(), None)
+    warm_ms.append((time.perf_counter() - t) * 1000)
+print("RESULT " + json.dumps({"init_ms": (init - start) * 1000, "first_ms": (first - init) * 1000,
+                              "status": status, "warm_ms": warm_ms}))
+'''
+
+IMPORT_CHILD = '''
+import importlib.util, sys
+sys.path.insert(0, sys.argv[1])
+spec = importlib.util.spec_from_file_location("main", sys.argv[2] + "/main.py")
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+'''
+
+
+def zip_size(directory, workdir):
+    archive = shutil.make_archive(str(Path(workdir) / Path(directory).name), 'zip', directory)
+    size = os.path.getsize(archive)
+    os.remove(archive)
+    return size
+
+
+def measure_packages(workdir):
+    """Capa sin recortar ni compilar frente a la capa de build_lambda_layer.py"""
+    layers = {}
+    for label, trim_files, compile_files in (('pip', False, False), ('optimizada', True, True)):
+        path = Path(workdir) / f'layer_{label}'
+        size = build_layer(path, trim_files=trim_files, compile_files=compile_files)
+        layers[label] = {'path': str(path / 'python'), 'bytes': size, 'zip_bytes': zip_size(path, workdir)}
+        logger.info(f"📦 capa {label:<10} {size / 1024 / 1024:6.2f} MB  zip {layers[label]['zip_bytes'] / 1024 / 1024:6.2f} MB")
+
+    functions = {}
+    for handler in sorted(p.parent.name for p in LAMBDA_SRC.glob('*/main.py')):
+        staging = Path(workdir) / 'functions' / handler
+        staging.mkdir(parents=True)
+        shutil.copy2(LAMBDA_SRC / handler / 'main.py', staging / 'main.py')
+        functions[handler] = zip_size(staging, workdir)
+    logger.info("📦 zip por función: " + ', '.join(f'{name} {size / 1024:.1f} KB' for name, size in functions.items()))
+    return {'layers': layers, 'functions': functions}
+
+
+def measure_imports(layers):
+    """Import de cada handler con -X importtime, sin escribir .pyc (como /opt en Lambda)"""
+    env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1', 'DB_CONNECT_ON_INIT': 'false'}
+    results = {}
+    for handler in LAMBDA_CASES:
+        for label, layer in layers.items():
+            completed = subprocess.run(
+                [sys.executable, '-S', '-X', 'importtime', '-c', IMPORT_CHILD, layer['path'], str(LAMBDA_SRC / handler)],
+                env=env, capture_output=True, text=True, check=True
+            )
+            modules = []
+            for line in completed.stderr.splitlines():
+                if not line.startswith('import time:') or 'cumulative' in line:
+                    continue
+                _, cumulative, name = line[len('import time:'):].split('|')
+                if not name[1:].startswith(' '):
+                    modules.append((name.strip(), int(cumulative) / 1000))
+            modules.sort(key=lambda item: item[1], reverse=True)
+            total = sum(ms for _, ms in modules)
+            results[f'{handler}/{label}'] = {'total_ms': round(total, 1), 'top': modules[:5]}
+            logger.info(f"📥 {handler:<16} capa {label:<10} import {total:7.1f} ms  ("
+                        + ', '.join(f'{name} {ms:.1f}' for name, ms in modules[:4]) + ')')
+    return results
+
+
+def measure_lambdas(layer, samples, warm):
+    """Init + primera invocación (frío) y warm, con y sin conexión en la fase init"""
+    results = {}
+    for handler, (method, path, query) in LAMBDA_CASES.items():
+        for connect_on_init in ('false', 'true'):
+            env = {**os.environ, 'DB_CONNECT_ON_INIT': connect_on_init,
+                   'PYTHONDONTWRITEBYTECODE': '1', 'SLOW_QUERY_MS': '-1', 'TRACING_ENABLED': 'false'}
+            runs = []
+            for _ in range(samples):
+                completed = subprocess.run(
+                    [sys.executable, '-S', '-c', LAMBDA_CHILD, layer, str(LAMBDA_SRC / handler),
+                     method, path, json.dumps(query), str(warm)],
+                    env=env, capture_output=True, text=True, check=True
+                )
+                line = next(l for l in completed.stdout.splitlines() if l.startswith('RESULT '))
+                runs.append(json.loads(line[len('RESULT '):]))
+
+            if any(run['status'] != 200 for run in runs):
+                logger.warning(f"⚠️  {handler}: respuestas {sorted({run['status'] for run in runs})}")
+            init = sorted(run['init_ms'] for run in runs)
+            first = sorted(run['first_ms'] for run in runs)
+            cold = sorted(run['init_ms'] + run['first_ms'] for run in runs)
+            warm_ms = sorted(ms for run in runs for ms in run['warm_ms'])
+            summary = {
+                'init_p50_ms': round(percentile(init, 50), 2),
+                'first_invoke_p50_ms': round(percentile(first, 50), 2),
+                'cold_total_p50_ms': round(percentile(cold, 50), 2),
+                'warm_p50_ms': round(percentile(warm_ms, 50), 2) if warm_ms else None
+            }
+            results[f'{handler}/connect_on_init={connect_on_init}'] = summary
+            logger.info(f"❄️  {handler:<16} init-connect={connect_on_init:<5}  init {summary['init_p50_ms']:7.1f} ms  "
+                        f"1ª invocación {summary['first_invoke_p50_ms']:7.1f} ms  "
+                        f"frío total {summary['cold_total_p50_ms']:7.1f} ms  warm {summary['warm_p50_ms']} ms")
+    return results
+
+
+def measure_frontend(api_url, samples, warm, port):
+    """Arranque de gunicorn y primer GET / con y sin precalentamiento del worker"""
+    results = {}
+    for warmup in ('false', 'true'):
+        ready, first, warm_ms = [], [], []
+        for _ in range(samples):
+            env = {**os.environ, 'API_GATEWAY_URL': api_url, 'PORT': str(port),
+                   'WEB_CONCURRENCY': '1', 'STARTUP_WARMUP': warmup}
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+                cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            url = f'http://127.0.0.1:{port}'
+            try:
+                deadline = time.monotonic() + 30
+                while True:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError('gunicorn no arrancó')
+                    try:
+                        if requests.get(f'{url}/health/live', timeout=1).status_code == 200:
+                            break
+                    except requests.exceptions.RequestException:
+                        time.sleep(0.02)
+                ready.append((time.perf_counter() - start) * 1000)
+
+                session = requests.Session()
+                for i in range(warm + 1):
+                    t = time.perf_counter()
+                    session.get(f'{url}/', timeout=30).raise_for_status()
+                    (first if i == 0 else warm_ms).append((time.perf_counter() - t) * 1000)
+            finally:
+                process.terminate()
+                process.wait(timeout=15)
+
+        summary = {
+            'ready_p50_ms': round(percentile(sorted(ready), 50), 1),
+            'first_request_p50_ms': round(percentile(sorted(first), 50), 1),
+            'warm_p50_ms': round(percentile(sorted(warm_ms), 50), 1) if warm_ms else None
+        }
+        results[f'warmup={warmup}'] = summary
+        logger.info(f"🌐 frontend STARTUP_WARMUP={warmup:<5}  listo {summary['ready_p50_ms']:7.1f} ms  "
+                    f"primer GET / {summary['first_request_p50_ms']:7.1f} ms  warm {summary['warm_p50_ms']} ms")
+    return results
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Arranque en frío de las Lambdas y del frontend')
+
+    parser.add_argument('--api-url', default=os.getenv('API_GATEWAY_URL', ''),
+                       help='API para el frontend (local_api.py o el API Gateway)')
+    parser.add_argument('--samples', type=int, default=5,
+                       help='Arranques en frío por caso (default: 5)')
+    parser.add_argument('--warm', type=int, default=20,
+                       help='Invocaciones/peticiones warm tras cada arranque (default: 20)')
+    parser.add_argument('--port', type=int, default=8095,
+                       help='Puerto del frontend durante la prueba (default: 8095)')
+    parser.add_argument('--skip-lambdas', action='store_true',
+                       help='No medir las Lambdas (no requiere PostgreSQL)')
+    parser.add_argument('--skip-frontend', action='store_true',
+                       help='No medir el frontend')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix='dp3-startup-') as workdir:
+        results['packages'] = measure_packages(workdir)
+        layers = results['packages']['layers']
+        results['imports'] = measure_imports(layers)
+        if not config.skip_lambdas:
+            results['lambdas'] = measure_lambdas(layers['optimizada']['path'], config.samples, config.warm)
+
+    if not config.skip_frontend:
+        if not config.api_url:
+            logger.warning("⚠️  Sin --api-url: se omite el frontend")
+        else:
+            results['frontend'] = measure_frontend(config.api_url, config.samples, config.warm, config.port)
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
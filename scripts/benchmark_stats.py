@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Stats Benchmark
+===============================
+Compara lo que cuesta servir las estadísticas del catálogo recorriendo la
+tabla productos (las consultas de verify_setup y un dashboard sobre
+productos_analytics) con leerlas de las vistas materializadas
+productos_category_stats / productos_low_stock, tal como hace la Lambda
+getStats, y mide el refresco:
+
+- refresco forzado (REFRESH MATERIALIZED VIEW CONCURRENTLY de ambas vistas)
+- refresco sin cambios en el catálogo (sólo compara catalog_version)
+- latencia de las lecturas de las vistas mientras se refrescan
+
+Antes de medir se comprueba que los totales de las vistas coinciden con los
+calculados sobre la tabla base.
+
+Uso:
+    python benchmark_stats.py [--iterations 20] [--base-iterations 5] [--output stats.json]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+
+from bench_common import connect, summarize
+from local_api import build_event, load_handler
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Consultas de verify_setup antes de las vistas
+VERIFY_QUERIES = [
+    "SELECT COUNT(*) FROM productos",
+    """SELECT COUNT(*), COUNT(DISTINCT category), AVG(price)::DECIMAL(10,2), MIN(price), MAX(price)
+       FROM productos"""
+]
+
+# Dashboard equivalente a /stats sobre la vista productos_analytics
+ANALYTICS_QUERIES = [
+    """SELECT category, stock_status, price_category, COUNT(*), SUM(stock), MIN(price), MAX(price), AVG(price)
+       FROM productos_analytics
+       GROUP BY category, stock_status, price_category""",
+    "SELECT id, name, category, price, stock FROM productos WHERE stock < 10 ORDER BY stock, id LIMIT 20"
+]
+
+BASE_TOTALS_QUERY = """
+    SELECT COUNT(*), SUM(stock), COUNT(*) FILTER (WHERE stock = 0), MIN(price), MAX(price),
+           ROUND(AVG(price), 2)
+    FROM productos
+"""
+
+
+def time_queries(cursor, queries, iterations):
+    """Latencia de ejecutar ``queries`` una tras otra (un refresco del dashboard)"""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        for statement, params in queries:
+            cursor.execute(statement, params)
+            cursor.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies, (50, 95))
+
+
+def check_totals(cursor, module):
+    """Los totales que sirve la Lambda coinciden con los de la tabla base"""
+    cursor.execute("SELECT refresh_catalog_stats()")
+    cursor.execute(module.CATEGORY_QUERY)
+    totals, _ = module.summarize(cursor.fetchall())
+    cursor.execute(BASE_TOTALS_QUERY)
+    products, stock, out_of_stock, min_price, max_price, avg_price = cursor.fetchone()
+
+    expected = (products, int(stock), out_of_stock, float(min_price), float(max_price), float(avg_price))
+    actual = (totals['products'], totals['total_stock'], totals['stock_status']['Agotado'],
+              totals['min_price'], totals['max_price'], totals['avg_price'])
+    if expected != actual:
+        logger.error(f"❌ Las vistas no coinciden con la tabla base: {actual} != {expected}")
+        sys.exit(1)
+    logger.info(f"✅ Vistas al día: {products} productos en {totals['categories']} categorías")
+    return products
+
+
+def bench_lambda(module, iterations):
+    """Invocaciones de getStats en el propio proceso (sin If-None-Match)"""
+    event = build_event('GET', '/stats')
+    module.lambda_handler(event, None)
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = module.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"getStats: HTTP {response['statusCode']} {response['body']}")
+    return summarize(latencies, (50, 95))
+
+
+def bench_refresh(cursor, view_queries, iterations):
+    """
+    Refresco forzado, refresco sin cambios y lecturas de las vistas desde
+    otra conexión mientras dura un refresco forzado
+    """
+    forced = []
+    for _ in range(max(1, iterations // 5)):
+        start = time.perf_counter()
+        cursor.execute("SELECT refresh_catalog_stats(TRUE)")
+        forced.append((time.perf_counter() - start) * 1000)
+
+    unchanged = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        cursor.execute("SELECT refresh_catalog_stats()")
+        unchanged.append((time.perf_counter() - start) * 1000)
+
+    done = threading.Event()
+    reader = connect(autocommit=True).cursor()
+    during = []
+
+    def refresh():
+        refresher = connect(autocommit=True)
+        refresher.cursor().execute("SELECT refresh_catalog_stats(TRUE)")
+        refresher.close()
+        done.set()
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    while not done.is_set():
+        start = time.perf_counter()
+        for statement, params in view_queries:
+            reader.execute(statement, params)
+            reader.fetchall()
+        during.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    thread.join()
+    reader.connection.close()
+
+    return {
+        'forced': summarize(forced, (50, 95)),
+        'unchanged': summarize(unchanged, (50, 95)),
+        'reads_during_refresh': {**summarize(during, (50, 95)), 'reads': len(during)}
+    }
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Estadísticas del catálogo: tabla base frente a vistas materializadas')
+
+    parser.add_argument('--iterations', type=int, default=20,
+                       help='Repeticiones de las lecturas de las vistas y de la Lambda (default: 20)')
+    parser.add_argument('--base-iterations', type=int, default=5,
+                       help='Repeticiones de las consultas sobre la tabla base (default: 5)')
+    parser.add_argument('--output',
+                       help='Guardar los resultados en un fichero JSON')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    module = load_handler('get_stats')
+    conn = connect(autocommit=True)
+    cursor = conn.cursor()
+    products = check_totals(cursor, module)
+
+    view_queries = [(module.CATEGORY_QUERY, None), (module.LOW_STOCK_QUERY, (20,))]
+    results = {
+        'products': products,
+        'verify_setup (tabla base)': time_queries(
+            cursor, [(q, None) for q in VERIFY_QUERIES], config.base_iterations),
+        'dashboard productos_analytics': time_queries(
+            cursor, [(q, None) for q in ANALYTICS_QUERIES], config.base_iterations),
+        'dashboard vistas materializadas': time_queries(cursor, view_queries, config.iterations),
+        'lambda getStats': bench_lambda(module, config.iterations)
+    }
+    for name, stats in results.items():
+        if isinstance(stats, dict):
+            logger.info(f"📊 {name:<32} p50 {stats['p50_ms']:>9} ms  p95 {stats['p95_ms']:>9} ms")
+
+    results['refresh'] = bench_refresh(cursor, view_queries, config.iterations)
+    refresh = results['refresh']
+    logger.info(f"🔄 Refresco forzado            p50 {refresh['forced']['p50_ms']} ms")
+    logger.info(f"🔄 Refresco sin cambios        p50 {refresh['unchanged']['p50_ms']} ms")
+    logger.info(f"👀 Lecturas durante el refresco: {refresh['reads_during_refresh']['reads']}, "
+                f"máx {refresh['reads_during_refresh']['max_ms']} ms")
+    conn.close()
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Resultados guardados en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Lambda Layer Build
+==================================
+Construye el directorio de la capa común (terraform/lambda_src/common) tal
+como lo espera Lambda en /opt/python:
+
+1. pip install de common/requirements.txt con ruedas del runtime de Lambda
+   (manylinux2014 x86_64, CPython 3.11), sin compilar a .pyc.
+2. Copia de los módulos compartidos (common/python/*.py).
+3. Recorte: símbolos de depuración de las extensiones nativas (_brotli pasa
+   de ~7 MB a <1 MB), zonas horarias de dateutil (pg8000 sólo usa su
+   parser), scripts de consola y cachés de pip.
+4. Bytecode: /opt es de sólo lectura en Lambda, así que sin .pyc en la capa
+   cada arranque en frío vuelve a compilar pg8000 y sus dependencias. Se
+   compila con un intérprete de la misma versión que el runtime, con
+   invalidación por hash sin comprobar (los zips no conservan los mtime).
+
+Lo usa null_resource.common_layer_build en terraform/main.tf y también
+benchmark_startup.py para medir el tamaño del paquete.
+
+Uso:
+    python build_lambda_layer.py --output ../terraform/build/common_layer
+                                 [--python python3.11] [--no-trim] [--no-compile]
+"""
+
+import os
+import sys
+import glob
+import shutil
+import argparse
+import logging
+import subprocess
+from pathlib import Path
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMMON_DIR = Path(__file__).resolve().parent.parent / 'terraform' / 'lambda_src' / 'common'
+
+# Runtime de las funciones (runtime = "python3.11" en main.tf)
+LAMBDA_PLATFORM = 'manylinux2014_x86_64'
+LAMBDA_PYTHON_VERSION = '3.11'
+
+# Rutas (relativas a python/) que no se usan en tiempo de ejecución
+TRIM_PATTERNS = ('bin', 'dateutil/zoneinfo/*.tar.gz', '**/__pycache__')
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def install_requirements(target):
+    subprocess.run([
+        sys.executable, '-m', 'pip', 'install', '--quiet',
+        '-r', str(COMMON_DIR / 'requirements.txt'),
+        '--target', str(target),
+        '--platform', LAMBDA_PLATFORM,
+        '--implementation', 'cp',
+        '--python-version', LAMBDA_PYTHON_VERSION,
+        '--only-binary=:all:',
+        '--no-compile'
+    ], check=True)
+
+
+def trim(target):
+    """Elimina lo que no se carga en Lambda y quita, si se puede, los símbolos de las extensiones"""
+    for pattern in TRIM_PATTERNS:
+        for path in glob.glob(str(target / pattern), recursive=True):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    strip = shutil.which('strip')
+    if not strip:
+        logger.warning("⚠️  strip no disponible: las extensiones nativas se empaquetan con símbolos")
+        return
+    # Opcional: el strip del host puede no entender la arquitectura de las
+    # ruedas manylinux (p. ej. en macOS); esas bibliotecas se dejan tal cual
+    failed = []
+    for library in target.rglob('*.so'):
+        try:
+            result = subprocess.run([strip, '--strip-unneeded', str(library)], capture_output=True)
+        except OSError:
+            result = None
+        if result is None or result.returncode != 0:
+            failed.append(library.name)
+    if failed:
+        logger.warning(f"⚠️  strip falló en {len(failed)} extensiones (se empaquetan con símbolos): "
+                       f"{', '.join(sorted(failed)[:5])}")
+
+
+def find_interpreter(requested):
+    """Intérprete con la versión del runtime para generar .pyc válidos en Lambda"""
+    if requested:
+        return requested
+    if f'{sys.version_info.major}.{sys.version_info.minor}' == LAMBDA_PYTHON_VERSION:
+        return sys.executable
+    return shutil.which(f'python{LAMBDA_PYTHON_VERSION}')
+
+
+def compile_bytecode(target, interpreter):
+    subprocess.run([
+        interpreter, '-m', 'compileall', '-q', '-j', '0',
+        '--invalidation-mode', 'unchecked-hash', str(target)
+    ], check=True)
+
+
+def build_layer(output, trim_files=True, compile_files=True, interpreter=None):
+    """Construye la capa en ``output`` (se vacía antes) y devuelve su tamaño en bytes"""
+    output = Path(output)
+    target = output / 'python'
+    shutil.rmtree(output, ignore_errors=True)
+    target.mkdir(parents=True)
+
+    install_requirements(target)
+    for module in (COMMON_DIR / 'python').glob('*.py'):
+        shutil.copy2(module, target / module.name)
+
+    if trim_files:
+        trim(target)
+
+    if compile_files:
+        interpreter = find_interpreter(interpreter)
+        if interpreter:
+            compile_bytecode(target, interpreter)
+        else:
+            logger.warning(f"⚠️  Sin python{LAMBDA_PYTHON_VERSION}: la capa se empaqueta sin .pyc "
+                           f"y cada arranque en frío compilará los módulos")
+
+    return directory_size(output)
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Construye la Lambda layer común con sus dependencias')
+
+    parser.add_argument('--output', required=True,
+                       help='Directorio de salida (contendrá python/)')
+    parser.add_argument('--python',
+                       help=f'Intérprete {LAMBDA_PYTHON_VERSION} para compilar los .pyc '
+                            f'(default: el actual si coincide, o python{LAMBDA_PYTHON_VERSION})')
+    parser.add_argument('--no-trim', action='store_true',
+                       help='No recortar ficheros ni símbolos')
+    parser.add_argument('--no-compile', action='store_true',
+                       help='No generar .pyc')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    size = build_layer(config.output, trim_files=not config.no_trim,
+                       compile_files=not config.no_compile, interpreter=config.python)
+    logger.info(f"📦 Capa construida en {config.output}: {size / 1024 / 1024:.2f} MB sin comprimir")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Change Data Capture Consumer
+============================================
+Consume el flujo de cambios de productos (tabla productos_changes, ver
+scripts/init_database.sql) y:
+
+- escribe los cambios en lotes JSONL comprimidos con gzip, un fichero por
+  lote (productos_changes-<txid>-<change_id>.jsonl.gz, la posición de su
+  primer cambio), para cargarlos en analytics sin releer productos_analytics
+  entera
+- avisa al frontend en cuanto los lee (POST /api/cache/invalidate con los
+  ids cambiados) para que no sirva el catálogo cacheado durante el TTL
+
+Sólo se mueven las filas que cambiaron. Cada registro lleva el estado actual
+de la fila, no el de cada cambio intermedio: varios cambios de un producto en
+la misma página llegan como uno, y quien los carga aplica upsert/delete por
+id en el orden de los ficheros y de sus líneas.
+
+    {"change_id": 812, "op": "upsert", "id": 5, "name": "...", "price": 24.99, ...}
+    {"change_id": 813, "op": "delete", "id": 7}
+    {"change_id": 814, "op": "truncate"}
+
+El consumidor sondea productos_changes cada --poll-interval segundos (una
+consulta a pg_current_snapshot() si no hay nada nuevo). Si la base de datos
+tiene activado dp3.productos_changes_notify, los triggers hacen además
+NOTIFY productos_changes y el LISTEN del consumidor lo despierta antes; está
+desactivado por defecto porque serializa los commits. Lee sólo rangos de xid
+cerrados, así que una transacción abierta con escrituras (una carga masiva,
+un refresco de las vistas de estadísticas) retiene los cambios posteriores
+hasta que termina. Su posición se guarda en productos_changes_offsets al
+escribir cada lote: tras una caída se repite, como mucho, el lote en curso
+(entrega al menos una vez; reaplicar un upsert o un delete no cambia nada).
+
+Uso:
+    python cdc_consumer.py [--name analytics] [--output-dir ./changes]
+                           [--invalidate-url http://localhost:8080] [--batch-rows 10000]
+                           [--batch-seconds 60] [--from-beginning] [--once]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+    CACHE_INVALIDATION_TOKEN (el mismo que el frontend)
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import select
+import signal
+import argparse
+import logging
+from pathlib import Path
+
+import psycopg2
+import requests
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'productos_changes'
+
+# Transacciones < xmin ya terminaron: el rango [posición, xmin) no puede recibir más cambios
+SETTLED_QUERY = "SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT"
+
+REGISTER_QUERY = """
+    INSERT INTO productos_changes_offsets (consumer, txid)
+    VALUES (%s, %s::XID8)
+    ON CONFLICT (consumer) DO NOTHING
+"""
+FIRST_CHANGE_QUERY = "SELECT MIN(txid)::TEXT FROM productos_changes"
+OFFSET_QUERY = """
+    SELECT txid::TEXT, range_end::TEXT, change_id
+    FROM productos_changes_offsets
+    WHERE consumer = %s
+"""
+COMMIT_QUERY = """
+    UPDATE productos_changes_offsets
+    SET txid = %s::XID8, range_end = %s::XID8, change_id = %s, updated_at = CURRENT_TIMESTAMP
+    WHERE consumer = %s
+"""
+PRUNE_QUERY = "SELECT prune_productos_changes()"
+
+# Siguiente página en orden (txid, change_id), el del índice idx_productos_changes_txid
+CHANGES_QUERY = """
+    SELECT change_id, op, product_id, txid::TEXT,
+           EXTRACT(EPOCH FROM clock_timestamp() - changed_at) * 1000
+    FROM productos_changes
+    WHERE (txid, change_id) > (%s::XID8, %s) AND txid < %s::XID8
+    ORDER BY txid, change_id
+    LIMIT %s
+"""
+
+PRODUCT_FIELDS = ('id', 'name', 'category', 'price', 'stock', 'created_at', 'updated_at')
+ROWS_QUERY = f"SELECT {', '.join(PRODUCT_FIELDS)} FROM productos WHERE id = ANY(%s)"
+
+
+def to_record(change_id, row):
+    """Registro upsert con el estado actual de la fila"""
+    record = {'change_id': change_id, 'op': 'upsert'}
+    for field, value in zip(PRODUCT_FIELDS, row):
+        if field == 'price':
+            value = float(value)
+        elif field in ('created_at', 'updated_at') and value is not None:
+            value = value.isoformat()
+        record[field] = value
+    return record
+
+
+def http_invalidator(url, token, timeout=2):
+    """
+    POST /api/cache/invalidate del frontend. Un fallo sólo se registra: la
+    caché converge igualmente en CATALOG_CACHE_TTL.
+    """
+    endpoint = f"{url.rstrip('/')}/api/cache/invalidate"
+    session = requests.Session()
+    headers = {'X-Invalidation-Token': token or ''}
+
+    def invalidate(payload):
+        response = session.post(endpoint, json=payload, headers=headers, timeout=timeout)
+        response.raise_for_status()
+
+    invalidate.target = endpoint
+    return invalidate
+
+
+class ChangeConsumer:
+    def __init__(self, name, output_dir=None, invalidators=(), page_size=5000,
+                 batch_rows=10000, batch_seconds=60, poll_interval=0.25,
+                 max_invalidation_ids=500, compress=True):
+        self.name = name
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.invalidators = list(invalidators)
+        self.page_size = page_size
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_seconds
+        self.poll_interval = poll_interval
+        self.max_invalidation_ids = max_invalidation_ids
+        self.compress = compress
+
+        self.connection = None
+        # Posición en memoria; la persistida es la del último lote escrito
+        self.txid = None
+        self.range_end = None
+        self.change_id = 0
+        self.batch = []
+        self.batch_started = None
+        self.batch_position = None
+        self.batch_lag_ms = 0.0
+        self.stopped = False
+        self.stats = {
+            'changes': 0,
+            'records': 0,
+            'files': 0,
+            'bytes': 0,
+            'invalidations': 0,
+            'invalidation_errors': 0,
+            'pruned': 0
+        }
+
+    def connect(self):
+        """Conexión autocommit: cada consulta ve lo confirmado hasta ese momento"""
+        self.connection = psycopg2.connect(
+            host=os.getenv('DB_HOST'),
+            port=os.getenv('DB_PORT', '5432'),
+            database=os.getenv('DB_NAME', 'ecommercedb'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD')
+        )
+        self.connection.autocommit = True
+        self.connection.cursor().execute(f"LISTEN {CHANNEL}")
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def query(self, statement, params=None):
+        cursor = self.connection.cursor()
+        cursor.execute(statement, params)
+        rows = cursor.fetchall() if cursor.description else None
+        cursor.close()
+        return rows
+
+    def load_offset(self, from_beginning=False):
+        """
+        Posición guardada del consumidor. Uno nuevo empieza en los cambios que
+        se confirmen a partir de ahora, o en el más antiguo conservado con
+        ``from_beginning``.
+        """
+        start = self.query(SETTLED_QUERY)[0][0]
+        if from_beginning:
+            start = self.query(FIRST_CHANGE_QUERY)[0][0] or start
+        self.query(REGISTER_QUERY, (self.name, start))
+        self.txid, self.range_end, self.change_id = self.query(OFFSET_QUERY, (self.name,))[0]
+        logger.info(f"📍 Consumidor {self.name}: txid {self.txid}"
+                    + (f", rango hasta {self.range_end} tras el cambio {self.change_id}" if self.range_end else ""))
+
+    def poll(self):
+        """
+        Lee la siguiente página de cambios confirmados, la añade al lote e
+        invalida la caché. Devuelve el número de cambios leídos.
+        """
+        if self.range_end is None:
+            settled = self.query(SETTLED_QUERY)[0][0]
+            if settled == self.txid:
+                return 0
+            self.range_end = settled
+
+        changes = self.query(CHANGES_QUERY, (self.txid, self.change_id, self.range_end, self.page_size))
+        if changes:
+            records, product_ids, truncated = self.to_records(changes)
+            if not self.batch:
+                self.batch_started = time.monotonic()
+                self.batch_position = (changes[0][3], changes[0][0])
+            self.batch.extend(records)
+            self.batch_lag_ms = max(self.batch_lag_ms, max(float(change[4]) for change in changes))
+            self.txid, self.change_id = changes[-1][3], changes[-1][0]
+            self.stats['changes'] += len(changes)
+            self.invalidate(product_ids, truncated)
+
+        if len(changes) < self.page_size:
+            self.txid, self.range_end, self.change_id = self.range_end, None, 0
+        return len(changes)
+
+    def to_records(self, changes):
+        """
+        Registros de una página de cambios, uno por producto (el último
+        cambio de cada uno) en orden de change_id. Un TRUNCATE corta la página:
+        los cambios anteriores se resuelven antes de emitirlo.
+        """
+        records = []
+        pending = {}
+        truncated = False
+
+        def resolve():
+            if not pending:
+                return
+            rows = {row[0]: row for row in self.query(ROWS_QUERY, (list(pending),))}
+            for product_id, change_id in sorted(pending.items(), key=lambda item: item[1]):
+                row = rows.get(product_id)
+                records.append(to_record(change_id, row) if row
+                               else {'change_id': change_id, 'op': 'delete', 'id': product_id})
+            pending.clear()
+
+        for change_id, op, product_id, *_ in changes:
+            if op == 'T':
+                resolve()
+                records.append({'change_id': change_id, 'op': 'truncate'})
+                truncated = True
+            else:
+                pending.pop(product_id, None)
+                pending[product_id] = change_id
+        resolve()
+
+        product_ids = sorted({change[2] for change in changes if change[2] is not None})
+        return records, product_ids, truncated
+
+    def invalidate(self, product_ids, truncated=False):
+        """Avisa a los frontends; con demasiados ids (o un TRUNCATE) se vacía la caché entera"""
+        if not self.invalidators:
+            return
+        if truncated or len(product_ids) > self.max_invalidation_ids:
+            payload = {'all': True}
+        else:
+            payload = {'product_ids': product_ids}
+
+        for invalidate in self.invalidators:
+            try:
+                invalidate(payload)
+                self.stats['invalidations'] += 1
+            except Exception as e:
+                self.stats['invalidation_errors'] += 1
+                logger.warning(f"⚠️  Invalidación fallida en {getattr(invalidate, 'target', invalidate)}: {str(e)}")
+
+    def batch_due(self):
+        return bool(self.batch) and (
+            len(self.batch) >= self.batch_rows
+            or time.monotonic() - self.batch_started >= self.batch_seconds
+        )
+
+    def write_batch(self):
+        """
+        Fichero del lote, nombrado por la posición de su primer cambio para
+        que el orden alfabético sea el de entrega. Se escribe aparte y se
+        renombra para no dejar ficheros a medias.
+        """
+        txid, change_id = self.batch_position
+        suffix = '.jsonl.gz' if self.compress else '.jsonl'
+        path = self.output_dir / f"productos_changes-{int(txid):020d}-{change_id:012d}{suffix}"
+        tmp_path = path.with_name(path.name + '.tmp')
+        data = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                       for record in self.batch).encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(data) if self.compress else data)
+        os.replace(tmp_path, path)
+        self.stats['files'] += 1
+        self.stats['bytes'] += path.stat().st_size
+        return path
+
+    def flush(self):
+        """Escribe el lote, guarda la posición y poda los cambios ya entregados"""
+        path = None
+        if self.batch and self.output_dir:
+            path = self.write_batch()
+
+        self.query(COMMIT_QUERY, (self.txid, self.range_end, self.change_id, self.name))
+        pruned = self.query(PRUNE_QUERY)[0][0]
+        self.stats['pruned'] += pruned
+
+        if self.batch:
+            logger.info(f"📦 {path.name if path else 'Lote'}: {len(self.batch)} registros, "
+                        f"lag máx {self.batch_lag_ms:.0f} ms, {pruned} cambios podados")
+        self.stats['records'] += len(self.batch)
+        self.batch = []
+        self.batch_lag_ms = 0.0
+
+    def wait(self, timeout):
+        """Espera a que venza ``timeout`` o a un NOTIFY (si los triggers lo envían)"""
+        if timeout > 0 and not self.stopped:
+            select.select([self.connection], [], [], timeout)
+        self.connection.poll()
+        self.connection.notifies.clear()
+
+    def run(self, once=False):
+        """
+        Bucle principal. Con ``once`` entrega lo que ya está confirmado y
+        termina (para lanzarlo desde cron o un job programado).
+        """
+        if self.output_dir:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        while not self.stopped:
+            read = self.poll()
+            if self.batch_due():
+                self.flush()
+            if read or self.range_end is not None:
+                continue
+            if once:
+                break
+
+            timeout = self.poll_interval
+            if self.batch:
+                timeout = min(timeout, self.batch_started + self.batch_seconds - time.monotonic())
+            self.wait(timeout)
+
+        self.flush()
+
+    def stop(self, *_):
+        self.stopped = True
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Consumidor del flujo de cambios de productos')
+
+    parser.add_argument('--name', default='analytics',
+                       help='Nombre del consumidor: cada uno guarda su posición (default: analytics)')
+    parser.add_argument('--output-dir',
+                       help='Directorio de los lotes JSONL (sin él sólo se invalida la caché)')
+    parser.add_argument('--no-gzip', action='store_true',
+                       help='Escribir los lotes sin comprimir')
+    parser.add_argument('--invalidate-url', action='append', default=[],
+                       help='URL base de un frontend a invalidar (repetible)')
+    parser.add_argument('--invalidate-token', default=os.getenv('CACHE_INVALIDATION_TOKEN'),
+                       help='Token de invalidación (default: CACHE_INVALIDATION_TOKEN)')
+    parser.add_argument('--max-invalidation-ids', type=int, default=500,
+                       help='Con más ids cambiados se vacía la caché entera (default: 500)')
+    parser.add_argument('--page-size', type=int, default=5000,
+                       help='Cambios leídos por consulta (default: 5000)')
+    parser.add_argument('--batch-rows', type=int, default=10000,
+                       help='Registros por fichero (default: 10000)')
+    parser.add_argument('--batch-seconds', type=float, default=60,
+                       help='Antigüedad máxima de un lote antes de escribirlo (default: 60)')
+    parser.add_argument('--poll-interval', type=float, default=0.25,
+                       help='Segundos entre sondeos sin cambios pendientes (default: 0.25)')
+    parser.add_argument('--from-beginning', action='store_true',
+                       help='Un consumidor nuevo empieza en el cambio más antiguo conservado')
+    parser.add_argument('--once', action='store_true',
+                       help='Entregar lo pendiente y terminar')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+    if not args.output_dir and not args.invalidate_url:
+        logger.error("❌ Indica --output-dir y/o --invalidate-url")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    consumer = ChangeConsumer(
+        config.name,
+        output_dir=config.output_dir,
+        invalidators=[http_invalidator(url, config.invalidate_token) for url in config.invalidate_url],
+        page_size=config.page_size,
+        batch_rows=config.batch_rows,
+        batch_seconds=config.batch_seconds,
+        poll_interval=config.poll_interval,
+        max_invalidation_ids=config.max_invalidation_ids,
+        compress=not config.no_gzip
+    )
+    signal.signal(signal.SIGTERM, consumer.stop)
+    signal.signal(signal.SIGINT, consumer.stop)
+
+    consumer.connect()
+    try:
+        consumer.load_offset(config.from_beginning)
+        consumer.run(once=config.once)
+    finally:
+        consumer.close()
+    logger.info(f"📊 {json.dumps(consumer.stats)}")
+
+
+if __name__ == "__main__":
+    main()
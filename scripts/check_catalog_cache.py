@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Catalog Cache Check
+===================================
+Comprueba que ``CatalogCache`` no guarda valores cargados antes de una
+invalidación: el loader se queda bloqueado, se invalida la caché (como tras
+/add o /buy) y al liberarlo el valor viejo no debe quedar cacheado.
+Casos comprobados:
+  - carga síncrona (miss) con invalidate() mientras el loader está bloqueado
+    -> la llamada devuelve su valor pero no se guarda; la siguiente recarga
+  - refresco en segundo plano (stale) con invalidate() en medio
+    -> el refresco se descarta y la siguiente llamada recarga
+  - invalidación parcial (predicate) mientras carga otra clave -> también se
+    descarta (la generación es de toda la caché)
+  - carga sin invalidaciones -> se guarda y la siguiente llamada es un hit
+
+Uso:
+    python check_catalog_cache.py
+
+Sale con código 1 si algún caso falla.
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(APP_DIR))
+
+from catalog_cache import CatalogCache
+
+
+class BlockingLoader:
+    """Loader que devuelve ``version`` y puede quedarse bloqueado hasta ``release()``"""
+
+    def __init__(self, version):
+        self.version = version
+        self.calls = 0
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def block(self):
+        self.started.clear()
+        self.gate.clear()
+
+    def release(self):
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        value = self.version
+        self.started.set()
+        self.gate.wait(5)
+        return value
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def main():
+    """Función principal"""
+    failures = []
+
+    def check(name, condition, detail):
+        logger.info(f"{'✅' if condition else '❌'} {name}: {detail}")
+        if not condition:
+            failures.append(name)
+
+    # 1. Miss: invalidate() con el loader bloqueado
+    cache = CatalogCache(ttl=60, stale_ttl=300)
+    loader = BlockingLoader('v1')
+    loader.block()
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=cache.get('products', loader)))
+    thread.start()
+    loader.started.wait(5)
+    cache.invalidate()
+    loader.version = 'v2'
+    loader.release()
+    thread.join()
+    value = cache.get('products', loader)
+    check('miss', result.get('value') == 'v1' and value == 'v2' and loader.calls == 2,
+          f"en vuelo={result.get('value')}, siguiente={value}, loader llamado {loader.calls} veces")
+
+    # 2. Stale: el refresco de fondo empieza antes de invalidate() y termina después
+    cache = CatalogCache(ttl=0.05, stale_ttl=300)
+    loader = BlockingLoader('v1')
+    cache.get('products', loader)
+    time.sleep(0.1)
+    loader.block()
+    stale = cache.get('products', loader)
+    loader.started.wait(5)
+    cache.invalidate()
+    loader.version = 'v2'
+    loader.release()
+    wait_until(lambda: not cache._refreshing)
+    value = cache.get('products', loader)
+    check('stale', stale == 'v1' and value == 'v2' and loader.calls == 3,
+          f"stale={stale}, siguiente={value}, loader llamado {loader.calls} veces")
+
+    # 3. Invalidación parcial de otra clave durante la carga
+    cache = CatalogCache(ttl=60, stale_ttl=300)
+    loader = BlockingLoader('v1')
+    loader.block()
+    thread = threading.Thread(target=cache.get, args=(('item', 1), loader))
+    thread.start()
+    loader.started.wait(5)
+    cache.invalidate(lambda key: key == ('item', 2))
+    loader.release()
+    thread.join()
+    check('parcial', cache.stats()['entries'] == 0 and cache.stats()['discarded_loads'] == 1,
+          f"entradas={cache.stats()['entries']}, descartadas={cache.stats()['discarded_loads']}")
+
+    # 4. Sin invalidaciones: se guarda
+    cache = CatalogCache(ttl=60, stale_ttl=300)
+    loader = BlockingLoader('v1')
+    cache.get('products', loader)
+    cache.get('products', loader)
+    stats = cache.stats()
+    check('sin invalidación', loader.calls == 1 and stats['hits'] == 1,
+          f"loader llamado {loader.calls} veces, hits={stats['hits']}")
+
+    logger.info(f"📊 {json.dumps(cache.stats())}")
+    if failures:
+        logger.error(f"❌ Casos fallidos: {', '.join(failures)}")
+        sys.exit(1)
+    logger.info("🎉 Caché del catálogo correcta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Catalog Version Check
+=====================================
+Comprueba contra un PostgreSQL real que ``catalog_version`` (la versión de
+los ETag de las Lambdas) sólo cambia cuando una sentencia modifica filas de
+``productos``. El handler getItem se ejecuta en el propio proceso, como en
+local_api.py. Casos comprobados:
+  - compra rechazada por stock (409) -> mismo ETag en GET /item
+  - UPDATE que no encuentra filas      -> misma versión
+  - compra aceptada (200)              -> ETag nuevo
+El stock de la compra aceptada se repone al terminar.
+
+Uso:
+    python check_catalog_version.py
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+
+Sale con código 1 si algún caso falla.
+"""
+
+import os
+import sys
+import json
+import logging
+
+from local_api import load_handler
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+VERSION_QUERY = "SELECT COALESCE(SUM(version), 0) FROM catalog_version"
+
+
+def main():
+    """Función principal"""
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    get_item = load_handler('get_item')
+    from db_pool import get_connection, release_connection
+    failures = []
+
+    def check(name, condition, detail):
+        logger.info(f"{'✅' if condition else '❌'} {name}: {detail}")
+        if not condition:
+            failures.append(name)
+
+    def invoke(method, **kwargs):
+        response = get_item.lambda_handler({'httpMethod': method, 'headers': {}, **kwargs}, None)
+        return response['statusCode'], response.get('headers', {}), json.loads(response['body'] or '{}')
+
+    def etag(product_id):
+        status, headers, _ = invoke('GET', queryStringParameters={'id': str(product_id)})
+        return headers.get('ETag')
+
+    def buy(product_id, quantity):
+        status, _, _ = invoke('POST', body=json.dumps({'product_id': product_id, 'quantity': quantity}))
+        return status
+
+    conn = get_connection()
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    def version():
+        cursor.execute(VERSION_QUERY)
+        return cursor.fetchone()[0]
+
+    try:
+        cursor.execute("SELECT id, stock FROM productos WHERE stock > 0 ORDER BY id LIMIT 1")
+        product_id, stock = cursor.fetchone()
+
+        # 1. Compra rechazada: el UPDATE condicional no toca ninguna fila
+        before = etag(product_id)
+        status = buy(product_id, stock + 1000)
+        after = etag(product_id)
+        check('compra rechazada', status == 409 and before is not None and after == before,
+              f"HTTP {status}, ETag {before} -> {after}")
+
+        # 2. UPDATE sin filas
+        before = version()
+        cursor.execute("UPDATE productos SET stock = stock WHERE id = -1")
+        after = version()
+        check('UPDATE sin filas', after == before, f"versión {before} -> {after}")
+
+        # 3. Compra aceptada
+        before = etag(product_id)
+        status = buy(product_id, 1)
+        after = etag(product_id)
+        if status == 200:
+            cursor.execute("UPDATE productos SET stock = stock + 1 WHERE id = %s", (product_id,))
+        check('compra aceptada', status == 200 and after != before, f"HTTP {status}, ETag {before} -> {after}")
+    finally:
+        conn.autocommit = False
+        release_connection(conn, discard=True)
+
+    if failures:
+        logger.error(f"❌ Casos fallidos: {', '.join(failures)}")
+        sys.exit(1)
+    logger.info("🎉 La versión del catálogo sólo cambia con escrituras reales")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Data Access Check
+=================================
+Comprueba ``data_access.query`` (capa común de las Lambdas) contra un
+PostgreSQL real con la versión de pg8000 instalada. ``query`` usa piezas no
+públicas de pg8000 (``prepare_statement`` / ``execute_named``), así que esta
+comprobación debe pasar antes de cambiar la versión fijada en
+terraform/lambda_src/common/requirements.txt. Casos comprobados:
+  - la versión instalada es la fijada y tiene el protocolo extendido
+  - SELECT con parámetros: mismas filas que cursor.execute
+  - segunda ejecución: reutiliza la sentencia preparada
+  - sin autocommit abre la transacción: un UPDATE se deshace con rollback
+  - con el límite de sentencias lleno se cierran las menos usadas y una
+    sentencia cerrada se vuelve a preparar
+  - ruta sin protocolo extendido (cursor.execute): mismos resultados
+
+Uso:
+    python check_data_access.py
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+
+Sale con código 1 si algún caso falla.
+"""
+
+import os
+import sys
+import logging
+from importlib.metadata import version
+from pathlib import Path
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMMON_DIR = Path(__file__).resolve().parent.parent / 'terraform' / 'lambda_src' / 'common'
+sys.path.insert(0, str(COMMON_DIR / 'python'))
+
+SELECT_QUERY = "SELECT id, name, price FROM productos WHERE id = ANY(%s) AND price >= %s ORDER BY id"
+STOCK_QUERY = "SELECT stock FROM productos WHERE id = %s"
+UPDATE_QUERY = "UPDATE productos SET stock = stock + %s WHERE id = %s RETURNING stock"
+
+
+def pinned_version():
+    for line in (COMMON_DIR / 'requirements.txt').read_text().splitlines():
+        if line.startswith('pg8000=='):
+            return line.split('==', 1)[1].strip()
+    return None
+
+
+def run_checks(data_access, conn, product_ids):
+    """Casos sobre ``conn`` (sin autocommit); devuelve la lista de fallos"""
+    failures = []
+
+    def check(name, ok, detail=''):
+        logger.info(f"{'✅' if ok else '❌'} {name}{f': {detail}' if detail and not ok else ''}")
+        if not ok:
+            failures.append(name)
+
+    cursor = conn.cursor()
+    cursor.execute(SELECT_QUERY, (product_ids, 0))
+    expected = [list(row) for row in cursor.fetchall()]
+    conn.rollback()
+
+    rows = [list(row) for row in data_access.query(conn, SELECT_QUERY, (product_ids, 0))]
+    check('SELECT con parámetros', rows == expected, f'{rows} != {expected}')
+
+    before = data_access.get_statement_stats()
+    data_access.query(conn, SELECT_QUERY, (product_ids, 0))
+    after = data_access.get_statement_stats()
+    if data_access.PREPARED_STATEMENTS:
+        check('Sentencia reutilizada', after['reused'] == before['reused'] + 1
+              and after['prepared'] == before['prepared'], f'{before} -> {after}')
+    conn.rollback()
+
+    product_id = product_ids[0]
+    stock = data_access.query(conn, STOCK_QUERY, (product_id,))[0][0]
+    updated = data_access.query(conn, UPDATE_QUERY, (5, product_id))[0][0]
+    conn.rollback()
+    restored = data_access.query(conn, STOCK_QUERY, (product_id,))[0][0]
+    conn.rollback()
+    check('UPDATE dentro de transacción deshecho con rollback',
+          updated == stock + 5 and restored == stock, f'{stock} -> {updated} -> {restored}')
+
+    if data_access.PREPARED_STATEMENTS:
+        max_prepared = data_access.MAX_PREPARED
+        data_access.MAX_PREPARED = 2
+        try:
+            before = data_access.get_statement_stats()
+            for offset in range(3):
+                data_access.query(conn, f"SELECT %s::INTEGER + {offset}", (1,))
+            rows = data_access.query(conn, SELECT_QUERY, (product_ids, 0))
+            after = data_access.get_statement_stats()
+            conn.rollback()
+        finally:
+            data_access.MAX_PREPARED = max_prepared
+        check('Sentencias cerradas al superar el límite y preparadas de nuevo',
+              after['evicted'] > before['evicted'] and [list(row) for row in rows] == expected,
+              f'{before} -> {after}')
+
+    return failures
+
+
+def main():
+    """Función principal"""
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    import data_access
+    from db_pool import get_connection, release_connection
+
+    installed, pinned = version('pg8000'), pinned_version()
+    failures = []
+    if installed != pinned:
+        logger.error(f"❌ pg8000 instalado {installed}, fijado {pinned}")
+        failures.append('versión de pg8000')
+    if not data_access.PREPARED_STATEMENTS:
+        logger.error(f"❌ pg8000 {installed} no tiene el protocolo extendido que usa query()")
+        failures.append('protocolo extendido')
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM productos WHERE price > 0 ORDER BY id LIMIT 3")
+        product_ids = [row[0] for row in cursor.fetchall()]
+        conn.rollback()
+
+        logger.info(f"🔎 Sentencias preparadas (pg8000 {installed})")
+        failures += run_checks(data_access, conn, product_ids)
+
+        logger.info("🔎 Ruta sin protocolo extendido (cursor.execute)")
+        data_access.PREPARED_STATEMENTS = False
+        failures += run_checks(data_access, conn, product_ids)
+    finally:
+        release_connection(conn, discard=True)
+
+    if failures:
+        logger.error(f"❌ {len(failures)} comprobaciones fallidas")
+        sys.exit(1)
+    logger.info("🎉 Acceso a datos correcto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Shared Invalidation Check
+=========================================
+Comprueba que ``POST /api/cache/invalidate`` (el aviso de
+scripts/cdc_consumer.py) llega a todos los workers de gunicorn y no sólo al
+que recibe la petición.
+
+Arranca el frontend con ``gunicorn -c gunicorn.conf.py`` y ``--workers``
+procesos contra un backend falso en proceso cuyo ``GET /item`` devuelve la
+versión actual del producto. El access log de gunicorn incluye el pid de
+cada worker, así que se comprueba qué workers tenían la versión vieja en
+caché y que, tras la invalidación, esos mismos workers sirven la nueva.
+Casos comprobados:
+  - {"product_ids": [1]}: ningún worker sirve la versión vieja
+  - {"all": true}: ídem
+  - al menos un worker distinto del que recibió el POST tenía la versión
+    vieja en caché y ha servido la nueva (si no, el caso no prueba nada)
+
+Uso:
+    python check_shared_invalidation.py [--workers 3] [--clients 24]
+
+Sale con código 1 si algún caso falla.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import logging
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+TOKEN = 'check-shared-invalidation'
+
+
+class VersionedBackend(BaseHTTPRequestHandler):
+    """Backend falso: GET /item?id=N devuelve el producto con la versión actual"""
+
+    version = 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/item':
+            product_id = int(parse_qs(url.query).get('id', ['0'])[0])
+            status, body = 200, {'id': product_id, 'name': f'v{self.version}', 'version': self.version}
+        else:
+            status, body = 200, {'status': 'ok'}
+        # Los fallos de caché tardan: las peticiones concurrentes se reparten entre workers
+        time.sleep(0.05)
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_backend():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), VersionedBackend)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_frontend(api_url, port, workers, access_log):
+    env = {
+        **os.environ,
+        'API_GATEWAY_URL': api_url,
+        'PORT': str(port),
+        'WEB_CONCURRENCY': str(workers),
+        # Un worker síncrono atiende una conexión cada vez: el kernel reparte las concurrentes
+        'GUNICORN_WORKER_CLASS': 'sync',
+        'STARTUP_WARMUP': 'false',
+        'CATALOG_CACHE_TTL': '300',
+        'CACHE_INVALIDATION_TOKEN': TOKEN
+    }
+    env.pop('CATALOG_CACHE_SHARED_FILE', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', access_log, '--access-logformat', '%(p)s %(m)s %(U)s',
+         'app:app'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/health/live', timeout=1).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("El frontend no arrancó en 30 segundos")
+
+
+def log_offset(access_log):
+    return os.path.getsize(access_log)
+
+
+def worker_pids(access_log, offset, method, path):
+    """Pids de los workers que atendieron ``method path`` desde ``offset`` del access log"""
+    with open(access_log) as f:
+        f.seek(offset)
+        lines = f.read().split('\n')
+    pids = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 3 and parts[1] == method and parts[2] == path:
+            pids.append(int(parts[0].strip('<>')))
+    return pids
+
+
+def fetch_versions(base_url, clients):
+    """``clients`` GET /api/product/1 a la vez; devuelve las versiones recibidas"""
+    versions = [None] * clients
+    barrier = threading.Barrier(clients)
+
+    def worker(i):
+        barrier.wait()
+        with urllib.request.urlopen(f'{base_url}/api/product/1', timeout=10) as response:
+            versions[i] = json.loads(response.read())['version']
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return versions
+
+
+def invalidate(base_url, body):
+    request = urllib.request.Request(
+        f'{base_url}/api/cache/invalidate', data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'X-Invalidation-Token': TOKEN}, method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Comprueba que la invalidación de la caché llega a todos los workers')
+
+    parser.add_argument('--workers', type=int, default=3,
+                       help='Workers de gunicorn (default: 3)')
+    parser.add_argument('--clients', type=int, default=24,
+                       help='Peticiones concurrentes por ronda (default: 24)')
+    parser.add_argument('--rounds', type=int, default=10,
+                       help='Rondas tras cada invalidación (default: 10)')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    if config.workers < 2:
+        logger.error("❌ Se necesitan al menos 2 workers")
+        sys.exit(1)
+
+    server, api_url = start_backend()
+    access_log = tempfile.NamedTemporaryFile(prefix='gunicorn-access-', suffix='.log', delete=False).name
+    process, base_url = start_frontend(api_url, free_port(), config.workers, access_log)
+    failures = []
+
+    def check(name, condition, detail):
+        logger.info(f"{'✅' if condition else '❌'} {name}: {detail}")
+        if not condition:
+            failures.append(name)
+
+    try:
+        # Versión 1 en la caché de todos los workers posibles
+        offset = log_offset(access_log)
+        for _ in range(config.rounds):
+            fetch_versions(base_url, config.clients)
+        time.sleep(0.2)
+        cached = set(worker_pids(access_log, offset, 'GET', '/api/product/1'))
+        logger.info(f"🗄️  Versión 1 en caché en {len(cached)} de {config.workers} workers")
+
+        for version, body in ((2, {'product_ids': [1]}), (3, {'all': True})):
+            name = 'product_ids' if 'product_ids' in body else 'all'
+            VersionedBackend.version = version
+            offset = log_offset(access_log)
+            invalidate(base_url, body)
+            time.sleep(0.2)
+            posted = set(worker_pids(access_log, offset, 'POST', '/api/cache/invalidate'))
+
+            offset = log_offset(access_log)
+            versions = defaultdict(int)
+            for _ in range(config.rounds):
+                for served in fetch_versions(base_url, config.clients):
+                    versions[served] += 1
+            time.sleep(0.2)
+            served_by = set(worker_pids(access_log, offset, 'GET', '/api/product/1'))
+            others = (cached & served_by) - posted
+
+            check(name, set(versions) == {version},
+                  f"versiones servidas {dict(versions)} (esperada {version}) por {len(served_by)} workers")
+            check(f'{name} (otros workers)', bool(others),
+                  f"{len(others)} workers distintos del que recibió el POST tenían la versión vieja y sirven la nueva")
+            cached = served_by
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        server.shutdown()
+        os.unlink(access_log)
+
+    if failures:
+        logger.error(f"❌ Casos fallidos: {', '.join(failures)}")
+        sys.exit(1)
+    logger.info("🎉 La invalidación llega a todos los workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Single-Flight Check
+===================================
+Comprueba que el frontend agrupa los GET idénticos concurrentes: N hilos
+llamando a la vez a ``make_api_request('GET', '/products')`` deben producir
+una única petición al backend y recibir todos el mismo resultado.
+
+El backend es un servidor HTTP mínimo en proceso que cuenta las peticiones
+recibidas por ruta y tarda ``--delay-ms`` en responder, para que todas las
+llamadas coincidan en vuelo. Casos comprobados:
+  - N llamadas idénticas        -> 1 petición, N-1 agrupadas
+  - N llamadas con parámetros distintos -> N peticiones
+  - N llamadas idénticas que fallan     -> 1 petición, el error llega a todas
+  - 2 llamadas consecutivas             -> 2 peticiones (no es una caché)
+  - la llamada compartida se interrumpe con una BaseException (como
+    gevent.Timeout) -> la recibe quien la hacía y el resto LeaderInterrupted
+
+Uso:
+    python check_singleflight.py [--clients 32] [--delay-ms 300]
+
+Sale con código 1 si algún caso falla.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+
+class CountingBackend(BaseHTTPRequestHandler):
+    """Backend falso: cuenta peticiones por ruta y responde tras un retardo"""
+
+    hits = Counter()
+    lock = threading.Lock()
+    delay = 0.3
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path] += 1
+        time.sleep(self.delay)
+
+        path = urlparse(self.path).path
+        if path == '/fail':
+            status, body = 500, {'error': 'Fallo simulado'}
+        else:
+            status, body = 200, {'path': self.path, 'served_at': time.time()}
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_backend(delay):
+    CountingBackend.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CountingBackend)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def load_app(api_url):
+    """Importa app.py apuntando al backend falso"""
+    os.environ['API_GATEWAY_URL'] = api_url
+    os.environ['API_SINGLEFLIGHT'] = 'true'
+    os.environ['API_POOL_SIZE'] = '64'
+    sys.path.insert(0, str(APP_DIR))
+    import app
+    return app
+
+
+def run_concurrently(clients, call):
+    """Lanza ``call(i)`` en ``clients`` hilos a la vez; devuelve [(resultado, excepción)]"""
+    barrier = threading.Barrier(clients)
+    outcomes = [None] * clients
+
+    def worker(i):
+        barrier.wait()
+        try:
+            outcomes[i] = (call(i), None)
+        except Exception as e:
+            outcomes[i] = (None, e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+class Interrupted(BaseException):
+    """Como gevent.Timeout o GreenletExit: no hereda de Exception"""
+
+
+def upstream_hits(prefix):
+    with CountingBackend.lock:
+        return sum(n for path, n in CountingBackend.hits.items() if path.startswith(prefix))
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Comprueba la agrupación de GET concurrentes del frontend')
+
+    parser.add_argument('--clients', type=int, default=32,
+                       help='Llamadas concurrentes por caso (default: 32)')
+    parser.add_argument('--delay-ms', type=float, default=300,
+                       help='Latencia del backend falso en milisegundos (default: 300)')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    clients = config.clients
+    server, api_url = start_backend(config.delay_ms / 1000.0)
+    app = load_app(api_url)
+    failures = []
+
+    def check(name, condition, detail):
+        logger.info(f"{'✅' if condition else '❌'} {name}: {detail}")
+        if not condition:
+            failures.append(name)
+
+    try:
+        # 1. Llamadas idénticas: una sola petición al backend
+        before = app.inflight.stats()
+        outcomes = run_concurrently(
+            clients, lambda i: app.make_api_request('GET', '/products', params={'limit': 100})
+        )
+        stats = app.inflight.stats()
+        results = [result for result, error in outcomes if error is None]
+        hits = upstream_hits('/products')
+        check('idénticas', hits == 1 and len(results) == clients and all(r == results[0] for r in results),
+              f"{clients} llamadas -> {hits} petición(es) al backend, {len(results)} resultados iguales")
+        coalesced = stats['coalesced'] - before['coalesced']
+        check('métricas', coalesced == clients - 1,
+              f"coalesced={coalesced} (esperado {clients - 1}), executions={stats['executions']}")
+
+        # 2. Parámetros distintos: no se agrupan
+        run_concurrently(clients, lambda i: app.make_api_request('GET', '/item', params={'id': i}))
+        hits = upstream_hits('/item')
+        check('distintas', hits == clients, f"{clients} ids distintos -> {hits} peticiones al backend")
+
+        # 3. Errores: una petición y el mismo error para todos
+        outcomes = run_concurrently(clients, lambda i: app.make_api_request('GET', '/fail'))
+        errors = [error for result, error in outcomes if isinstance(error, app.ApiError)]
+        hits = upstream_hits('/fail')
+        check('errores', hits == 1 and len(errors) == clients and all(e.status_code == 500 for e in errors),
+              f"{clients} llamadas -> {hits} petición(es), {len(errors)} ApiError 500")
+
+        # 4. Consecutivas: al terminar la llamada la clave se libera
+        app.make_api_request('GET', '/ping')
+        app.make_api_request('GET', '/ping')
+        hits = upstream_hits('/ping')
+        check('consecutivas', hits == 2, f"2 llamadas seguidas -> {hits} peticiones")
+
+        # 5. BaseException en la llamada compartida: nadie recibe None como resultado
+        from singleflight import SingleFlight, LeaderInterrupted
+        flight = SingleFlight()
+
+        def interrupted():
+            wait_until = time.monotonic() + 5
+            while flight.stats()['coalesced'] < clients - 1 and time.monotonic() < wait_until:
+                time.sleep(0.01)
+            raise Interrupted()
+
+        outcomes = [None] * clients
+
+        def call(i):
+            try:
+                outcomes[i] = ('result', flight.do('interrupted', interrupted))
+            except BaseException as e:
+                outcomes[i] = ('error', e)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        leaders = sum(isinstance(error, Interrupted) for _, error in outcomes)
+        waiters = sum(isinstance(error, LeaderInterrupted) for _, error in outcomes)
+        check('interrumpida', leaders == 1 and waiters == clients - 1,
+              f"{leaders} Interrupted en quien llamaba, {waiters} LeaderInterrupted de {clients - 1} en espera")
+    finally:
+        server.shutdown()
+
+    logger.info(f"📊 {json.dumps(app.inflight.stats())}")
+    if failures:
+        logger.error(f"❌ Casos fallidos: {', '.join(failures)}")
+        sys.exit(1)
+    logger.info("🎉 Single-flight correcto")
+
+
+if __name__ == "__main__":
+    main()
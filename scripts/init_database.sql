@@ -15,6 +15,18 @@ CREATE TABLE IF NOT EXISTS productos (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Búsqueda de texto completo: nombre (español e inglés) y categoría con pesos
+-- para el ranking. Columna generada, así que INSERT/COPY no necesitan cambios.
+ALTER TABLE productos ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', name), 'A') ||
+        setweight(to_tsvector('english', name), 'B') ||
+        setweight(to_tsvector('spanish', category), 'C')
+    ) STORED;
+
+-- Trigramas para búsqueda tolerante a erratas (disponible en RDS)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Crear función para actualizar updated_at automáticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -31,10 +43,78 @@ CREATE TRIGGER update_productos_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Versión del catálogo para los ETag de las Lambdas: la suma de los contadores.
+-- Cada sentencia que modifica productos incrementa uno de los contadores dentro
+-- de su transacción, así que la versión sólo cambia al confirmarse y nunca se
+-- ve una versión nueva con datos viejos (max(updated_at) no lo garantiza: es la
+-- hora de inicio de la transacción, no la de commit). Los contadores se reparten
+-- por backend para que las compras concurrentes no esperen al mismo lock de fila.
+CREATE TABLE IF NOT EXISTS catalog_version (
+    slot INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalog_version (slot)
+SELECT generate_series(0, 63)
+ON CONFLICT (slot) DO NOTHING;
+
+-- Sólo cuenta si la sentencia cambió alguna fila: una compra rechazada (el
+-- UPDATE condicional de getItem que no encuentra stock) no debe invalidar los
+-- ETag de todo el catálogo
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'TRUNCATE' AND NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+        RETURN NULL;
+    END IF;
+    UPDATE catalog_version SET version = version + 1
+    WHERE slot = pg_backend_pid() % 64;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Una vez por sentencia (no por fila): un COPY de 100k filas cuesta un UPDATE.
+-- Las tablas de transición exigen un trigger por evento
+DROP TRIGGER IF EXISTS bump_productos_catalog_version ON productos;
+
+DROP TRIGGER IF EXISTS bump_productos_catalog_version_inserts ON productos;
+CREATE TRIGGER bump_productos_catalog_version_inserts
+    AFTER INSERT ON productos
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS bump_productos_catalog_version_updates ON productos;
+CREATE TRIGGER bump_productos_catalog_version_updates
+    AFTER UPDATE ON productos
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS bump_productos_catalog_version_deletes ON productos;
+CREATE TRIGGER bump_productos_catalog_version_deletes
+    AFTER DELETE ON productos
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS bump_productos_catalog_version_truncates ON productos;
+CREATE TRIGGER bump_productos_catalog_version_truncates
+    AFTER TRUNCATE ON productos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_catalog_version();
+
 -- Crear índices para mejorar performance
 CREATE INDEX IF NOT EXISTS idx_productos_category ON productos(category);
 CREATE INDEX IF NOT EXISTS idx_productos_name ON productos(name);
 CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos(stock);
+-- Filtro por categoría + rango/orden de precio en /products (el id completa el orden del cursor)
+CREATE INDEX IF NOT EXISTS idx_productos_category_price ON productos(category, price, id);
+-- Orden por precio sin filtro de categoría (sort=price / sort=-price)
+CREATE INDEX IF NOT EXISTS idx_productos_price ON productos(price, id);
+-- /search: texto completo y similitud de trigramas sobre el nombre
+CREATE INDEX IF NOT EXISTS idx_productos_search ON productos USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_productos_name_trgm ON productos USING GIN (name gin_trgm_ops);
 
 -- Insertar datos de prueba si la tabla está vacía
 DO $$
@@ -99,16 +179,202 @@ SELECT
     CURRENT_TIMESTAMP as sync_timestamp
 FROM productos;
 
--- Mostrar estadísticas finales
+-- Agregados del catálogo precalculados para /stats y los dashboards: por
+-- categoría, los mismos tramos de stock y precio que productos_analytics.
+-- Leerlos cuesta una fila por categoría en lugar de recorrer productos.
+-- price_sum permite calcular la media global sin volver a la tabla base.
+CREATE MATERIALIZED VIEW IF NOT EXISTS productos_category_stats AS
+SELECT
+    category,
+    COUNT(*) AS products,
+    SUM(stock) AS total_stock,
+    COUNT(*) FILTER (WHERE stock = 0) AS out_of_stock,
+    COUNT(*) FILTER (WHERE stock > 0 AND stock < 10) AS low_stock,
+    COUNT(*) FILTER (WHERE stock >= 10 AND stock < 30) AS normal_stock,
+    COUNT(*) FILTER (WHERE stock >= 30) AS high_stock,
+    COUNT(*) FILTER (WHERE price < 50) AS economic,
+    COUNT(*) FILTER (WHERE price >= 50 AND price < 200) AS medium,
+    COUNT(*) FILTER (WHERE price >= 200 AND price < 500) AS premium,
+    COUNT(*) FILTER (WHERE price >= 500) AS luxury,
+    MIN(price) AS min_price,
+    MAX(price) AS max_price,
+    SUM(price) AS price_sum
+FROM productos
+GROUP BY category;
+
+-- Productos con stock bajo (< 10, agotados incluidos), los 50 más urgentes de
+-- cada categoría
+CREATE MATERIALIZED VIEW IF NOT EXISTS productos_low_stock AS
+SELECT id, name, category, price, stock
+FROM (
+    SELECT id, name, category, price, stock,
+           ROW_NUMBER() OVER (PARTITION BY category ORDER BY stock, id) AS position
+    FROM productos
+    WHERE stock < 10
+) ranked
+WHERE position <= 50;
+
+-- REFRESH ... CONCURRENTLY necesita un índice único: las lecturas no se
+-- bloquean mientras se recalculan
+CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_category_stats ON productos_category_stats(category);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_low_stock ON productos_low_stock(id);
+CREATE INDEX IF NOT EXISTS idx_productos_low_stock_order ON productos_low_stock(stock, id);
+
+-- Versión del catálogo con la que se calcularon los agregados. No se
+-- mantienen con triggers por fila: las compras concurrentes de una misma
+-- categoría esperarían todas al lock de su fila de agregados (el mismo motivo
+-- por el que catalog_version se reparte en 64 contadores).
+CREATE TABLE IF NOT EXISTS catalog_stats_refresh (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    catalog_version BIGINT NOT NULL DEFAULT -1,
+    refreshed_at TIMESTAMP
+);
+
+INSERT INTO catalog_stats_refresh (id) VALUES (TRUE)
+ON CONFLICT (id) DO NOTHING;
+
+-- Recalcula las vistas si el catálogo cambió desde el último refresco (o con
+-- force). Devuelve TRUE si las recalculó. La fila de catalog_stats_refresh
+-- hace de lock: dos refrescos simultáneos no recorren la tabla dos veces.
+-- La versión se lee antes que los datos, como en los ETag: una escritura
+-- confirmada durante el refresco provoca otro refresco, nunca uno de menos.
+CREATE OR REPLACE FUNCTION refresh_catalog_stats(force BOOLEAN DEFAULT FALSE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    refreshed_version BIGINT;
+    current_version BIGINT;
+BEGIN
+    SELECT catalog_version INTO refreshed_version
+    FROM catalog_stats_refresh
+    FOR UPDATE;
+
+    SELECT COALESCE(SUM(version), 0) INTO current_version FROM catalog_version;
+    IF current_version = refreshed_version AND NOT force THEN
+        RETURN FALSE;
+    END IF;
+
+    REFRESH MATERIALIZED VIEW CONCURRENTLY productos_category_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY productos_low_stock;
+
+    UPDATE catalog_stats_refresh
+    SET catalog_version = current_version, refreshed_at = CURRENT_TIMESTAMP;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_catalog_stats();
+
+-- Flujo de cambios de productos (CDC) para invalidar la caché del frontend y
+-- alimentar analytics sin releer productos_analytics entera (scripts/cdc_consumer.py).
+-- Cada sentencia registra los ids que tocó con el xid de su transacción; un
+-- consumidor lee por rangos de xid ya cerrados, [su posición,
+-- pg_snapshot_xmin(pg_current_snapshot())), que no pueden recibir más filas.
+-- Un watermark sobre updated_at o sobre change_id perdería los cambios de una
+-- transacción larga que confirma después de otra posterior (el mismo problema
+-- de max(updated_at) que resuelve catalog_version), y no vería los DELETE.
+-- Se guardan sólo los ids: el consumidor lee el estado actual de las filas.
+-- Sin clave primaria: sólo se lee por (txid, change_id), y un índice menos
+-- abarata el registro de los UPDATE masivos.
+CREATE TABLE IF NOT EXISTS productos_changes (
+    change_id BIGSERIAL,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    op CHAR(1) NOT NULL CHECK (op IN ('I', 'U', 'D', 'T')),
+    -- NULL en los TRUNCATE
+    product_id INTEGER,
+    changed_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_productos_changes_txid ON productos_changes(txid, change_id);
+
+-- Posición de cada consumidor en orden (txid, change_id): está entregado todo
+-- lo anterior a (txid, change_id). Con range_end el consumidor está a medias
+-- del rango cerrado que termina ahí (un UPDATE masivo se entrega en varios
+-- lotes); sin él, change_id es 0 y el siguiente rango empieza en txid.
+CREATE TABLE IF NOT EXISTS productos_changes_offsets (
+    consumer VARCHAR(100) PRIMARY KEY,
+    txid XID8 NOT NULL,
+    range_end XID8,
+    change_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Una inserción por sentencia con las tablas de transición, como
+-- bump_catalog_version. Los consumidores sondean la tabla en orden de xid.
+-- NOTIFY es opcional (dp3.productos_changes_notify = on, por sesión o con
+-- ALTER DATABASE ... SET): al confirmar toma un lock global de la cola de
+-- notificaciones y serializa los commits de todas las escrituras, justo lo
+-- que evita el reparto de catalog_version en 64 contadores.
+CREATE OR REPLACE FUNCTION record_productos_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO productos_changes (op, product_id) SELECT 'I', id FROM new_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO productos_changes (op, product_id) SELECT 'U', id FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO productos_changes (op, product_id) SELECT 'D', id FROM old_rows;
+    ELSE
+        INSERT INTO productos_changes (op) VALUES ('T');
+    END IF;
+    IF current_setting('dp3.productos_changes_notify', true) IN ('on', 'true', '1') THEN
+        PERFORM pg_notify('productos_changes', '');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Las tablas de transición exigen un trigger por evento
+DROP TRIGGER IF EXISTS record_productos_inserts ON productos;
+CREATE TRIGGER record_productos_inserts
+    AFTER INSERT ON productos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_productos_changes();
+
+DROP TRIGGER IF EXISTS record_productos_updates ON productos;
+CREATE TRIGGER record_productos_updates
+    AFTER UPDATE ON productos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_productos_changes();
+
+DROP TRIGGER IF EXISTS record_productos_deletes ON productos;
+CREATE TRIGGER record_productos_deletes
+    AFTER DELETE ON productos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_productos_changes();
+
+DROP TRIGGER IF EXISTS record_productos_truncates ON productos;
+CREATE TRIGGER record_productos_truncates
+    AFTER TRUNCATE ON productos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_productos_changes();
+
+-- Borra los cambios que ya entregaron todos los consumidores registrados.
+-- Sin consumidores no borra nada: el primero puede empezar desde el principio.
+CREATE OR REPLACE FUNCTION prune_productos_changes()
+RETURNS BIGINT AS $$
+DECLARE
+    pruned BIGINT;
+BEGIN
+    DELETE FROM productos_changes
+    WHERE txid < (SELECT MIN(txid) FROM productos_changes_offsets);
+    GET DIAGNOSTICS pruned = ROW_COUNT;
+    RETURN pruned;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mostrar estadísticas finales (desde los agregados, sin recorrer productos)
 DO $$
 DECLARE
     total_products INTEGER;
     total_categories INTEGER;
     avg_price DECIMAL(10,2);
 BEGIN
-    SELECT COUNT(*), COUNT(DISTINCT category), AVG(price)
+    SELECT SUM(products), COUNT(*), SUM(price_sum) / NULLIF(SUM(products), 0)
     INTO total_products, total_categories, avg_price
-    FROM productos;
+    FROM productos_category_stats;
     
     RAISE NOTICE '=== ESTADÍSTICAS DE LA BASE DE DATOS ===';
     RAISE NOTICE 'Total de productos: %', total_products;
@@ -120,9 +386,9 @@ END $$;
 -- Verificar que todo está correcto
 SELECT 
     'productos' as tabla,
-    COUNT(*) as total_registros,
-    COUNT(DISTINCT category) as categorias_unicas,
-    MIN(price) as precio_minimo,
-    MAX(price) as precio_maximo,
-    AVG(price)::DECIMAL(10,2) as precio_promedio
-FROM productos;
\ No newline at end of file
+    SUM(products) as total_registros,
+    COUNT(*) as categorias_unicas,
+    MIN(min_price) as precio_minimo,
+    MAX(max_price) as precio_maximo,
+    (SUM(price_sum) / NULLIF(SUM(products), 0))::DECIMAL(10,2) as precio_promedio
+FROM productos_category_stats;
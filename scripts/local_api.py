@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Local API Gateway
+=================================
+Sustituto local del API Gateway: un servidor Flask que traduce cada petición
+HTTP a un evento de integración AWS_PROXY y ejecuta el handler de
+terraform/lambda_src en el propio proceso, contra el PostgreSQL indicado en
+las variables de entorno. Permite lanzar las pruebas y la carga de
+test_system.py sin acceso a la nube.
+
+Los handlers se ejecutan en un pool fijo de ``--containers`` hilos: cada hilo
+hace de contenedor Lambda "warm" con sus propias conexiones de db_pool, y el
+tamaño del pool equivale a la concurrencia reservada de la función.
+
+``--delay-ms`` añade a cada petición una latencia fija fuera de ese pool, como
+la del viaje de ida y vuelta al API Gateway real, para medir el frontend con
+tiempos de respuesta realistas.
+
+Uso:
+    python local_api.py [--host 127.0.0.1] [--port 8080] [--containers 8] [--delay-ms 0]
+
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+"""
+
+import os
+import sys
+import base64
+import time
+import uuid
+import argparse
+import importlib.util
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from flask import Flask, request, Response
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+LAMBDA_SRC = Path(__file__).resolve().parent.parent / 'terraform' / 'lambda_src'
+
+# Mismo enrutado que los recursos aws_api_gateway_* de main.tf
+ROUTES = {
+    ('GET', '/products'): 'get_products',
+    ('GET', '/item'): 'get_item',
+    ('POST', '/item'): 'get_item',
+    ('POST', '/add'): 'add_product',
+    ('POST', '/add/bulk'): 'add_product',
+    ('POST', '/checkout'): 'checkout',
+    ('GET', '/search'): 'search_products',
+    ('GET', '/ping'): 'ping',
+    ('GET', '/stats'): 'get_stats'
+}
+
+_handlers = {}
+
+
+def _ensure_layer_path():
+    """Expone la capa común como lo hace /opt/python en Lambda"""
+    layer = str(LAMBDA_SRC / 'common' / 'python')
+    if layer not in sys.path:
+        sys.path.insert(0, layer)
+
+
+def load_handler(name, fresh=False):
+    """
+    Importa terraform/lambda_src/<name>/main.py y devuelve el módulo.
+    Con ``fresh=True`` se importa de nuevo (equivalente a un cold start).
+    """
+    if name in _handlers and not fresh:
+        return _handlers[name]
+
+    _ensure_layer_path()
+    path = LAMBDA_SRC / name / 'main.py'
+    spec = importlib.util.spec_from_file_location(f'lambda_{name}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _handlers[name] = module
+    return module
+
+
+def build_event(method, path, query=None, body=None, headers=None, is_base64=False):
+    """Evento de integración AWS_PROXY como el que recibe cada handler"""
+    return {
+        'httpMethod': method,
+        'path': path,
+        'resource': path,
+        'queryStringParameters': dict(query) if query else None,
+        'headers': dict(headers) if headers else None,
+        'body': body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {'requestId': str(uuid.uuid4())}
+    }
+
+
+def invoke(name, event):
+    """Ejecuta el handler ``name`` con ``event`` y devuelve su respuesta"""
+    return load_handler(name).lambda_handler(event, None)
+
+
+def create_app(containers=8, delay_ms=0):
+    """Aplicación Flask que enruta como el API Gateway del proyecto"""
+    app = Flask(__name__)
+    pool = ThreadPoolExecutor(max_workers=containers, thread_name_prefix='lambda')
+
+    @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
+    def gateway(path):
+        path = '/' + path.rstrip('/')
+        name = ROUTES.get((request.method, path))
+        if not name:
+            return Response('{"message": "Missing Authentication Token"}', status=403,
+                            content_type='application/json')
+
+        # binary_media_types = ["*/*"]: API Gateway entrega todo body en base64
+        raw = request.get_data()
+        body, is_base64 = (base64.b64encode(raw).decode('ascii'), True) if raw else (None, False)
+
+        event = build_event(request.method, path, request.args.to_dict(), body,
+                            dict(request.headers), is_base64)
+        if delay_ms:
+            # Red y API Gateway: no ocupa ningún contenedor
+            time.sleep(delay_ms / 1000.0)
+        try:
+            result = pool.submit(invoke, name, event).result()
+        except Exception as e:
+            # Equivale a un error no controlado de la Lambda
+            logger.error(f"❌ {name}: {e}")
+            return Response('{"message": "Internal server error"}', status=502,
+                            content_type='application/json')
+
+        body = result.get('body') or ''
+        if result.get('isBase64Encoded'):
+            # Respuesta comprimida (Content-Encoding): se devuelve tal cual en binario
+            body = base64.b64decode(body)
+        return Response(body, status=result.get('statusCode', 200),
+                        headers=result.get('headers') or {})
+
+    return app
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='API Gateway local para las Lambdas de DP-3')
+
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='Interfaz de escucha (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080,
+                       help='Puerto de escucha (default: 8080)')
+    parser.add_argument('--containers', type=int, default=8,
+                       help='Contenedores Lambda simulados (default: 8)')
+    parser.add_argument('--delay-ms', type=float, default=0,
+                       help='Latencia añadida a cada petición, en ms (default: 0)')
+
+    args = parser.parse_args()
+
+    if not os.getenv('DB_HOST') or not os.getenv('DB_USER'):
+        logger.error("❌ DB_HOST y DB_USER son requeridos")
+        sys.exit(1)
+
+    return args
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    os.environ.setdefault('DB_NAME', 'ecommercedb')
+
+    for name in sorted(set(ROUTES.values())):
+        load_handler(name)
+
+    logger.info(f"🚀 API local en http://{config.host}:{config.port} ({config.containers} contenedores, "
+                f"+{config.delay_ms} ms por petición)")
+    create_app(config.containers, config.delay_ms).run(host=config.host, port=config.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
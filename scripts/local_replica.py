@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Local Read Replica
+==================================
+Réplica de streaming de un PostgreSQL local para probar el enrutado de
+lecturas de las Lambdas (DB_READ_HOST) sin RDS:
+
+- start:  si el directorio de datos no existe, pg_basebackup desde la
+          primaria con -R (standby.signal + primary_conninfo); después
+          arranca la réplica en --port.
+- stop:   para la réplica.
+- status: si está en recuperación y su retraso (la consulta de db_pool).
+
+La primaria necesita wal_level=replica (el valor por defecto), un hueco
+libre en max_wal_senders y una entrada ``replication`` en pg_hba.conf para
+el usuario indicado.
+
+Uso:
+    python local_replica.py start [--data-dir /tmp/pgdata/replica] [--port 5433]
+                                  [--os-user postgres]
+    python local_replica.py status
+    python local_replica.py stop
+
+    Las Lambdas leen de la réplica con DB_READ_HOST=127.0.0.1:5433
+
+    DB_HOST, DB_PORT, DB_USER, DB_PASSWORD (primaria)
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import logging
+import subprocess
+from pathlib import Path
+
+import psycopg2
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Misma medida de retraso que usan las Lambdas (db_pool.REPLICA_LAG_QUERY)
+sys.path.insert(0, str(Path(__file__).parent.parent / 'terraform' / 'lambda_src' / 'common' / 'python'))
+from db_pool import REPLICA_LAG_QUERY  # noqa: E402
+
+
+def run(command, os_user=None, **kwargs):
+    """Ejecuta un binario de PostgreSQL, como ``os_user`` si se indica (el servidor no arranca como root)"""
+    if os_user:
+        command = ['runuser', '-u', os_user, '--'] + command
+    return subprocess.run(command, check=True, **kwargs)
+
+
+def base_backup(config):
+    """Copia de la primaria con la configuración de standby ya escrita (-R)"""
+    data_dir = Path(config.data_dir)
+    data_dir.mkdir(parents=True)
+    data_dir.chmod(0o700)
+    if config.os_user:
+        shutil.chown(data_dir, config.os_user)
+
+    logger.info(f"📥 pg_basebackup de {config.host}:{config.primary_port} en {data_dir}...")
+    run(['pg_basebackup', '-h', config.host, '-p', str(config.primary_port), '-U', config.user,
+         '-D', str(data_dir), '-R', '-X', 'stream', '-c', 'fast'],
+        config.os_user, env={**os.environ, 'PGPASSWORD': config.password or ''})
+
+
+def start(config):
+    if not Path(config.data_dir, 'PG_VERSION').exists():
+        base_backup(config)
+
+    socket_dir = config.socket_dir or config.data_dir
+    run(['pg_ctl', '-D', config.data_dir, '-l', str(Path(config.data_dir) / 'replica.log'), '-w',
+         '-o', f'-p {config.port} -k {socket_dir}', 'start'], config.os_user)
+    logger.info(f"✅ Réplica en {config.host}:{config.port} (DB_READ_HOST={config.host}:{config.port})")
+    status(config)
+
+
+def stop(config):
+    run(['pg_ctl', '-D', config.data_dir, '-m', 'fast', 'stop'], config.os_user)
+    logger.info("🛑 Réplica parada")
+
+
+def status(config):
+    conn = psycopg2.connect(host=config.host, port=config.port, database=config.database,
+                            user=config.user, password=config.password)
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_is_in_recovery()")
+    in_recovery = cursor.fetchone()[0]
+    cursor.execute(REPLICA_LAG_QUERY)
+    lag = cursor.fetchone()[0]
+    conn.close()
+    logger.info(f"📡 En recuperación: {in_recovery}, retraso: {lag} s")
+    return in_recovery, lag
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Réplica de streaming local de PostgreSQL')
+
+    parser.add_argument('action', choices=['start', 'stop', 'status'])
+    parser.add_argument('--data-dir', default='/tmp/pgdata/replica',
+                       help='Directorio de datos de la réplica (default: /tmp/pgdata/replica)')
+    parser.add_argument('--port', type=int, default=5433,
+                       help='Puerto de la réplica (default: 5433)')
+    parser.add_argument('--socket-dir',
+                       help='Directorio del socket Unix de la réplica (default: el de datos)')
+    parser.add_argument('--os-user',
+                       help='Usuario del sistema con el que ejecutar PostgreSQL (si se lanza como root)')
+    parser.add_argument('--host', default=os.getenv('DB_HOST', '127.0.0.1'),
+                       help='Host de la primaria y de la réplica (default: DB_HOST)')
+    parser.add_argument('--primary-port', type=int, default=int(os.getenv('DB_PORT', '5432')),
+                       help='Puerto de la primaria (default: DB_PORT o 5432)')
+    parser.add_argument('--database', default=os.getenv('DB_NAME', 'ecommercedb'),
+                       help='Base de datos para status (default: ecommercedb)')
+    parser.add_argument('--user', default=os.getenv('DB_USER', 'postgres'),
+                       help='Usuario con permiso de replicación (default: DB_USER)')
+    parser.add_argument('--password', default=os.getenv('DB_PASSWORD'),
+                       help='Contraseña (default: DB_PASSWORD)')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+    try:
+        {'start': start, 'stop': stop, 'status': status}[config.action](config)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"❌ {' '.join(e.cmd)} terminó con código {e.returncode}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
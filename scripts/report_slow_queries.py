@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+DP-3 E-commerce Slow Query Report
+=================================
+Agrega las líneas ``{"slow_query": ...}`` que escriben las Lambdas (ver
+common/python/query_log.py) y muestra las N formas de consulta más costosas.
+
+Las líneas se agrupan por huella (sentencia normalizada, con los parámetros
+como %s), de modo que todas las páginas de /products con los mismos filtros
+cuentan como una sola consulta. Por cada huella se reportan ejecuciones,
+tiempo total, p50/p95/máx, filas medias, funciones que la lanzan, los
+parámetros de la ejecución más lenta y el último plan muestreado.
+
+Acepta cualquier fichero de texto en el que cada línea contenga el JSON
+(con o sin prefijo de CloudWatch): la salida de local_api.py o una
+exportación de CloudWatch Logs, por ejemplo:
+
+    aws logs filter-log-events --log-group-name /aws/lambda/<función> \\
+        --filter-pattern '{ $.slow_query = * }' --query 'events[].message' \\
+        --output text | tr '\\t' '\\n' > slow.log
+
+Uso:
+    python report_slow_queries.py slow.log [otro.log ...] [--top 10]
+                                  [--sort total|p95|max|count] [--plans] [--output report.json]
+    cat slow.log | python report_slow_queries.py -
+"""
+
+import sys
+import json
+import argparse
+import logging
+from collections import defaultdict
+
+from bench_common import percentile
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MARKER = '{"slow_query"'
+SORT_KEYS = ('total', 'p95', 'max', 'count')
+
+
+def read_entries(paths):
+    """Entradas slow_query de los ficheros (``-`` es la entrada estándar)"""
+    skipped = 0
+    for path in paths:
+        handle = sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+        try:
+            for line in handle:
+                start = line.find(MARKER)
+                if start < 0:
+                    continue
+                try:
+                    yield json.loads(line[start:])
+                except ValueError:
+                    skipped += 1
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+    if skipped:
+        logger.warning(f"⚠️  {skipped} líneas slow_query no se pudieron leer")
+
+
+def aggregate(entries):
+    """Agrupa por huella y calcula las estadísticas de cada forma de consulta"""
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[entry['slow_query']].append(entry)
+
+    report = []
+    for shape, items in groups.items():
+        durations = sorted(item['duration_ms'] for item in items)
+        slowest = max(items, key=lambda item: item['duration_ms'])
+        plans = [item['explain'] for item in items if item.get('explain')]
+        rows = [item['rows'] for item in items if item.get('rows') is not None]
+        report.append({
+            'shape': shape,
+            'statement': slowest['statement'],
+            'count': len(items),
+            'total_ms': round(sum(durations), 3),
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p95_ms': round(percentile(durations, 95), 3),
+            'max_ms': round(durations[-1], 3),
+            'avg_rows': round(sum(rows) / len(rows), 1) if rows else None,
+            'functions': sorted({item.get('function') or '-' for item in items}),
+            'slowest_params': slowest.get('params'),
+            'slowest_request_id': slowest.get('request_id'),
+            'plan': plans[-1] if plans else None
+        })
+    return report
+
+
+def get_config():
+    """Obtener configuración desde argumentos"""
+    parser = argparse.ArgumentParser(description='Top N de consultas lentas de las Lambdas')
+
+    parser.add_argument('files', nargs='+',
+                       help='Ficheros de log (- para la entrada estándar)')
+    parser.add_argument('--top', type=int, default=10,
+                       help='Formas de consulta a mostrar (default: 10)')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total',
+                       help='Criterio de orden (default: total, tiempo acumulado)')
+    parser.add_argument('--plans', action='store_true',
+                       help='Mostrar el último plan muestreado de cada consulta')
+    parser.add_argument('--output',
+                       help='Guardar el informe completo en un fichero JSON')
+
+    return parser.parse_args()
+
+
+def main():
+    """Función principal"""
+    config = get_config()
+
+    report = aggregate(read_entries(config.files))
+    if not report:
+        logger.warning("⚠️  No se encontraron líneas slow_query")
+        sys.exit(1)
+
+    sort_field = 'count' if config.sort == 'count' else f'{config.sort}_ms'
+    report.sort(key=lambda shape: shape[sort_field], reverse=True)
+    executions = sum(shape['count'] for shape in report)
+    logger.info(f"🐢 {executions} consultas lentas en {len(report)} formas distintas "
+                f"(top {config.top} por {config.sort})")
+
+    for position, shape in enumerate(report[:config.top], 1):
+        logger.info(f"{position:>2}. [{shape['shape']}] {shape['count']} ejec.  total {shape['total_ms']} ms  "
+                    f"p50 {shape['p50_ms']} ms  p95 {shape['p95_ms']} ms  máx {shape['max_ms']} ms  "
+                    f"filas {shape['avg_rows']}  ({', '.join(shape['functions'])})")
+        logger.info(f"    {shape['statement'][:300]}")
+        logger.info(f"    parámetros más lenta: {shape['slowest_params']} (request_id {shape['slowest_request_id']})")
+        if config.plans and shape['plan']:
+            plan = shape['plan']
+            title = 'EXPLAIN ANALYZE' if plan.get('analyze') else 'EXPLAIN'
+            logger.info(f"    {title}:\n" + '\n'.join(
+                '      ' + line for line in (plan.get('plan') or plan.get('error', '')).splitlines()
+            ))
+
+    if config.output:
+        with open(config.output, 'w', encoding='utf-8') as f:
+            json.dump({'sort': config.sort, 'shapes': report}, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Informe guardado en {config.output}")
+
+
+if __name__ == "__main__":
+    main()
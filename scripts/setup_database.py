@@ -10,15 +10,21 @@ Uso:
     
     O usando variables de entorno:
     DB_HOST=your-host DB_USER=your-user DB_PASSWORD=your-pass python setup_database.py
+
+    Catálogo sintético para pruebas de carga (COPY en paralelo, índices diferidos):
+    python setup_database.py --synthetic 1000000 [--workers 4] [--batch-size 100000]
 """
 
 import os
 import sys
+import time
+import random
 import argparse
 import psycopg2
 from psycopg2 import sql
 import logging
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 # Configurar logging
 logging.basicConfig(
@@ -27,6 +33,69 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Categorías del catálogo base y tipos de producto para los nombres sintéticos
+DEFAULT_CATEGORIES = ['Vitaminas', 'Omega', 'Proteínas', 'Minerales',
+                      'Antioxidantes', 'Probióticos', 'Energía', 'Inmunidad']
+SYNTHETIC_NAMES = ['Cápsulas', 'Comprimidos', 'Polvo', 'Gominolas', 'Líquido', 'Complejo', 'Premium']
+
+
+class SyntheticCatalogStream:
+    """
+    Fichero CSV virtual para COPY FROM STDIN: genera las filas bajo demanda
+    en lugar de materializar el catálogo en memoria.
+    """
+
+    def __init__(self, start, end, categories, seed):
+        self.rows = iter(range(start, end))
+        self.categories = categories
+        self.random = random.Random(seed)
+        self.buffer = ''
+
+    def _line(self, i):
+        category = self.categories[i % len(self.categories)]
+        name = f"{category} {self.random.choice(SYNTHETIC_NAMES)} #{i}"
+        price = round(self.random.uniform(4.99, 149.99), 2)
+        stock = self.random.randint(0, 200)
+        return f"{self._quote(name)},{self._quote(category)},{price:.2f},{stock}\n"
+
+    @staticmethod
+    def _quote(value):
+        """Campo CSV entrecomillado (las categorías vienen de la BD y pueden contener comas)"""
+        return '"' + value.replace('"', '""') + '"'
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else 65536
+        while len(self.buffer) < size:
+            i = next(self.rows, None)
+            if i is None:
+                break
+            self.buffer += self._line(i)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def copy_synthetic_range(conn_params, start, end, categories, batch_size):
+    """
+    Worker (proceso independiente): carga las filas [start, end) con COPY,
+    confirmando cada batch_size filas. Devuelve las filas cargadas.
+    """
+    connection = psycopg2.connect(**conn_params)
+    cursor = connection.cursor()
+    loaded = 0
+    for batch_start in range(start, end, batch_size):
+        batch_end = min(batch_start + batch_size, end)
+        stream = SyntheticCatalogStream(batch_start, batch_end, categories, seed=batch_start)
+        cursor.copy_expert(
+            "COPY productos (name, category, price, stock) FROM STDIN WITH (FORMAT csv)",
+            stream
+        )
+        connection.commit()
+        loaded += batch_end - batch_start
+    cursor.close()
+    connection.close()
+    return loaded
+
+
 class DatabaseSetup:
     def __init__(self, host, port, database, user, password):
         self.host = host
@@ -140,19 +209,17 @@ class DatabaseSetup:
                 logger.error("❌ La tabla 'productos' no fue creada")
                 return False
             
-            # Contar productos
-            cursor.execute("SELECT COUNT(*) FROM productos;")
-            product_count = cursor.fetchone()[0]
-            
-            # Obtener estadísticas
+            # Agregados al día (sólo recorre productos si el catálogo cambió,
+            # p. ej. tras la carga sintética) y estadísticas desde la vista
+            cursor.execute("SELECT refresh_catalog_stats();")
             cursor.execute("""
                 SELECT 
-                    COUNT(*) as total,
-                    COUNT(DISTINCT category) as categories,
-                    AVG(price)::DECIMAL(10,2) as avg_price,
-                    MIN(price) as min_price,
-                    MAX(price) as max_price
-                FROM productos;
+                    SUM(products) as total,
+                    COUNT(*) as categories,
+                    (SUM(price_sum) / NULLIF(SUM(products), 0))::DECIMAL(10,2) as avg_price,
+                    MIN(min_price) as min_price,
+                    MAX(max_price) as max_price
+                FROM productos_category_stats;
             """)
             
             stats = cursor.fetchone()
@@ -174,7 +241,92 @@ class DatabaseSetup:
             logger.error(f"❌ Error verificando configuración: {e}")
             return False
     
-    def setup_database(self):
+    def get_secondary_indexes(self):
+        """Índices de productos que no respaldan la PK ni restricciones UNIQUE"""
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = 'productos'::regclass
+              AND NOT x.indisprimary
+              AND NOT x.indisunique
+            ORDER BY i.relname;
+        """)
+        indexes = cursor.fetchall()
+        cursor.close()
+        return indexes
+    
+    def load_synthetic_catalog(self, total_rows, workers=4, batch_size=100000):
+        """
+        Cargar un catálogo sintético de total_rows productos con COPY FROM STDIN
+        desde varios procesos en paralelo. Los índices secundarios se eliminan
+        antes de la carga y se reconstruyen al final.
+        """
+        try:
+            cursor = self.connection.cursor()
+            
+            cursor.execute("SELECT DISTINCT category FROM productos ORDER BY category;")
+            categories = [row[0] for row in cursor.fetchall()] or DEFAULT_CATEGORIES
+            
+            # Diferir índices: se reconstruyen una sola vez tras la carga
+            indexes = self.get_secondary_indexes()
+            for index_name, _ in indexes:
+                cursor.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(index_name)))
+            logger.info(f"🗂️  Índices diferidos: {', '.join(name for name, _ in indexes) or 'ninguno'}")
+            
+            conn_params = {
+                'host': self.host,
+                'port': self.port,
+                'database': self.database,
+                'user': self.user,
+                'password': self.password
+            }
+            
+            # Rangos de ids sintéticos a partir del máximo actual
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM productos;")
+            first = cursor.fetchone()[0] + 1
+            workers = max(1, min(workers, total_rows))
+            step = -(-total_rows // workers)
+            ranges = [(first + i, min(first + i + step, first + total_rows))
+                      for i in range(0, total_rows, step)]
+            
+            logger.info(f"🚚 Cargando {total_rows} productos sintéticos con {len(ranges)} workers...")
+            load_start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(copy_synthetic_range, conn_params, start, end, categories, batch_size)
+                           for start, end in ranges]
+                loaded = sum(f.result() for f in futures)
+            load_seconds = time.perf_counter() - load_start
+            
+            index_start = time.perf_counter()
+            for _, index_def in indexes:
+                cursor.execute(index_def)
+            cursor.execute("ANALYZE productos;")
+            index_seconds = time.perf_counter() - index_start
+            
+            cursor.execute("""
+                SELECT pg_size_pretty(pg_relation_size('productos')),
+                       pg_size_pretty(pg_indexes_size('productos')),
+                       pg_size_pretty(pg_total_relation_size('productos'));
+            """)
+            table_size, index_size, total_size = cursor.fetchone()
+            cursor.close()
+            
+            logger.info("=" * 50)
+            logger.info("🚚 CARGA SINTÉTICA")
+            logger.info("=" * 50)
+            logger.info(f"📦 Filas cargadas: {loaded} en {load_seconds:.2f} s ({loaded / load_seconds:,.0f} filas/s)")
+            logger.info(f"🗂️  Reconstrucción de índices + ANALYZE: {index_seconds:.2f} s")
+            logger.info(f"💾 Tamaño: tabla {table_size}, índices {index_size}, total {total_size}")
+            logger.info("=" * 50)
+            return True
+            
+        except psycopg2.Error as e:
+            logger.error(f"❌ Error en la carga sintética: {e}")
+            return False
+    
+    def setup_database(self, synthetic_rows=0, workers=4, batch_size=100000):
         """Ejecutar setup completo de la base de datos"""
         logger.info("🚀 Iniciando configuración de base de datos DP-3...")
         
@@ -193,6 +345,9 @@ class DatabaseSetup:
         if not self.execute_sql_file(sql_file):
             return False
         
+        if synthetic_rows and not self.load_synthetic_catalog(synthetic_rows, workers, batch_size):
+            return False
+        
         if not self.verify_setup():
             return False
         
@@ -214,6 +369,12 @@ def get_db_config():
                        help='PostgreSQL user (default: DB_USER env var)')
     parser.add_argument('--password', default=os.getenv('DB_PASSWORD'), 
                        help='PostgreSQL password (default: DB_PASSWORD env var)')
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                       help='Añadir N productos sintéticos para pruebas de carga')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Conexiones COPY en paralelo para --synthetic (default: 4)')
+    parser.add_argument('--batch-size', type=int, default=100000,
+                       help='Filas por COPY/commit en cada worker (default: 100000)')
     
     args = parser.parse_args()
     
@@ -245,7 +406,11 @@ def main():
             password=config.password
         )
         
-        success = setup.setup_database()
+        success = setup.setup_database(
+            synthetic_rows=config.synthetic,
+            workers=config.workers,
+            batch_size=config.batch_size
+        )
         sys.exit(0 if success else 1)
         
     except KeyboardInterrupt:
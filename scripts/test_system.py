@@ -7,21 +7,33 @@ Script para probar todos los componentes del sistema:
 - Funciones Lambda (vía API Gateway)
 - Frontend Flask
 - Integración completa
+- Carga concurrente (--load) con latencias p50/p95/p99 por endpoint
 
 Uso:
     python test_system.py [--api-url API_GATEWAY_URL] [--frontend-url FRONTEND_URL]
+    python test_system.py --load --api-url URL [--workers 16] [--duration 30] [--rate 200]
+                          [--mix products=50,item_get=30,item_post=15,add=5] [--report load.json]
+
+    Para probar sin AWS, levantar antes el API local contra un PostgreSQL local:
+    python local_api.py --port 8080
 """
 
 import os
 import sys
 import argparse
 import requests
-import psycopg2
 import json
+import math
+import random
+import threading
 import time
 import logging
+from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
 
+from bench_common import connect, percentile
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,13 +52,7 @@ class SystemTester:
         logger.info("🗃️  Probando conectividad con PostgreSQL...")
         
         try:
-            conn = psycopg2.connect(
-                host=os.getenv('DB_HOST'),
-                port=os.getenv('DB_PORT', '5432'),
-                database=os.getenv('DB_NAME', 'ecommercedb'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD')
-            )
+            conn = connect()
             
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM productos;")
@@ -250,6 +256,286 @@ class SystemTester:
             logger.warning("⚠️  ALGUNAS PRUEBAS FALLARON. Revisar logs para detalles")
             return False
 
+DEFAULT_MIX = 'products=50,item_get=30,item_post=15,add=5'
+# Límites superiores (ms) de los cubos del histograma de latencias
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+LOAD_CATEGORY = 'LoadTest'
+
+
+def parse_mix(text):
+    """Convierte 'products=50,item_get=30' en {'products': 50.0, 'item_get': 30.0}"""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in LoadTester.ENDPOINTS:
+            raise ValueError(f"endpoint desconocido en --mix: {name} "
+                             f"(válidos: {', '.join(LoadTester.ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"peso negativo en --mix: {part}")
+    if not any(mix.values()):
+        raise ValueError("--mix no tiene ningún endpoint con peso > 0")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+class RateLimiter:
+    """Reparte huecos de salida equiespaciados entre todos los workers"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LoadTester:
+    """
+    Generador de carga concurrente contra el API (API Gateway o local_api.py).
+
+    Cada worker es un hilo con su propia ``requests.Session`` (keep-alive) que
+    elige el endpoint según los pesos de ``mix``. Se para al cumplirse
+    ``duration`` segundos o ``total_requests`` peticiones, lo que llegue antes.
+    """
+
+    ENDPOINTS = ('products', 'item_get', 'item_post', 'add')
+
+    def __init__(self, api_gateway_url, workers=8, duration=30, total_requests=None,
+                 rate=0, mix=None, products_limit=100, timeout=30, seed=None):
+        self.api_gateway_url = api_gateway_url.rstrip('/')
+        self.workers = workers
+        self.duration = duration
+        self.total_requests = total_requests
+        self.rate = rate
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.products_limit = products_limit
+        self.timeout = timeout
+        self.seed = seed
+        self.product_ids = []
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._results = {name: {'latencies': [], 'statuses': Counter(), 'exceptions': Counter()}
+                         for name in self.mix}
+
+    def sample_product_ids(self):
+        """Ids reales para /item; se piden sólo los ids para no medir de más"""
+        response = requests.get(
+            f"{self.api_gateway_url}/products",
+            params={'limit': 500, 'fields': 'id'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        products = data.get('products', []) if isinstance(data, dict) else data
+        self.product_ids = [p['id'] for p in products]
+        if not self.product_ids:
+            raise RuntimeError("el catálogo está vacío; no hay ids para /item")
+
+    def _build_request(self, endpoint, rng):
+        """(método, ruta, params, json) para una petición del endpoint"""
+        if endpoint == 'products':
+            return 'GET', '/products', {'limit': self.products_limit}, None
+        if endpoint == 'item_get':
+            return 'GET', '/item', {'id': rng.choice(self.product_ids)}, None
+        if endpoint == 'item_post':
+            return 'POST', '/item', None, {'product_id': rng.choice(self.product_ids), 'quantity': 1}
+        return 'POST', '/add', None, {
+            'name': f"Load Test {rng.getrandbits(48):012x}",
+            'category': LOAD_CATEGORY,
+            'price': round(rng.uniform(1, 500), 2),
+            'stock': rng.randint(1, 1000)
+        }
+
+    def _next_ticket(self, deadline):
+        """Reserva una petición del presupuesto; False si ya no quedan"""
+        if time.perf_counter() >= deadline:
+            return False
+        with self._lock:
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _record(self, endpoint, latency_ms, status=None, exception=None):
+        result = self._results[endpoint]
+        with self._lock:
+            result['latencies'].append(latency_ms)
+            if exception is not None:
+                result['exceptions'][exception] += 1
+            else:
+                result['statuses'][status] += 1
+
+    def _worker(self, index, limiter, deadline, barrier):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        session = requests.Session()
+        barrier.wait()
+
+        while self._next_ticket(deadline):
+            limiter.wait()
+            endpoint = rng.choices(names, weights)[0]
+            method, path, params, body = self._build_request(endpoint, rng)
+            start = time.perf_counter()
+            try:
+                response = session.request(method, f"{self.api_gateway_url}{path}",
+                                           params=params, json=body, timeout=self.timeout)
+                response.content
+                self._record(endpoint, (time.perf_counter() - start) * 1000, status=response.status_code)
+            except requests.RequestException as e:
+                self._record(endpoint, (time.perf_counter() - start) * 1000, exception=type(e).__name__)
+
+        session.close()
+
+    def _endpoint_summary(self, endpoint, elapsed):
+        result = self._results[endpoint]
+        latencies = sorted(result['latencies'])
+        count = len(latencies)
+        statuses = result['statuses']
+        server_errors = sum(n for code, n in statuses.items() if code >= 500)
+        # 409 en /item POST es "sin stock": respuesta correcta, no un error
+        client_errors = sum(n for code, n in statuses.items()
+                            if 400 <= code < 500 and not (endpoint == 'item_post' and code == 409))
+        errors = server_errors + client_errors + sum(result['exceptions'].values())
+
+        histogram = {}
+        lower = 0
+        for upper in LATENCY_BUCKETS_MS:
+            histogram[f"le_{upper}"] = sum(1 for v in latencies if lower < v <= upper) if count else 0
+            lower = upper
+        histogram['gt_last'] = sum(1 for v in latencies if v > LATENCY_BUCKETS_MS[-1])
+
+        return {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': round(errors / count, 4) if count else 0.0,
+            'status_codes': {str(code): n for code, n in sorted(statuses.items())},
+            'exceptions': dict(result['exceptions']),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2) if count else None,
+                'p95': round(percentile(latencies, 95), 2) if count else None,
+                'p99': round(percentile(latencies, 99), 2) if count else None,
+                'mean': round(sum(latencies) / count, 2) if count else None,
+                'max': round(latencies[-1], 2) if count else None
+            },
+            'histogram_ms': histogram
+        }
+
+    def run(self):
+        """Lanza la carga y devuelve el informe como diccionario"""
+        self.sample_product_ids()
+
+        limiter = RateLimiter(self.rate)
+        barrier = threading.Barrier(self.workers + 1)
+        started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration else math.inf
+
+        threads = [
+            threading.Thread(target=self._worker, args=(index, limiter, deadline, barrier), daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        endpoints = {name: self._endpoint_summary(name, elapsed) for name in self.mix}
+        all_latencies = sorted(v for r in self._results.values() for v in r['latencies'])
+        total = len(all_latencies)
+        errors = sum(e['errors'] for e in endpoints.values())
+
+        return {
+            'started_at': started_at,
+            'target': self.api_gateway_url,
+            'config': {
+                'workers': self.workers,
+                'duration_seconds': self.duration,
+                'max_requests': self.total_requests,
+                'rate_limit_rps': self.rate,
+                'mix': self.mix,
+                'products_limit': self.products_limit,
+                'seed': self.seed
+            },
+            'elapsed_seconds': round(elapsed, 3),
+            'totals': {
+                'requests': total,
+                'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+                'errors': errors,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'latency_ms': {
+                    'p50': round(percentile(all_latencies, 50), 2) if total else None,
+                    'p95': round(percentile(all_latencies, 95), 2) if total else None,
+                    'p99': round(percentile(all_latencies, 99), 2) if total else None
+                }
+            },
+            'endpoints': endpoints
+        }
+
+
+def log_load_report(report):
+    """Resumen legible del informe de carga"""
+    logger.info("=" * 60)
+    logger.info("📊 RESUMEN DE CARGA")
+    logger.info("=" * 60)
+    for name, data in report['endpoints'].items():
+        lat = data['latency_ms']
+        logger.info(f"{name:<10} {data['requests']:>7} req  {data['throughput_rps']:>8} req/s  "
+                    f"p50 {lat['p50']} ms  p95 {lat['p95']} ms  p99 {lat['p99']} ms  "
+                    f"errores {data['errors']} ({data['error_rate']:.2%})")
+    totals = report['totals']
+    logger.info("-" * 60)
+    logger.info(f"📈 Total: {totals['requests']} peticiones en {report['elapsed_seconds']} s "
+                f"({totals['throughput_rps']} req/s), p99 {totals['latency_ms']['p99']} ms, "
+                f"errores {totals['errors']} ({totals['error_rate']:.2%})")
+
+
+def run_load_test(config):
+    """Modo --load: genera carga, escribe el informe JSON y decide el código de salida"""
+    if not config.api_url:
+        logger.error("❌ --load requiere --api-url (API Gateway o local_api.py)")
+        return False
+
+    tester = LoadTester(
+        api_gateway_url=config.api_url,
+        workers=config.workers,
+        duration=config.duration,
+        total_requests=config.requests,
+        rate=config.rate,
+        mix=config.mix,
+        products_limit=config.products_limit,
+        seed=config.seed
+    )
+
+    stop = f"{config.requests} peticiones" if config.requests else f"{config.duration} s"
+    logger.info(f"🔥 Carga: {config.workers} workers, {stop}, "
+                f"ritmo {config.rate or 'sin límite'} req/s, mix {tester.mix}")
+    report = tester.run()
+    log_load_report(report)
+
+    if config.report:
+        with open(config.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"💾 Informe guardado en {config.report}")
+
+    return report['totals']['error_rate'] <= config.max_error_rate
+
+
 def get_config():
     """Obtener configuración desde argumentos o variables de entorno"""
     parser = argparse.ArgumentParser(description='Test DP-3 E-commerce System')
@@ -266,11 +552,43 @@ def get_config():
                        action='store_true',
                        help='Verbose output')
     
+    load = parser.add_argument_group('carga concurrente')
+    load.add_argument('--load', action='store_true',
+                      help='Ejecutar la prueba de carga en lugar de las pruebas funcionales')
+    load.add_argument('--workers', type=int, default=8,
+                      help='Workers concurrentes (default: 8)')
+    load.add_argument('--duration', type=float,
+                      help='Segundos de carga (default: 30, o sin límite si se usa --requests)')
+    load.add_argument('--requests', type=int,
+                      help='Número total de peticiones')
+    load.add_argument('--rate', type=float, default=0,
+                      help='Ritmo objetivo total en req/s (default: 0 = sin límite)')
+    load.add_argument('--mix', default=DEFAULT_MIX,
+                      help=f'Pesos por endpoint (default: {DEFAULT_MIX})')
+    load.add_argument('--products-limit', type=int, default=100,
+                      help='Tamaño de página de /products en la carga (default: 100)')
+    load.add_argument('--seed', type=int,
+                      help='Semilla para reproducir la secuencia de peticiones')
+    load.add_argument('--report',
+                      help='Guardar el informe de carga en un fichero JSON')
+    load.add_argument('--max-error-rate', type=float, default=0.01,
+                      help='Tasa de error máxima para salir con código 0 (default: 0.01)')
+    
     args = parser.parse_args()
     
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
+    if args.load:
+        try:
+            args.mix = parse_mix(args.mix)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.workers < 1:
+            parser.error("--workers debe ser >= 1")
+        if args.duration is None:
+            args.duration = 0 if args.requests else 30
+    
     return args
 
 def main():
@@ -278,6 +596,10 @@ def main():
     try:
         config = get_config()
         
+        if config.load:
+            success = run_load_test(config)
+            sys.exit(0 if success else 1)
+        
         logger.info("🔧 Configuración de pruebas:")
         logger.info(f"  API Gateway: {config.api_url or 'No configurado'}")
         logger.info(f"  Frontend: {config.frontend_url or 'No configurado'}")
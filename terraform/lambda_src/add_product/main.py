@@ -1,161 +1,242 @@
+import csv
+import io
 import json
 import os
-import pg8000.dbapi
-from decimal import Decimal
+import time
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from db_pool import get_connection, release_connection, log_pool_stats
+from compression import request_body
+from data_access import PRODUCT_COLUMNS, product_mapper, query, warm_up
+from query_log import timed_execute
+from responses import WRITE_HEADERS, json_response, error_response, server_error
+from tracing import traced, span
 
-def get_db_connection():
-    """Establece conexión con PostgreSQL RDS"""
-    return pg8000.dbapi.connect(
-        host=os.environ.get('DB_HOST'),
-        user=os.environ.get('DB_USER'),
-        password=os.environ.get('DB_PASSWORD'),
-        database=os.environ.get('DB_NAME'),
-        port=5432
+REQUIRED_FIELDS = ['name', 'category', 'price', 'stock']
+
+# Escala de la columna price DECIMAL(10,2); PostgreSQL redondea la mitad hacia arriba
+CENTS = Decimal('0.01')
+
+# Carga masiva: filas por COPY y máximo de errores detallados en la respuesta
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '5000'))
+BULK_MAX_ERRORS = 1000
+
+INSERT_QUERY = f"""
+    INSERT INTO productos (name, category, price, stock, created_at, updated_at)
+    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    RETURNING {', '.join(PRODUCT_COLUMNS)}
+"""
+
+to_product = product_mapper(PRODUCT_COLUMNS)
+
+class MissingFieldsError(ValueError):
+    pass
+
+def validate_product(data):
+    """
+    Reglas de validación de un producto, compartidas por el alta individual
+    y la carga masiva. Devuelve (name, category, price, stock) normalizados;
+    el precio ya redondeado a céntimos, que es lo que guarda la columna.
+    """
+    missing_fields = [field for field in REQUIRED_FIELDS if data.get(field) in (None, '')]
+    if missing_fields:
+        raise MissingFieldsError(f'Campos requeridos faltantes: {", ".join(missing_fields)}')
+    
+    name = str(data['name']).strip()
+    category = str(data['category']).strip()
+    try:
+        price = Decimal(str(data['price'])).quantize(CENTS, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError("El precio debe ser un número")
+    stock = int(data['stock'])
+    
+    # Validaciones adicionales
+    if not name or len(name) > 255:
+        raise ValueError("El nombre debe tener entre 1 y 255 caracteres")
+    
+    if not category or len(category) > 100:
+        raise ValueError("La categoría debe tener entre 1 y 100 caracteres")
+    
+    if not price.is_finite() or price <= 0:
+        raise ValueError("El precio debe ser mayor que 0")
+    
+    # Límites de las columnas DECIMAL(10,2) e INTEGER
+    if price >= 10 ** 8:
+        raise ValueError("El precio no puede superar 99999999.99")
+    
+    if stock < 0:
+        raise ValueError("El stock no puede ser negativo")
+    
+    if stock > 2147483647:
+        raise ValueError("El stock supera el máximo permitido")
+    
+    return name, category, price, stock
+
+def parse_bulk_records(event):
+    """
+    Lee el body de /add/bulk como CSV (con cabecera) o JSON Lines.
+    El formato se toma de ?format=csv|jsonl o del Content-Type.
+    Devuelve una lista de (número_de_fila, dict | mensaje_de_error).
+    """
+    raw = request_body(event)
+    
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    params = event.get('queryStringParameters') or {}
+    fmt = params.get('format') or ('csv' if 'csv' in headers.get('content-type', '') else 'jsonl')
+    
+    if fmt == 'csv':
+        # La fila 1 es la cabecera
+        return list(enumerate(csv.DictReader(io.StringIO(raw)), start=2))
+    
+    records = []
+    for line_number, line in enumerate(raw.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError
+            records.append((line_number, record))
+        except ValueError:
+            records.append((line_number, 'JSON inválido'))
+    return records
+
+def copy_chunk(cursor, rows):
+    """Carga un bloque de filas validadas con COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for _, name, category, price, stock in rows:
+        writer.writerow((name, category, str(price), stock))
+    buffer.seek(0)
+    timed_execute(
+        None, cursor,
+        "COPY productos (name, category, price, stock) FROM STDIN WITH (FORMAT csv)",
+        stream=buffer
     )
 
+def bulk_handler(event, context):
+    """
+    POST /add/bulk
+    Carga masiva de productos desde CSV o JSON Lines. Valida cada fila con
+    las mismas reglas que el alta individual y carga las válidas con COPY en
+    bloques de BULK_CHUNK_SIZE, confirmando cada bloque por separado.
+    """
+    start = time.perf_counter()
+    try:
+        records = parse_bulk_records(event)
+        if not records:
+            return error_response(400, 'El body no contiene filas')
+        
+        valid_rows = []
+        errors = []
+        for row_number, record in records:
+            if isinstance(record, str):
+                errors.append({'row': row_number, 'error': record})
+                continue
+            try:
+                valid_rows.append((row_number, *validate_product(record)))
+            except MissingFieldsError as missing_error:
+                errors.append({'row': row_number, 'error': str(missing_error)})
+            except (ValueError, TypeError) as validation_error:
+                errors.append({'row': row_number, 'error': f'Datos inválidos: {str(validation_error)}'})
+        
+        inserted = 0
+        if valid_rows:
+            conn = get_connection()
+            cursor = conn.cursor()
+            broken = False
+            
+            for offset in range(0, len(valid_rows), BULK_CHUNK_SIZE):
+                chunk = valid_rows[offset:offset + BULK_CHUNK_SIZE]
+                try:
+                    with span('query'):
+                        copy_chunk(cursor, chunk)
+                        conn.commit()
+                    inserted += len(chunk)
+                except Exception as db_error:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        broken = True
+                    errors.extend({'row': row[0], 'error': f'Error de base de datos: {str(db_error)}'} for row in chunk)
+            
+            cursor.close()
+            release_connection(conn, discard=broken)
+            log_pool_stats('addProduct')
+        
+        elapsed = time.perf_counter() - start
+        errors.sort(key=lambda e: e['row'])
+        
+        if inserted and not errors:
+            status_code = 201
+        elif inserted:
+            status_code = 207
+        else:
+            status_code = 400
+        
+        return json_response(status_code, {
+            'message': f'{inserted} de {len(records)} productos cargados',
+            'received': len(records),
+            'inserted': inserted,
+            'rejected': len(records) - inserted,
+            'errors': errors[:BULK_MAX_ERRORS],
+            'errors_truncated': len(errors) > BULK_MAX_ERRORS,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(inserted / elapsed, 1) if elapsed > 0 else None
+        }, headers=WRITE_HEADERS)
+        
+    except Exception as e:
+        return server_error('addProduct bulk', e)
+
+# Fase init: conexión y sentencia preparada antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('addProduct', INSERT_QUERY)
+
+@traced('addProduct')
 def lambda_handler(event, context):
     """
     Lambda function: addProduct
     Inserta un nuevo producto en la tabla productos
+    (POST /add/bulk: carga masiva, ver bulk_handler)
     """
+    if (event.get('path') or '').rstrip('/').endswith('/bulk'):
+        return bulk_handler(event, context)
+    
     try:
         # Parsear el body de la petición
-        body = json.loads(event.get('body', '{}'))
+        body = json.loads(request_body(event) or '{}')
         
-        # Validar campos requeridos
-        required_fields = ['name', 'category', 'price', 'stock']
-        missing_fields = [field for field in required_fields if field not in body]
-        
-        if missing_fields:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
-                })
-            }
-        
-        # Validar tipos de datos
         try:
-            name = str(body['name']).strip()
-            category = str(body['category']).strip()
-            price = float(body['price'])
-            stock = int(body['stock'])
-            
-            # Validaciones adicionales
-            if not name or len(name) > 255:
-                raise ValueError("El nombre debe tener entre 1 y 255 caracteres")
-            
-            if not category or len(category) > 100:
-                raise ValueError("La categoría debe tener entre 1 y 100 caracteres")
-            
-            if price <= 0:
-                raise ValueError("El precio debe ser mayor que 0")
-            
-            if stock < 0:
-                raise ValueError("El stock no puede ser negativo")
-                
+            name, category, price, stock = validate_product(body)
+        except MissingFieldsError as missing_error:
+            return error_response(400, str(missing_error))
         except (ValueError, TypeError) as validation_error:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': f'Datos inválidos: {str(validation_error)}'
-                })
-            }
+            return error_response(400, f'Datos inválidos: {str(validation_error)}')
         
-        # Conectar a la base de datos
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # Conexión reutilizada entre invocaciones warm
+        conn = get_connection()
         
         try:
-            # Insertar el producto
-            insert_query = """
-                INSERT INTO productos (name, category, price, stock, created_at, updated_at) 
-                VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                RETURNING id, name, category, price, stock, created_at, updated_at
-            """
-            
-            cursor.execute(insert_query, (name, category, price, stock))
-            new_product = cursor.fetchone()
-            conn.commit()
-            
-            # Formatear respuesta
-            product_data = {
-                'id': new_product[0],
-                'name': new_product[1],
-                'category': new_product[2],
-                'price': float(new_product[3]),
-                'stock': new_product[4],
-                'created_at': new_product[5].isoformat() if new_product[5] else None,
-                'updated_at': new_product[6].isoformat() if new_product[6] else None
-            }
-            
-            cursor.close()
-            conn.close()
-            
-            return {
-                'statusCode': 201,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                    'Access-Control-Allow-Headers': 'Content-Type'
-                },
-                'body': json.dumps({
-                    'message': f'Producto "{name}" creado exitosamente',
-                    'product': product_data
-                })
-            }
-            
+            with span('query'):
+                rows = query(conn, INSERT_QUERY, (name, category, price, stock))
+                conn.commit()
         except Exception as db_error:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            
             # Verificar si es un error de duplicado (si hay índice único en name)
             if 'duplicate key' in str(db_error).lower():
-                return {
-                    'statusCode': 409,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Ya existe un producto con ese nombre'
-                    })
-                }
+                release_connection(conn)
+                return error_response(409, 'Ya existe un producto con ese nombre')
             
+            release_connection(conn, discard=True)
             raise db_error
+        
+        release_connection(conn)
+        log_pool_stats('addProduct')
+        
+        return json_response(201, {
+            'message': f'Producto "{name}" creado exitosamente',
+            'product': to_product(rows[0])
+        }, headers=WRITE_HEADERS)
             
     except json.JSONDecodeError:
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'JSON inválido en el body de la petición'
-            })
-        }
+        return error_response(400, 'JSON inválido en el body de la petición')
         
     except Exception as e:
-        print(f"ERROR in addProduct: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Error interno del servidor',
-                'message': str(e)
-            })
-        }
\ No newline at end of file
+        return server_error('addProduct', e)
@@ -0,0 +1,142 @@
+import json
+from collections import OrderedDict
+from db_pool import get_connection, release_connection, log_pool_stats
+from compression import request_body
+from data_access import query, warm_up
+from responses import json_response, error_response, server_error
+from tracing import traced, span
+
+# Máximo de líneas distintas por pedido
+MAX_LINES = 100
+
+LOCK_QUERY = """
+    SELECT id, name, price, stock
+    FROM productos
+    WHERE id = ANY(%s)
+    ORDER BY id
+    FOR UPDATE
+"""
+
+# Un único UPDATE para todas las líneas del pedido
+RESERVE_QUERY = """
+    UPDATE productos AS p
+    SET stock = p.stock - l.quantity
+    FROM unnest(%s::int[], %s::int[]) AS l(id, quantity)
+    WHERE p.id = l.id
+"""
+
+def parse_lines(body):
+    """
+    Valida las líneas del pedido y agrupa productos repetidos.
+    Devuelve un OrderedDict {product_id: quantity} en el orden recibido.
+    """
+    lines = body.get('lines')
+    if not isinstance(lines, list) or not lines:
+        raise ValueError('Se requiere una lista "lines" con al menos una línea')
+
+    quantities = OrderedDict()
+    for index, line in enumerate(lines):
+        try:
+            product_id = int(line['product_id'])
+            quantity = int(line.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Línea {index}: product_id y quantity deben ser enteros')
+        if quantity <= 0:
+            raise ValueError(f'Línea {index}: quantity debe ser mayor que 0')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    if len(quantities) > MAX_LINES:
+        raise ValueError(f'Máximo {MAX_LINES} productos distintos por pedido')
+    return quantities
+
+# Fase init: conexión y sentencias preparadas antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('checkout', LOCK_QUERY, RESERVE_QUERY)
+
+@traced('checkout')
+def lambda_handler(event, context):
+    """
+    Lambda function: checkout
+    Reserva el stock de varias líneas de pedido en una única transacción.
+    Todo o nada: si alguna línea no se puede servir no se descuenta nada
+    y se devuelve el resultado de cada línea.
+    """
+    try:
+        body = json.loads(request_body(event) or '{}')
+        
+        try:
+            quantities = parse_lines(body)
+        except ValueError as validation_error:
+            return error_response(400, f'Pedido inválido: {str(validation_error)}')
+        
+        # Orden determinista de locks: siempre por id ascendente, así dos
+        # pedidos con productos en común nunca se bloquean mutuamente
+        product_ids = sorted(quantities)
+        
+        conn = get_connection()
+        
+        try:
+            with span('query'):
+                locked = {row[0]: row for row in query(conn, LOCK_QUERY, (product_ids,))}
+            
+            results = []
+            for product_id, quantity in quantities.items():
+                row = locked.get(product_id)
+                if not row:
+                    results.append({'product_id': product_id, 'quantity': quantity, 'status': 'not_found'})
+                elif row[3] < quantity:
+                    results.append({
+                        'product_id': product_id,
+                        'name': row[1],
+                        'quantity': quantity,
+                        'status': 'insufficient_stock',
+                        'available': row[3]
+                    })
+                else:
+                    results.append({
+                        'product_id': product_id,
+                        'name': row[1],
+                        'quantity': quantity,
+                        'status': 'reserved',
+                        'unit_price': float(row[2]),
+                        'new_stock': row[3] - quantity
+                    })
+            
+            failed = [r for r in results if r['status'] != 'reserved']
+            if failed:
+                conn.rollback()
+                # Las líneas servibles no se han reservado porque el pedido se anula entero
+                for r in results:
+                    if r['status'] == 'reserved':
+                        r['status'] = 'available'
+                        del r['new_stock']
+            else:
+                # Un único UPDATE para todas las líneas
+                with span('query'):
+                    query(conn, RESERVE_QUERY, (product_ids, [quantities[pid] for pid in product_ids]))
+                    conn.commit()
+        except Exception as transaction_error:
+            release_connection(conn, discard=True)
+            raise transaction_error
+        
+        release_connection(conn)
+        log_pool_stats('checkout')
+        
+        if failed:
+            return error_response(
+                409,
+                f'No se pudo reservar {len(failed)} de {len(results)} producto(s)',
+                lines=results
+            )
+        
+        total = round(sum(r['unit_price'] * r['quantity'] for r in results), 2)
+        return json_response(200, {
+            'message': f'Pedido reservado: {len(results)} producto(s), total {total:.2f}',
+            'total': total,
+            'lines': results
+        })
+        
+    except json.JSONDecodeError:
+        return error_response(400, 'JSON inválido en el body de la petición')
+        
+    except Exception as e:
+        return server_error('checkout', e)
@@ -0,0 +1,103 @@
+"""
+Compresión negociada de las respuestas de las Lambdas.
+
+El cliente indica en ``Accept-Encoding`` qué codificaciones admite; la
+respuesta se comprime con brotli (si el módulo está disponible en la capa)
+o gzip, y viaja en base64 con ``isBase64Encoded`` para que API Gateway la
+entregue como binario (``binary_media_types = ["*/*"]`` en main.tf).
+
+Con ``*/*`` como tipo binario API Gateway también entrega en base64 el body
+de las peticiones, así que los handlers lo leen con ``request_body``.
+"""
+
+import base64
+import gzip
+import os
+from tracing import span
+from responses import request_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Por debajo de este tamaño la cabecera y el base64 cuestan más de lo que se ahorra
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+# Calidad 11 (la de por defecto) es un orden de magnitud más lenta que gzip
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+
+def request_body(event):
+    """Body de la petición como texto, decodificando el base64 de API Gateway"""
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded') and body:
+        return base64.b64decode(body).decode('utf-8')
+    return body
+
+
+def parse_accept_encoding(header):
+    """{codificación: q} a partir de Accept-Encoding (``gzip;q=0.5, br``)"""
+    accepted = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate(header):
+    """Mejor codificación disponible aceptada por el cliente, o None (identity)"""
+    accepted = parse_accept_encoding(header)
+    available = ['br', 'gzip'] if brotli else ['gzip']
+    wildcard = accepted.get('*', 0.0)
+    best = None
+    best_q = 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding):
+    """Comprime ``data`` (bytes) con la codificación indicada"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(event, response):
+    """
+    Comprime el body de una respuesta 200 si el cliente lo acepta y supera
+    MIN_SIZE. Devuelve la misma respuesta, modificada en su caso.
+    """
+    body = response.get('body')
+    if response.get('statusCode') != 200 or not body or response.get('isBase64Encoded'):
+        return response
+
+    headers = response.setdefault('headers', {})
+    # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+    headers['Vary'] = 'Accept-Encoding'
+
+    data = body.encode('utf-8')
+    if len(data) < MIN_SIZE:
+        return response
+    encoding = negotiate(request_header(event, 'Accept-Encoding'))
+    if not encoding:
+        return response
+
+    headers['Content-Encoding'] = encoding
+    with span('compress'):
+        response['body'] = base64.b64encode(compress(data, encoding)).decode('ascii')
+    response['isBase64Encoded'] = True
+    return response
@@ -0,0 +1,203 @@
+"""
+Acceso a datos compartido por las funciones Lambda.
+
+- ``query``: ejecuta una sentencia como *prepared statement* de la conexión.
+  La primera vez se envía el PARSE (análisis y plan en PostgreSQL); las
+  siguientes invocaciones warm que reutilizan la conexión (db_pool) sólo
+  envían BIND/EXECUTE. La caché es por conexión y acotada: al reconectar
+  se empieza de cero y las sentencias menos usadas se cierran.
+- Conversión de filas de ``productos`` a JSON: un conversor por
+  combinación de columnas que sólo convierte el precio y las fechas y
+  construye el dict con ``dict(zip(...))``.
+
+- ``warm_up``: con DB_CONNECT_ON_INIT abre la conexión del contenedor y
+  prepara las sentencias del handler al importarlo, es decir, en la fase
+  init de Lambda y no en la primera invocación.
+
+Las sentencias usan el paramstyle de siempre (``%s``). Se ejecutan por el
+protocolo extendido de pg8000 (``prepare_statement`` / ``execute_named``),
+igual que hace ``cursor.execute``, incluida la apertura implícita de la
+transacción cuando la conexión no está en autocommit. La conexión DB-API de
+pg8000 no expone sentencias preparadas con nombre, así que esas piezas no
+son API pública: la versión está fijada (common/requirements.txt) y
+scripts/check_data_access.py las ejercita. Si otra versión no las tiene,
+``query`` ejecuta con ``cursor.execute`` (sin reutilizar el PARSE) en lugar
+de romper las Lambdas.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import pg8000.dbapi
+from db_pool import get_connection, get_read_connection, release_connection
+from query_log import record
+
+# Sentencias preparadas que se mantienen abiertas por conexión
+MAX_PREPARED = int(os.environ.get('DB_MAX_PREPARED_STATEMENTS', '64'))
+# Conectar y preparar sentencias al cargar el handler (fase init de Lambda)
+CONNECT_ON_INIT = os.environ.get('DB_CONNECT_ON_INIT', 'false').lower() in ('true', '1', 'yes')
+
+PRODUCT_COLUMNS = ('id', 'name', 'category', 'price', 'stock', 'created_at', 'updated_at')
+
+# {conexión: OrderedDict(sql -> (nombre, columnas, input_funcs, sql_nativo))} en orden LRU
+_statements = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_stats = {'prepared': 0, 'reused': 0, 'evicted': 0}
+
+try:
+    from pg8000.converters import make_params
+    from pg8000.dbapi import convert_paramstyle
+    PREPARED_STATEMENTS = all(
+        hasattr(pg8000.dbapi.Connection, name)
+        for name in ('prepare_statement', 'execute_named', 'close_prepared_statement',
+                     'execute_simple', '_in_transaction')
+    )
+except ImportError:
+    PREPARED_STATEMENTS = False
+if not PREPARED_STATEMENTS:
+    print("WARNING pg8000 sin el protocolo extendido esperado: query() usa cursor.execute")
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _prepared(conn, statement):
+    """Sentencia preparada de ``conn`` para ``statement`` (la crea si no existe)"""
+    cache = _statements.get(conn)
+    if cache is None:
+        cache = _statements[conn] = OrderedDict()
+
+    entry = cache.get(statement)
+    if entry is not None:
+        cache.move_to_end(statement)
+        _count('reused')
+        return entry
+
+    native, _ = convert_paramstyle('format', statement, ())
+    name, columns, input_funcs = conn.prepare_statement(native, ())
+    entry = cache[statement] = (name, columns, input_funcs, native)
+    _count('prepared')
+
+    while len(cache) > MAX_PREPARED:
+        _, (old_name, _, _, _) = cache.popitem(last=False)
+        conn.close_prepared_statement(old_name)
+        _count('evicted')
+    return entry
+
+
+def query(conn, statement, params=()):
+    """
+    Ejecuta ``statement`` como sentencia preparada y devuelve sus filas
+    (lista vacía si no devuelve ninguna). Se mide y registra en query_log
+    igual que ``timed_execute``.
+    """
+    start = time.perf_counter()
+    if not PREPARED_STATEMENTS:
+        cursor = conn.cursor()
+        cursor.execute(statement, tuple(params))
+        rows = list(cursor.fetchall()) if cursor.description else []
+        record(conn, statement, params, (time.perf_counter() - start) * 1000, cursor.rowcount)
+        cursor.close()
+        return rows
+
+    if not conn._in_transaction and not conn.autocommit:
+        conn.execute_simple("begin transaction")
+    name, columns, input_funcs, native = _prepared(conn, statement)
+    context = conn.execute_named(
+        name, make_params(conn.py_types, tuple(params)), columns, input_funcs, native
+    )
+    rows = context.rows if context.rows is not None else []
+    record(conn, statement, params, (time.perf_counter() - start) * 1000, context.row_count)
+    return rows
+
+
+def warm_up(function_name, *statements, read_only=False):
+    """
+    Conexión y sentencias preparadas durante la fase init: Lambda la ejecuta
+    antes de la primera invocación, con la CPU completa, y el primer
+    evento ya encuentra la conexión abierta (un ``hit`` en db_pool).
+    Con ``read_only`` se prepara en la conexión de lectura (la réplica, si
+    hay). Si falla, el handler se carga igual y la invocación conectará
+    como siempre.
+    """
+    if not CONNECT_ON_INIT:
+        return
+    start = time.perf_counter()
+    conn = None
+    try:
+        conn = get_read_connection() if read_only else get_connection()
+        if PREPARED_STATEMENTS:
+            for statement in statements:
+                _prepared(conn, statement)
+    except Exception as e:
+        print(f"WARNING warm-up de {function_name} fallido: {str(e)}")
+        if conn is not None:
+            release_connection(conn, discard=True)
+        return
+    release_connection(conn)
+    print(json.dumps({
+        'init': function_name,
+        'warm_up_ms': round((time.perf_counter() - start) * 1000, 3),
+        'prepared': len(statements)
+    }))
+
+
+def get_statement_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats['connections'] = len(_statements)
+    return stats
+
+
+def to_cents(value):
+    """Precio DECIMAL(10,2) como entero de céntimos (exacto, sin coma flotante)"""
+    return int(value * 100)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+# Conversión a JSON por columna (el valor nunca es NULL); el resto de
+# columnas se serializan tal cual
+JSON_CONVERSIONS = {'price': float, 'created_at': _isoformat, 'updated_at': _isoformat}
+COMPACT_CONVERSIONS = {**JSON_CONVERSIONS, 'price': to_cents}
+
+
+def _mapper(fields, conversions, as_list):
+    """
+    Conversor de una proyección concreta: las posiciones que hay que
+    convertir se calculan una vez y cada fila sólo pasa por ellas. Los NULL
+    se mantienen como None.
+    """
+    if as_list:
+        converted = tuple((i, conversions[field]) for i, field in enumerate(fields) if field in conversions)
+    else:
+        converted = tuple((field, conversions[field]) for field in fields if field in conversions)
+
+    def convert(row):
+        values = list(row) if as_list else dict(zip(fields, row))
+        for key, conversion in converted:
+            value = values[key]
+            if value is not None:
+                values[key] = conversion(value)
+        return values
+    return convert
+
+
+@functools.lru_cache(maxsize=128)
+def product_mapper(fields=PRODUCT_COLUMNS):
+    """Conversor fila -> dict JSON para las columnas ``fields`` (tupla en el orden de la consulta)"""
+    return _mapper(fields, JSON_CONVERSIONS, as_list=False)
+
+
+@functools.lru_cache(maxsize=128)
+def compact_mapper(fields=PRODUCT_COLUMNS):
+    """Conversor fila -> lista del formato compacto (precio en céntimos)"""
+    return _mapper(fields, COMPACT_CONVERSIONS, as_list=True)
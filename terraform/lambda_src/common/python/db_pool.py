@@ -0,0 +1,262 @@
+"""
+Gestión de conexiones PostgreSQL compartida por las funciones Lambda.
+
+Las conexiones se guardan a nivel de módulo, de modo que sobreviven entre
+invocaciones "warm" del mismo contenedor Lambda y evitan repetir el
+handshake TCP/TLS y la autenticación en cada petición. Antes de reutilizar
+una conexión que lleva un tiempo ociosa se comprueba con un ``SELECT 1``
+y, si está caída, se reconecta de forma transparente.
+
+Con DB_READ_HOST las consultas de sólo lectura (``get_read_connection``) van
+a una réplica mientras responda y su retraso no supere DB_REPLICA_MAX_LAG;
+si no, a la primaria. Las escrituras y las compras usan siempre
+``get_connection``, que conecta con la primaria (DB_HOST).
+
+En Lambda cada contenedor atiende una invocación a la vez. Para poder
+ejecutar los handlers desde un servidor local con varios hilos, cada hilo
+tiene sus propias conexiones, como si fuese un contenedor distinto.
+"""
+
+import json
+import os
+import threading
+import time
+import pg8000.dbapi
+from tracing import span
+
+# Segundos de inactividad tras los que se verifica la conexión antes de reutilizarla
+HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_HEALTH_CHECK_INTERVAL', '30'))
+
+# Réplica de lectura, host o host:puerto (vacío: todas las consultas van a la primaria)
+READ_HOST = os.environ.get('DB_READ_HOST', '')
+# Retraso máximo (segundos) con el que se sigue leyendo de la réplica
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', '5'))
+# Cada cuántos segundos se vuelve a medir el retraso de la réplica
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+# Tras un fallo de la réplica se lee de la primaria durante estos segundos
+REPLICA_RETRY_INTERVAL = float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', '30'))
+# Timeout del socket de la réplica (conexión y cada lectura): una réplica
+# colgada no debe agotar el timeout de la Lambda
+REPLICA_TIMEOUT = float(os.environ.get('DB_REPLICA_TIMEOUT', '5'))
+
+# Retraso de la réplica en segundos: 0 si ya reprodujo todo el WAL recibido
+# (una primaria sin escrituras no genera retraso) y, si no, la antigüedad de
+# la última transacción reproducida. NULL si todavía no ha reproducido
+# ninguna. Una instancia que no está en recuperación es la primaria: 0.
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+# Conexiones vivas de cada hilo indexadas por host: {host: {'conn': ..., 'last_used': ...}}
+_local = threading.local()
+_all_connections = []
+_lock = threading.Lock()
+
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'reconnects': 0,
+    'probe_failures': 0,
+    'replica_reads': 0,
+    'replica_lagging': 0,
+    'replica_errors': 0,
+    'primary_fallbacks': 0
+}
+
+
+def _connections():
+    """Diccionario de conexiones del hilo actual"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+        with _lock:
+            _all_connections.append(connections)
+    return connections
+
+
+def _count(*names):
+    with _lock:
+        for name in names:
+            _stats[name] += 1
+
+
+def _connect(host):
+    """Abre una conexión nueva con PostgreSQL RDS"""
+    replica = bool(READ_HOST) and host == READ_HOST
+    # host:puerto para servidores en un puerto distinto de DB_PORT (réplica local)
+    host, _, port = host.partition(':')
+    return pg8000.dbapi.connect(
+        host=host,
+        user=os.environ.get('DB_USER'),
+        password=os.environ.get('DB_PASSWORD'),
+        database=os.environ.get('DB_NAME'),
+        port=int(port or os.environ.get('DB_PORT', 5432)),
+        timeout=REPLICA_TIMEOUT if replica else None
+    )
+
+
+def _is_alive(conn):
+    """Sonda de vida barata: un SELECT 1 sin tocar ninguna tabla"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def _discard(host, connections=None):
+    """Cierra y olvida la conexión asociada a un host"""
+    entry = (connections if connections is not None else _connections()).pop(host, None)
+    if entry:
+        try:
+            entry['conn'].close()
+        except Exception:
+            pass
+
+
+@span('db_connect')
+def get_connection(host=None):
+    """
+    Devuelve una conexión lista para usar, reutilizando la del contenedor si existe.
+
+    Si la conexión lleva más de HEALTH_CHECK_INTERVAL segundos sin usarse se
+    sondea antes de entregarla; si la sonda falla se abre una conexión nueva.
+    """
+    host = host or os.environ.get('DB_HOST')
+    connections = _connections()
+    entry = connections.get(host)
+    now = time.monotonic()
+
+    if entry:
+        idle = now - entry['last_used']
+        if idle < HEALTH_CHECK_INTERVAL or _is_alive(entry['conn']):
+            _count('hits')
+            entry['last_used'] = now
+            return entry['conn']
+
+        # La conexión está caída (timeout de RDS, failover, etc.)
+        _count('probe_failures', 'reconnects')
+        _discard(host, connections)
+
+    _count('misses')
+    conn = _connect(host)
+    connections[host] = {'conn': conn, 'last_used': time.monotonic()}
+    return conn
+
+
+def _replica_lag(conn):
+    """Retraso de la réplica en segundos (None si no se puede saber)"""
+    cursor = conn.cursor()
+    cursor.execute(REPLICA_LAG_QUERY)
+    lag = cursor.fetchone()[0]
+    cursor.close()
+    conn.rollback()
+    return None if lag is None else float(lag)
+
+
+def get_read_connection():
+    """
+    Conexión para consultas de sólo lectura.
+
+    Devuelve la de la réplica (DB_READ_HOST) si está configurada, responde y
+    su retraso, medido como mucho cada DB_REPLICA_LAG_CHECK_INTERVAL
+    segundos, no supera DB_REPLICA_MAX_LAG. En otro caso devuelve la de la
+    primaria. Si la réplica no responde, este contenedor lee de la primaria
+    durante DB_REPLICA_RETRY_INTERVAL segundos antes de volver a intentarlo.
+    """
+    primary = os.environ.get('DB_HOST')
+    if not READ_HOST or READ_HOST == primary:
+        return get_connection(primary)
+
+    if time.monotonic() < getattr(_local, 'replica_retry_at', 0.0):
+        _count('primary_fallbacks')
+        return get_connection(primary)
+
+    try:
+        conn = get_connection(READ_HOST)
+        entry = _connections()[READ_HOST]
+        if time.monotonic() - entry.get('lag_checked', float('-inf')) >= REPLICA_LAG_CHECK_INTERVAL:
+            with span('replica_lag'):
+                entry['lag'] = _replica_lag(conn)
+            entry['lag_checked'] = time.monotonic()
+            if entry['lag'] is None or entry['lag'] > REPLICA_MAX_LAG:
+                print(f"WARNING réplica {READ_HOST} con retraso {entry['lag']} s "
+                      f"(máximo {REPLICA_MAX_LAG} s): lecturas a la primaria")
+    except Exception as e:
+        print(f"WARNING réplica {READ_HOST} no disponible, lecturas a la primaria "
+              f"durante {REPLICA_RETRY_INTERVAL} s: {str(e)}")
+        _discard(READ_HOST)
+        _local.replica_retry_at = time.monotonic() + REPLICA_RETRY_INTERVAL
+        _count('replica_errors', 'primary_fallbacks')
+        return get_connection(primary)
+
+    if entry['lag'] is None or entry['lag'] > REPLICA_MAX_LAG:
+        _count('replica_lagging', 'primary_fallbacks')
+        return get_connection(primary)
+
+    _count('replica_reads')
+    return conn
+
+
+def release_connection(conn, discard=False):
+    """
+    Devuelve la conexión al contenedor al terminar la invocación.
+
+    Cierra cualquier transacción pendiente para no dejar la sesión
+    "idle in transaction". Con ``discard=True`` (o si el rollback falla)
+    la conexión se cierra y la siguiente invocación abrirá una nueva.
+    """
+    connections = _connections()
+    host = next((h for h, e in connections.items() if e['conn'] is conn), None)
+
+    if not discard:
+        try:
+            conn.rollback()
+            if host:
+                connections[host]['last_used'] = time.monotonic()
+            return
+        except Exception:
+            pass
+
+    if host:
+        _discard(host, connections)
+    else:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def close_all():
+    """Cierra todas las conexiones del contenedor (de todos los hilos)"""
+    with _lock:
+        registries = list(_all_connections)
+    for connections in registries:
+        for host in list(connections):
+            _discard(host, connections)
+
+
+def get_pool_stats():
+    """Contadores de reutilización para medir cuántos connects en frío evitamos"""
+    with _lock:
+        stats = dict(_stats)
+        open_connections = sum(len(c) for c in _all_connections)
+    total = stats['hits'] + stats['misses']
+    return {
+        **stats,
+        'open_connections': open_connections,
+        'hit_ratio': round(stats['hits'] / total, 4) if total else 0.0
+    }
+
+
+def log_pool_stats(function_name):
+    """Escribe los contadores en CloudWatch como una línea JSON filtrable"""
+    print(json.dumps({'db_pool': function_name, **get_pool_stats()}))
@@ -0,0 +1,73 @@
+"""
+Peticiones condicionales (ETag / If-None-Match) para las Lambdas de lectura.
+
+La versión del catálogo es la suma de los contadores de ``catalog_version``,
+que un trigger por sentencia incrementa en cada INSERT/UPDATE/DELETE/TRUNCATE
+sobre productos (ver scripts/init_database.sql). Leerla es una consulta sobre
+una tabla de 64 filas, así que un cliente con la versión vigente recibe un
+304 sin que se ejecute la consulta del catálogo ni se serialice la respuesta.
+
+La versión se lee antes que los datos: si entre ambas lecturas se confirma
+una escritura, el ETag queda por detrás de los datos y el cliente sólo paga
+una descarga de más. Nunca ocurre lo contrario (ETag nuevo con datos viejos).
+"""
+
+import hashlib
+import json
+from data_access import query
+from tracing import span
+from responses import request_header
+
+VERSION_QUERY = "SELECT COALESCE(SUM(version), 0) FROM catalog_version"
+
+
+def get_catalog_version(conn):
+    """
+    Versión actual del catálogo, o None si la tabla no existe todavía
+    (Lambdas desplegadas antes de aplicar init_database.sql): en ese caso
+    la respuesta se sirve sin ETag en lugar de fallar.
+    """
+    try:
+        with span('catalog_version'):
+            return int(query(conn, VERSION_QUERY)[0][0])
+    except Exception as e:
+        print(f"WARNING catalog_version no disponible: {str(e)}")
+        conn.rollback()
+        return None
+
+
+def make_etag(version, *parts):
+    """
+    ETag débil: versión del catálogo más una huella de la representación
+    pedida (recurso y parámetros normalizados). Es débil porque identifica
+    el contenido, no los bytes exactos (la compresión puede variarlos).
+    """
+    digest = hashlib.sha1(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def is_not_modified(event, etag):
+    """Comparación débil de If-None-Match con el ETag actual (RFC 9110 13.1.2)"""
+    header = request_header(event, 'If-None-Match')
+    if not header or etag is None:
+        return False
+    if header.strip() == '*':
+        return True
+    current = _opaque(etag)
+    return any(_opaque(tag) == current for tag in header.split(','))
+
+
+def not_modified(etag, headers=None):
+    """Respuesta 304 sin cuerpo con el mismo ETag"""
+    return {
+        'statusCode': 304,
+        'headers': {**(headers or {}), 'ETag': etag},
+        'body': ''
+    }
@@ -0,0 +1,146 @@
+"""
+Serialización incremental de filas de PostgreSQL a JSON.
+
+En lugar de convertir cada fila en un dict, acumularlas en una lista y
+llamar a ``json.dumps`` sobre todo el catálogo, las filas se leen por lotes
+desde un cursor de servidor (DECLARE/FETCH) y se escriben directamente
+como texto JSON. En memoria sólo conviven un lote de filas y el texto de
+salida. El resultado es idéntico byte a byte al de ``json.dumps``.
+
+``write_json_rows`` escribe el formato compacto de /products?format=compact:
+cada fila como array, sin claves repetidas.
+"""
+
+import io
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from query_log import record
+from tracing import span
+
+DEFAULT_BATCH_SIZE = 1000
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def iter_server_side(conn, query, params=(), batch_size=DEFAULT_BATCH_SIZE, name='stream_cursor'):
+    """
+    Ejecuta la consulta con un cursor de servidor y devuelve las filas en lotes.
+
+    Requiere una transacción abierta (pg8000 la abre implícitamente con
+    autocommit desactivado). El cursor se cierra al agotarse el generador y
+    la consulta se registra en query_log con el tiempo de DECLARE y FETCH.
+    """
+    cursor = conn.cursor()
+    # Tiempo de base de datos de la consulta completa (sin el de quien consume los lotes)
+    elapsed = 0.0
+    rows = 0
+    try:
+        start = time.perf_counter()
+        with span('query'):
+            cursor.execute(f"DECLARE {name} NO SCROLL CURSOR FOR {query}", params)
+        elapsed += time.perf_counter() - start
+        while True:
+            start = time.perf_counter()
+            with span('query'):
+                cursor.execute(f"FETCH FORWARD {int(batch_size)} FROM {name}")
+                batch = cursor.fetchall()
+            elapsed += time.perf_counter() - start
+            if not batch:
+                break
+            rows += len(batch)
+            yield batch
+        with span('query'):
+            cursor.execute(f"CLOSE {name}")
+    finally:
+        cursor.close()
+    record(conn, query, params, elapsed * 1000, rows)
+
+
+def _encode_value(value):
+    """Codifica un valor escalar igual que json.dumps, convirtiendo Decimal y fechas"""
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, str):
+        return _encode_string(value)
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, Decimal):
+        return float.__repr__(float(value))
+    if isinstance(value, float):
+        return float.__repr__(value)
+    if isinstance(value, (datetime, date)):
+        return _encode_string(value.isoformat())
+    return json.dumps(value)
+
+
+def write_json_array(batches, fields, out):
+    """
+    Escribe en ``out`` un array JSON de objetos {field: valor} a partir de
+    un iterable de lotes de filas (tuplas en el orden de ``fields``).
+    Devuelve el número de filas escritas.
+    """
+    # Plantilla por fila precalculada: '{"id": %s, "name": %s, ...}'
+    template = '{' + ', '.join(_encode_string(f) + ': %s' for f in fields) + '}'
+    encode = _encode_value
+    count = 0
+
+    out.write('[')
+    for batch in batches:
+        if not batch:
+            continue
+        chunk = ', '.join([template % tuple([encode(v) for v in row]) for row in batch])
+        out.write(', ' + chunk if count else chunk)
+        count += len(batch)
+    out.write(']')
+    return count
+
+
+def stream_query_json(conn, query, fields, params=(), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Ejecuta la consulta y devuelve (texto_json, filas) sin materializar dicts.
+    En la traza, los FETCH cuentan como ``query`` y el resto como ``serialize``.
+    """
+    out = io.StringIO()
+    with span('serialize'):
+        count = write_json_array(iter_server_side(conn, query, params, batch_size), fields, out)
+    return out.getvalue(), count
+
+
+def write_json_rows(batches, out, converters=None):
+    """
+    Escribe en ``out`` un array JSON de arrays (formato columnar compacto,
+    sin espacios). ``converters`` es {posición: función} para transformar
+    valores de una columna antes de codificarlos. Devuelve las filas escritas.
+    """
+    encode = _encode_value
+    converters = converters or {}
+    count = 0
+
+    out.write('[')
+    for batch in batches:
+        if not batch:
+            continue
+        if converters:
+            batch = [
+                [converters[i](v) if i in converters else v for i, v in enumerate(row)]
+                for row in batch
+            ]
+        chunk = ','.join(['[' + ','.join([encode(v) for v in row]) + ']' for row in batch])
+        out.write(',' + chunk if count else chunk)
+        count += len(batch)
+    out.write(']')
+    return count
+
+
+def stream_query_rows_json(conn, query, params=(), batch_size=DEFAULT_BATCH_SIZE, converters=None):
+    """Como ``stream_query_json`` pero con cada fila como array JSON"""
+    out = io.StringIO()
+    with span('serialize'):
+        count = write_json_rows(iter_server_side(conn, query, params, batch_size), out, converters)
+    return out.getvalue(), count
@@ -0,0 +1,109 @@
+"""
+Registro de consultas lentas de las funciones Lambda.
+
+``timed_execute`` sustituye a ``cursor.execute``: mide cada sentencia y, si
+supera SLOW_QUERY_MS, escribe en CloudWatch una línea JSON con la sentencia
+normalizada, su huella, los parámetros y el ``request_id`` de la traza:
+
+    {"slow_query": "3f2a9c1b7d0e", "function": "getProducts", "duration_ms": 812.4,
+     "statement": "SELECT id, name FROM productos ORDER BY id ASC LIMIT %s", ...}
+
+scripts/report_slow_queries.py agrega esas líneas por huella.
+
+Con SLOW_QUERY_EXPLAIN_RATE > 0 una fracción de las consultas lentas añade
+su plan. ``EXPLAIN ANALYZE`` vuelve a ejecutar la sentencia, así que sólo se
+usa con lecturas puras: SELECT/WITH sin INSERT, UPDATE, DELETE ni FOR
+UPDATE/SHARE en ninguna parte (la compra de getItem es un UPDATE dentro de un
+WITH). Para el resto se
+registra el plan estimado (``EXPLAIN`` sin ejecutar). El plan se obtiene
+dentro de un SAVEPOINT para que un fallo no aborte la transacción en curso.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from tracing import current_request_id
+
+# Umbral en milisegundos; negativo desactiva el registro
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+# Fracción de consultas lentas con plan (0 = nunca, 1 = todas)
+EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', '0'))
+# Longitud máxima de cada parámetro registrado (listas de ids, nombres...)
+MAX_PARAM_LENGTH = 200
+
+_READ_ONLY = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+# Escrituras (también dentro de un WITH) y lecturas con bloqueo
+_UNSAFE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|SHARE)\b', re.IGNORECASE)
+
+
+def normalize(statement):
+    """Sentencia en una línea: misma forma, mismo texto"""
+    return ' '.join(statement.split())
+
+
+def fingerprint(statement):
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:12]
+
+
+def _format_param(value):
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '...'
+
+
+def _explain(conn, statement, params):
+    """Plan de la sentencia (con ANALYZE y BUFFERS sólo si es de lectura)"""
+    analyze = _READ_ONLY.match(statement) and not _UNSAFE.search(statement)
+    options = '(ANALYZE, BUFFERS) ' if analyze else ''
+    cursor = conn.cursor()
+    savepoint = not conn.autocommit
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        cursor.execute(f"EXPLAIN {options}{statement}", tuple(params))
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return {'analyze': bool(analyze), 'plan': plan}
+    except Exception as e:
+        if savepoint:
+            try:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            except Exception:
+                pass
+        return {'analyze': bool(analyze), 'error': str(e)}
+    finally:
+        cursor.close()
+
+
+def record(conn, statement, params, elapsed_ms, rows=None):
+    """Registra la sentencia si supera el umbral (y, por muestreo, su plan)"""
+    if SLOW_QUERY_MS < 0 or elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    entry = {
+        'slow_query': fingerprint(statement),
+        'function': os.environ.get('AWS_LAMBDA_FUNCTION_NAME'),
+        'request_id': current_request_id(),
+        'duration_ms': round(elapsed_ms, 3),
+        'threshold_ms': SLOW_QUERY_MS,
+        'rows': rows,
+        'statement': normalize(statement),
+        'params': [_format_param(p) for p in params or ()]
+    }
+    if conn is not None and EXPLAIN_RATE > 0 and random.random() < EXPLAIN_RATE:
+        entry['explain'] = _explain(conn, statement, params or ())
+    print(json.dumps(entry))
+
+
+def timed_execute(conn, cursor, statement, params=(), stream=None):
+    """``cursor.execute`` medido; ``conn`` hace falta para el EXPLAIN"""
+    start = time.perf_counter()
+    if stream is None:
+        cursor.execute(statement, params)
+    else:
+        cursor.execute(statement, params, stream=stream)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    record(conn, statement, params, elapsed_ms, cursor.rowcount)
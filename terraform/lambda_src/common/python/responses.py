@@ -0,0 +1,61 @@
+"""
+Respuestas AWS_PROXY de las funciones Lambda.
+
+Las cabeceras se construyen una vez al cargar el módulo y cada respuesta
+recibe su propia copia: tracing, etag y compression añaden cabeceras a la
+respuesta y no deben tocar las compartidas.
+"""
+
+import json
+
+JSON_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Lecturas del catálogo: CORS para GET y revalidación con If-None-Match
+READ_HEADERS = {
+    **JSON_HEADERS,
+    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
+}
+
+# Altas de productos: CORS para POST; el resultado de una escritura no se cachea
+WRITE_HEADERS = {
+    **JSON_HEADERS,
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Cache-Control': 'no-store'
+}
+
+# Respuestas que no deben cachearse nunca (ping)
+NO_STORE_HEADERS = {**JSON_HEADERS, 'Cache-Control': 'no-store'}
+
+
+def request_header(event, name):
+    """Cabecera de la petición sin distinguir mayúsculas (API Gateway no normaliza)"""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def json_response(status_code, payload=None, headers=JSON_HEADERS, body=None):
+    """Respuesta con ``payload`` serializado (o ``body`` ya serializado)"""
+    return {
+        'statusCode': status_code,
+        'headers': dict(headers),
+        'body': body if body is not None else json.dumps(payload)
+    }
+
+
+def error_response(status_code, error, **extra):
+    """Respuesta de error {"error": error, ...}"""
+    return json_response(status_code, {'error': error, **extra})
+
+
+def server_error(function_name, error):
+    """500 ante un error no controlado, registrado en CloudWatch"""
+    print(f"ERROR in {function_name}: {str(error)}")
+    return error_response(500, 'Error interno del servidor', message=str(error))
@@ -0,0 +1,106 @@
+"""
+Trazas por invocación para las funciones Lambda.
+
+El frontend envía su identificador de petición en la cabecera ``X-Request-Id``
+y el API Gateway la entrega en el evento; si falta se usa el ``requestId``
+del propio API Gateway. Cada invocación acumula el tiempo de sus fases
+(``db_connect``, ``query``, ``serialize``, ``compress``...) y al terminar
+escribe en CloudWatch una línea JSON:
+
+    {"span": "getProducts", "request_id": "...", "status": 200,
+     "total_ms": 12.4, "phases": {"db_connect": 0.1, "query": 8.9, ...}}
+
+que se puede filtrar y agregar con Logs Insights por ``request_id`` junto a
+las líneas del frontend. La respuesta devuelve el mismo ``X-Request-Id``.
+
+La traza activa se guarda por hilo: en Lambda hay una invocación por
+contenedor, y local_api.py ejecuta cada handler en su propio hilo.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from responses import request_header
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+
+ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() in ('true', '1', 'yes')
+
+_local = threading.local()
+
+
+def request_id(event):
+    """Id propagado por el frontend, el del API Gateway o uno nuevo"""
+    value = (request_header(event, REQUEST_ID_HEADER)
+             or (event.get('requestContext') or {}).get('requestId')
+             or uuid.uuid4().hex)
+    # La cabecera llega del cliente tal cual: se acota antes de escribirla en los logs
+    return value[:128]
+
+
+def current_request_id():
+    trace = getattr(_local, 'trace', None)
+    return trace['request_id'] if trace else None
+
+
+@contextmanager
+def span(name):
+    """
+    Suma la duración del bloque a la fase ``name`` de la invocación en curso.
+    Las fases son exclusivas: un ``query`` dentro de ``serialize`` (los FETCH
+    del JSON en streaming) se descuenta de la fase externa.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    stack = trace['stack']
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        trace['phases'][name] = trace['phases'].get(name, 0.0) + elapsed - nested
+
+
+def traced(function_name):
+    """
+    Decorador del ``lambda_handler``: abre la traza, añade ``X-Request-Id`` a
+    la respuesta y escribe la línea JSON con el total y las fases.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not ENABLED:
+                return handler(event, context)
+
+            trace = {'request_id': request_id(event or {}), 'phases': {}, 'stack': []}
+            _local.trace = trace
+            start = time.perf_counter()
+            response = None
+            try:
+                response = handler(event, context)
+                return response
+            finally:
+                _local.trace = None
+                total = (time.perf_counter() - start) * 1000
+                status = response.get('statusCode') if isinstance(response, dict) else None
+                if isinstance(response, dict):
+                    response.setdefault('headers', {})[REQUEST_ID_HEADER] = trace['request_id']
+                print(json.dumps({
+                    'span': function_name,
+                    'request_id': trace['request_id'],
+                    'status': status,
+                    'total_ms': round(total, 3),
+                    'phases': {name: round(ms, 3) for name, ms in trace['phases'].items()}
+                }))
+        return wrapper
+    return decorator
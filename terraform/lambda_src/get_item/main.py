@@ -1,204 +1,140 @@
 import json
-import os
-import pg8000.dbapi
+from db_pool import get_connection, get_read_connection, release_connection, log_pool_stats
+from compression import request_body
+from data_access import PRODUCT_COLUMNS, product_mapper, query, warm_up
+from etag import VERSION_QUERY, get_catalog_version, make_etag, is_not_modified, not_modified
+from responses import JSON_HEADERS, json_response, error_response, server_error
+from tracing import traced, span
 
-def get_db_connection():
-    """Establece conexión con PostgreSQL RDS"""
-    return pg8000.dbapi.connect(
-        host=os.environ.get('DB_HOST'),
-        user=os.environ.get('DB_USER'),
-        password=os.environ.get('DB_PASSWORD'),
-        database=os.environ.get('DB_NAME'),
-        port=5432
+# Compra atómica en una única sentencia:
+#  - sin filas            -> el producto no existe (404)
+#  - purchased_stock NULL -> el UPDATE condicional no aplicó: stock insuficiente (409)
+#  - en otro caso         -> compra hecha; purchased_stock es el stock resultante
+# El UPDATE re-evalúa "stock >= %s" sobre la versión más reciente de la fila,
+# así que el stock nunca puede quedar negativo aunque haya compras concurrentes.
+PURCHASE_QUERY = """
+    WITH target AS (
+        SELECT name, stock FROM productos WHERE id = %s
+    ), purchase AS (
+        UPDATE productos
+        SET stock = stock - %s
+        WHERE id = %s AND stock >= %s
+        RETURNING stock
     )
+    SELECT target.name, target.stock, (SELECT stock FROM purchase) AS purchased_stock
+    FROM target
+"""
 
+PRODUCT_QUERY = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM productos WHERE id = %s"
+
+to_product = product_mapper(PRODUCT_COLUMNS)
+
+# Fase init: conexiones y sentencias preparadas antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('getItem', VERSION_QUERY, PRODUCT_QUERY, read_only=True)
+warm_up('getItem', PURCHASE_QUERY)
+
+@traced('getItem')
 def lambda_handler(event, context):
     """
     Lambda function: getItem
-    Devuelve un producto por ID o procesa una compra
+    Devuelve un producto por ID o procesa una compra.
+    El GET lleva ETag con la versión del catálogo y admite If-None-Match (304).
     """
     try:
         # Obtener parámetros dependiendo del método HTTP
         if event.get('httpMethod') == 'GET':
             # Obtener producto por ID desde query parameters
-            product_id = event.get('queryStringParameters', {}).get('id')
+            product_id = (event.get('queryStringParameters') or {}).get('id')
             if not product_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Parámetro id requerido'
-                    })
-                }
-            
-            # Conectar y obtener producto
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, name, category, price, stock, created_at, updated_at 
-                FROM productos 
-                WHERE id = %s
-            """, (int(product_id),))
-            
-            row = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            if not row:
-                return {
-                    'statusCode': 404,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'Producto no encontrado'
-                    })
-                }
-            
-            product = {
-                'id': row[0],
-                'name': row[1],
-                'category': row[2],
-                'price': float(row[3]),
-                'stock': row[4],
-                'created_at': row[5].isoformat() if row[5] else None,
-                'updated_at': row[6].isoformat() if row[6] else None
-            }
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps(product)
-            }
+                return error_response(400, 'Parámetro id requerido')
+            try:
+                product_id = int(product_id)
+            except (TypeError, ValueError):
+                return error_response(400, 'id debe ser un entero')
+            
+            # Obtener producto con la conexión de lectura reutilizada del contenedor
+            # (réplica si la hay); las compras van siempre a la primaria
+            conn = get_read_connection()
+            
+            version = get_catalog_version(conn)
+            etag = make_etag(version, 'item', product_id) if version is not None else None
+            if is_not_modified(event, etag):
+                release_connection(conn)
+                log_pool_stats('getItem')
+                return not_modified(etag, JSON_HEADERS)
+            
+            try:
+                with span('query'):
+                    rows = query(conn, PRODUCT_QUERY, (product_id,))
+            except Exception:
+                release_connection(conn, discard=True)
+                raise
+            
+            release_connection(conn)
+            log_pool_stats('getItem')
+            
+            if not rows:
+                return error_response(404, 'Producto no encontrado')
+            
+            response = json_response(200, to_product(rows[0]))
+            if etag:
+                response['headers'].update({'ETag': etag, 'Cache-Control': 'no-cache'})
+            return response
         
         elif event.get('httpMethod') == 'POST':
             # Procesar compra
-            body = json.loads(event.get('body', '{}'))
+            body = json.loads(request_body(event) or '{}')
             product_id = body.get('product_id')
-            quantity = int(body.get('quantity', 1))
             
             if not product_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'error': 'product_id requerido'
-                    })
-                }
-            
-            # Conectar y procesar transacción
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Iniciar transacción explícita
-            cursor.execute("BEGIN")
+                return error_response(400, 'product_id requerido')
             
             try:
-                # Verificar stock actual con lock
-                cursor.execute("""
-                    SELECT id, name, stock 
-                    FROM productos 
-                    WHERE id = %s 
-                    FOR UPDATE
-                """, (int(product_id),))
-                
-                product_data = cursor.fetchone()
-                
-                if not product_data:
-                    cursor.execute("ROLLBACK")
-                    return {
-                        'statusCode': 404,
-                        'headers': {
-                            'Content-Type': 'application/json',
-                            'Access-Control-Allow-Origin': '*'
-                        },
-                        'body': json.dumps({
-                            'error': 'Producto no encontrado'
-                        })
-                    }
-                
-                current_stock = product_data[2]
-                product_name = product_data[1]
-                
-                if current_stock < quantity:
-                    cursor.execute("ROLLBACK")
-                    return {
-                        'statusCode': 409,
-                        'headers': {
-                            'Content-Type': 'application/json',
-                            'Access-Control-Allow-Origin': '*'
-                        },
-                        'body': json.dumps({
-                            'error': f'Stock insuficiente. Disponible: {current_stock}'
-                        })
-                    }
-                
-                # Actualizar stock
-                new_stock = current_stock - quantity
-                cursor.execute("""
-                    UPDATE productos 
-                    SET stock = %s, updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = %s
-                """, (new_stock, int(product_id)))
-                
-                # Confirmar transacción
-                cursor.execute("COMMIT")
-                cursor.close()
-                conn.close()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {
-                        'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*'
-                    },
-                    'body': json.dumps({
-                        'message': f'Compra exitosa de {quantity} unidad(es) de {product_name}',
-                        'product_id': int(product_id),
-                        'quantity_purchased': quantity,
-                        'new_stock': new_stock
-                    })
-                }
-                
+                product_id = int(product_id)
+                quantity = int(body.get('quantity', 1))
+            except (TypeError, ValueError):
+                return error_response(400, 'product_id y quantity deben ser enteros')
+            
+            if quantity <= 0:
+                return error_response(400, 'quantity debe ser mayor que 0')
+            
+            # Compra con la conexión reutilizada del contenedor
+            conn = get_connection()
+            
+            try:
+                # Una sola sentencia en autocommit: el lock de fila dura sólo
+                # lo que tarda el UPDATE, sin BEGIN/COMMIT adicionales
+                conn.autocommit = True
+                try:
+                    with span('query'):
+                        rows = query(conn, PURCHASE_QUERY, (product_id, quantity, product_id, quantity))
+                finally:
+                    conn.autocommit = False
             except Exception as transaction_error:
-                cursor.execute("ROLLBACK")
-                cursor.close()
-                conn.close()
+                # Ante un error de BD la sesión puede haber quedado inutilizable
+                release_connection(conn, discard=True)
                 raise transaction_error
+            
+            release_connection(conn)
+            log_pool_stats('getItem')
+            
+            if not rows:
+                return error_response(404, 'Producto no encontrado')
+            
+            product_name, current_stock, new_stock = rows[0]
+            
+            if new_stock is None:
+                return error_response(409, f'Stock insuficiente. Disponible: {current_stock}')
+            
+            return json_response(200, {
+                'message': f'Compra exitosa de {quantity} unidad(es) de {product_name}',
+                'product_id': product_id,
+                'quantity_purchased': quantity,
+                'new_stock': new_stock
+            })
         
         else:
-            return {
-                'statusCode': 405,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Método no permitido'
-                })
-            }
+            return error_response(405, 'Método no permitido')
             
     except Exception as e:
-        print(f"ERROR in getItem: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Error interno del servidor',
-                'message': str(e)
-            })
-        }
\ No newline at end of file
+        return server_error('getItem', e)
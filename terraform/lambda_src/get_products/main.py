@@ -1,73 +1,290 @@
+import base64
 import json
 import os
-import pg8000.dbapi
-
-def get_db_connection():
-    """Establece conexión con PostgreSQL RDS"""
-    return pg8000.dbapi.connect(
-        host=os.environ.get('DB_HOST'),
-        user=os.environ.get('DB_USER'),
-        password=os.environ.get('DB_PASSWORD'),
-        database=os.environ.get('DB_NAME'),
-        port=5432
-    )
+from decimal import Decimal, InvalidOperation
+from db_pool import get_read_connection, release_connection, log_pool_stats
+from json_stream import stream_query_json, stream_query_rows_json
+from compression import compress_response
+from data_access import PRODUCT_COLUMNS, product_mapper, compact_mapper, to_cents, query, warm_up
+from etag import VERSION_QUERY, get_catalog_version, make_etag, is_not_modified, not_modified
+from responses import READ_HEADERS, json_response, error_response, server_error
+from tracing import traced, span
 
+# Paginación por keyset sobre id
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Filas por FETCH al servir el catálogo completo
+STREAM_BATCH_SIZE = int(os.environ.get('PRODUCTS_STREAM_BATCH_SIZE', '1000'))
+
+# Columnas que se pueden pedir con ?fields= (en el orden de la tabla)
+PRODUCT_FIELDS = PRODUCT_COLUMNS
+
+# Ordenaciones admitidas con ?sort=: columna y dirección. El id desempata y
+# forma parte de la clave del cursor, así que el orden es siempre total.
+SORT_OPTIONS = {
+    'id': ('id', 'ASC'),
+    '-id': ('id', 'DESC'),
+    'price': ('price', 'ASC'),
+    '-price': ('price', 'DESC'),
+    'name': ('name', 'ASC'),
+    '-name': ('name', 'DESC')
+}
+
+# ?format=compact: claves cortas, filas como arrays, precio en céntimos y sin
+# created_at/updated_at salvo que se pidan en fields
+COMPACT_KEYS = {
+    'id': 'i',
+    'name': 'n',
+    'category': 'c',
+    'price': 'p',
+    'stock': 's',
+    'created_at': 'ca',
+    'updated_at': 'ua'
+}
+COMPACT_DEFAULT_FIELDS = 'id,name,category,price,stock'
+FORMATS = ('json', 'compact')
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+def encode_cursor(last_id, sort='id', last_value=None):
+    """Cursor opaco para la siguiente página"""
+    position = {'id': last_id}
+    if SORT_OPTIONS[sort][0] != 'id':
+        # El precio viaja como texto para no perder precisión decimal
+        position.update({'sort': sort, 'value': str(last_value)})
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(cursor, sort='id'):
+    """
+    Extrae (último valor de la columna de orden, último id) de un cursor.
+    Un cursor generado con otra ordenación no es válido.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last_id = int(position['id'])
+        if SORT_OPTIONS[sort][0] == 'id':
+            if 'sort' in position:
+                raise ValueError
+            return None, last_id
+        if position['sort'] != sort:
+            raise ValueError
+        return position['value'], last_id
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+def parse_fields(raw):
+    """Valida la proyección pedida; el id se incluye siempre porque es la clave del cursor"""
+    if not raw:
+        return PRODUCT_FIELDS
+
+    requested = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = requested - set(PRODUCT_FIELDS)
+    if unknown:
+        raise ValueError(f'Campos desconocidos: {", ".join(sorted(unknown))}')
+
+    requested.add('id')
+    return tuple(f for f in PRODUCT_FIELDS if f in requested)
+
+def parse_price(raw, name):
+    """Precio no negativo de un filtro de rango"""
+    try:
+        price = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f'{name} debe ser numérico')
+    if not price.is_finite() or price < 0:
+        raise ValueError(f'{name} debe ser un número mayor o igual que 0')
+    return price
+
+def parse_filters(params):
+    """
+    Convierte category, min_price, max_price e in_stock en condiciones SQL
+    parametrizadas. Devuelve (condiciones, parámetros).
+    """
+    conditions = []
+    values = []
+
+    category = params.get('category')
+    if category:
+        if len(category) > 100:
+            raise ValueError('category no puede superar 100 caracteres')
+        conditions.append('category = %s')
+        values.append(category)
+
+    min_price = parse_price(params['min_price'], 'min_price') if params.get('min_price') else None
+    max_price = parse_price(params['max_price'], 'max_price') if params.get('max_price') else None
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError('min_price no puede ser mayor que max_price')
+    if min_price is not None:
+        conditions.append('price >= %s')
+        values.append(min_price)
+    if max_price is not None:
+        conditions.append('price <= %s')
+        values.append(max_price)
+
+    in_stock = params.get('in_stock')
+    if in_stock:
+        if in_stock.lower() not in BOOLEAN_VALUES:
+            raise ValueError('in_stock debe ser true o false')
+        conditions.append('stock > 0' if BOOLEAN_VALUES[in_stock.lower()] else 'stock = 0')
+
+    return conditions, values
+
+def parse_format(raw):
+    """Representación de la respuesta: json (por defecto) o compact"""
+    fmt = raw or 'json'
+    if fmt not in FORMATS:
+        raise ValueError(f'format debe ser uno de: {", ".join(FORMATS)}')
+    return fmt
+
+def parse_sort(raw):
+    """Clave de ordenación validada contra SORT_OPTIONS"""
+    sort = raw or 'id'
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f'sort debe ser uno de: {", ".join(SORT_OPTIONS)}')
+    return sort
+
+def keyset_condition(sort, last_value, last_id):
+    """
+    Condición para continuar tras la última fila vista. La comparación de
+    filas (columna, id) > (%s, %s) se resuelve con un índice que empiece
+    por las columnas de filtro y siga con las de orden.
+    """
+    column, direction = SORT_OPTIONS[sort]
+    operator = '>' if direction == 'ASC' else '<'
+    if column == 'id':
+        return f'id {operator} %s', [last_id]
+    cast = 'NUMERIC' if column == 'price' else 'TEXT'
+    return f'({column}, id) {operator} (CAST(%s AS {cast}), %s)', [last_value, last_id]
+
+def parse_limit(raw):
+    """Tamaño de página acotado a MAX_PAGE_SIZE"""
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    limit = int(raw)
+    if limit <= 0:
+        raise ValueError('limit debe ser mayor que 0')
+    return min(limit, MAX_PAGE_SIZE)
+
+# Fase init: conexión abierta antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('getProducts', VERSION_QUERY, read_only=True)
+
+@traced('getProducts')
 def lambda_handler(event, context):
     """
     Lambda function: getProducts
-    Devuelve todos los productos de la base de datos PostgreSQL
+    Devuelve los productos de la base de datos PostgreSQL.
+
+    Query parameters opcionales:
+      - limit / after: paginación por keyset sobre id. Si se usa alguno,
+        la respuesta es {"products": [...], "next_cursor": "..." | null}
+      - fields: lista separada por comas de columnas a devolver
+      - category: sólo productos de esa categoría
+      - min_price / max_price: rango de precio (inclusivo)
+      - in_stock: true (stock > 0) o false (agotados)
+      - sort: id, -id, price, -price, name, -name (el id desempata)
+      - format: json (por defecto) o compact:
+        {"fields": ["i", "n", ...], "rows": [[...], ...], "next_cursor": ...}
+        con el precio en céntimos y sin fechas salvo que se pidan en fields
+    Sin limit ni after se devuelve la lista completa (filtrada) como antes.
+    La respuesta se comprime con gzip/brotli si el cliente lo acepta.
+
+    La respuesta lleva un ETag con la versión del catálogo; si coincide con
+    If-None-Match se devuelve 304 sin consultar ni serializar los productos.
     """
     try:
-        # Conectar a la base de datos
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Ejecutar consulta
-        cursor.execute("""
-            SELECT id, name, category, price, stock, created_at, updated_at 
-            FROM productos 
-            ORDER BY id ASC
-        """)
-        rows = cursor.fetchall()
-        
-        # Convertir a formato JSON
-        products = []
-        for row in rows:
-            products.append({
-                'id': row[0],
-                'name': row[1],
-                'category': row[2],
-                'price': float(row[3]),
-                'stock': row[4],
-                'created_at': row[5].isoformat() if row[5] else None,
-                'updated_at': row[6].isoformat() if row[6] else None
-            })
-        
-        # Cerrar conexión
-        cursor.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps(products)
-        }
-        
+        params = event.get('queryStringParameters') or {}
+        paginated = 'limit' in params or 'after' in params
+
+        try:
+            sort = parse_sort(params.get('sort'))
+            sort_column, sort_direction = SORT_OPTIONS[sort]
+            compact = parse_format(params.get('format')) == 'compact'
+            fields = parse_fields(params.get('fields') or (COMPACT_DEFAULT_FIELDS if compact else None))
+            # La columna de orden se devuelve siempre: hace falta para el cursor
+            fields = tuple(f for f in PRODUCT_FIELDS if f in fields or f == sort_column)
+            limit = parse_limit(params.get('limit')) if paginated else None
+            conditions, query_params = parse_filters(params)
+            if params.get('after'):
+                after_value, after_id = decode_cursor(params['after'], sort)
+                condition, condition_params = keyset_condition(sort, after_value, after_id)
+                conditions.append(condition)
+                query_params.extend(condition_params)
+        except ValueError as validation_error:
+            return error_response(400, f'Parámetros inválidos: {str(validation_error)}')
+
+        # Columnas y ordenación salen de PRODUCT_FIELDS y SORT_OPTIONS, nunca del usuario directamente
+        sql = f"SELECT {', '.join(fields)} FROM productos"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if sort_column == 'id':
+            sql += f" ORDER BY id {sort_direction}"
+        else:
+            sql += f" ORDER BY {sort_column} {sort_direction}, id {sort_direction}"
+        if paginated:
+            # Una fila extra indica si hay más páginas
+            sql += " LIMIT %s"
+            query_params.append(limit + 1)
+
+        # Conexión reutilizada entre invocaciones warm (la réplica de lectura si la hay)
+        conn = get_read_connection()
+
+        # Versión del catálogo antes que los datos (ver etag.py)
+        version = get_catalog_version(conn)
+        etag = make_etag(version, 'products', sorted(params.items())) if version is not None else None
+        if is_not_modified(event, etag):
+            release_connection(conn)
+            log_pool_stats('getProducts')
+            return not_modified(etag, READ_HEADERS)
+
+        try:
+            if paginated:
+                # Sentencia preparada: las páginas siguientes sólo envían BIND/EXECUTE
+                with span('query'):
+                    rows = query(conn, sql, tuple(query_params))
+            elif compact:
+                # Catálogo completo: cursor de servidor y JSON escrito por lotes
+                converters = {fields.index('price'): to_cents} if 'price' in fields else None
+                rows_json, _ = stream_query_rows_json(conn, sql, tuple(query_params),
+                                                      STREAM_BATCH_SIZE, converters)
+                body = ('{"fields":' + json.dumps([COMPACT_KEYS[f] for f in fields], separators=(',', ':'))
+                        + ',"rows":' + rows_json + '}')
+            else:
+                # Catálogo completo: cursor de servidor y JSON escrito por lotes
+                body, _ = stream_query_json(conn, sql, fields, tuple(query_params), STREAM_BATCH_SIZE)
+        except Exception:
+            release_connection(conn, discard=True)
+            raise
+
+        # Devolver la conexión al contenedor
+        release_connection(conn)
+        log_pool_stats('getProducts')
+
+        if paginated:
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(last[fields.index('id')], sort, last[fields.index(sort_column)])
+
+            with span('serialize'):
+                if compact:
+                    body = json.dumps({
+                        'fields': [COMPACT_KEYS[f] for f in fields],
+                        'rows': list(map(compact_mapper(fields), rows)),
+                        'next_cursor': next_cursor
+                    }, separators=(',', ':'))
+                else:
+                    # Convertir a formato JSON
+                    products = list(map(product_mapper(fields), rows))
+                    body = json.dumps({'products': products, 'next_cursor': next_cursor})
+
+        response = json_response(200, headers=READ_HEADERS, body=body)
+        if etag:
+            # Los cachés pueden guardarla, pero deben revalidar con el ETag
+            response['headers'].update({'ETag': etag, 'Cache-Control': 'no-cache'})
+
+        return compress_response(event, response)
+
     except Exception as e:
-        print(f"ERROR in getProducts: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': 'Error interno del servidor',
-                'message': str(e)
-            })
-        }
\ No newline at end of file
+        return server_error('getProducts', e)
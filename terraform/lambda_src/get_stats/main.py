@@ -0,0 +1,188 @@
+import json
+import time
+from db_pool import get_connection, get_read_connection, release_connection, log_pool_stats
+from compression import compress_response
+from data_access import product_mapper, query, warm_up
+from etag import make_etag, is_not_modified, not_modified
+from responses import READ_HEADERS, json_response, error_response, server_error
+from tracing import traced, span
+
+DEFAULT_LOW_STOCK_LIMIT = 20
+# productos_low_stock guarda como mucho 50 productos por categoría
+MAX_LOW_STOCK_LIMIT = 50
+
+# Tramos de productos_analytics (scripts/init_database.sql), con sus etiquetas
+STOCK_STATUS = ('Agotado', 'Stock Bajo', 'Stock Normal', 'Stock Alto')
+PRICE_CATEGORIES = ('Económico', 'Medio', 'Premium', 'Lujo')
+
+# Versión del catálogo y hora del último refresco de los agregados
+STATE_QUERY = "SELECT catalog_version, refreshed_at FROM catalog_stats_refresh"
+
+CATEGORY_QUERY = """
+    SELECT category, products, total_stock,
+           out_of_stock, low_stock, normal_stock, high_stock,
+           economic, medium, premium, luxury,
+           min_price, max_price, price_sum
+    FROM productos_category_stats
+    ORDER BY category
+"""
+
+LOW_STOCK_FIELDS = ('id', 'name', 'category', 'price', 'stock')
+LOW_STOCK_QUERY = f"""
+    SELECT {', '.join(LOW_STOCK_FIELDS)} FROM productos_low_stock
+    ORDER BY stock, id
+    LIMIT %s
+"""
+CATEGORY_LOW_STOCK_QUERY = f"""
+    SELECT {', '.join(LOW_STOCK_FIELDS)} FROM productos_low_stock
+    WHERE category = %s
+    ORDER BY stock, id
+    LIMIT %s
+"""
+
+# Invocación programada (EventBridge): recalcula las vistas si el catálogo cambió
+REFRESH_QUERY = "SELECT refresh_catalog_stats(%s)"
+
+to_low_stock = product_mapper(LOW_STOCK_FIELDS)
+
+def parse_limit(raw):
+    """Productos con stock bajo a devolver, acotado a MAX_LOW_STOCK_LIMIT"""
+    if raw is None:
+        return DEFAULT_LOW_STOCK_LIMIT
+    limit = int(raw)
+    if limit < 0:
+        raise ValueError('low_stock_limit debe ser mayor o igual que 0')
+    return min(limit, MAX_LOW_STOCK_LIMIT)
+
+def summarize(rows):
+    """
+    Agregados por categoría y totales del catálogo. Los totales se suman
+    aquí a partir de las filas de categoría: la media global sale de
+    price_sum y no de promediar las medias.
+    """
+    categories = []
+    totals = {'products': 0, 'total_stock': 0,
+              'stock_status': dict.fromkeys(STOCK_STATUS, 0),
+              'price_category': dict.fromkeys(PRICE_CATEGORIES, 0)}
+    price_sum = 0
+
+    for (category, products, total_stock, *buckets, min_price, max_price, category_price_sum) in rows:
+        stock_status = dict(zip(STOCK_STATUS, buckets[:4]))
+        price_category = dict(zip(PRICE_CATEGORIES, buckets[4:]))
+        categories.append({
+            'category': category,
+            'products': products,
+            'total_stock': int(total_stock),
+            'stock_status': stock_status,
+            'price_category': price_category,
+            'min_price': float(min_price),
+            'max_price': float(max_price),
+            'avg_price': round(float(category_price_sum / products), 2)
+        })
+
+        totals['products'] += products
+        totals['total_stock'] += int(total_stock)
+        for label, count in stock_status.items():
+            totals['stock_status'][label] += count
+        for label, count in price_category.items():
+            totals['price_category'][label] += count
+        price_sum += category_price_sum
+
+    totals['categories'] = len(categories)
+    totals['min_price'] = min((c['min_price'] for c in categories), default=None)
+    totals['max_price'] = max((c['max_price'] for c in categories), default=None)
+    totals['avg_price'] = round(float(price_sum / totals['products']), 2) if totals['products'] else None
+    return totals, categories
+
+def refresh(event):
+    """Refresco programado: sólo recorre productos si el catálogo cambió desde el anterior"""
+    start = time.perf_counter()
+    conn = get_connection()
+    try:
+        refreshed = query(conn, REFRESH_QUERY, (bool(event.get('force')),))[0][0]
+        conn.commit()
+    except Exception:
+        release_connection(conn, discard=True)
+        raise
+    release_connection(conn)
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    print(json.dumps({'stats_refresh': refreshed, 'ms': elapsed_ms}))
+    return json_response(200, {'refreshed': refreshed, 'ms': elapsed_ms})
+
+# Fase init: conexión y sentencias preparadas antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('getStats', STATE_QUERY, CATEGORY_QUERY, LOW_STOCK_QUERY, read_only=True)
+
+@traced('getStats')
+def lambda_handler(event, context):
+    """
+    Lambda function: getStats
+    Estadísticas del catálogo para dashboards, servidas desde las vistas
+    materializadas productos_category_stats y productos_low_stock: por
+    categoría y en total, productos, stock, tramos de stock y de precio
+    (los de productos_analytics) y precios mínimo, máximo y medio, más los
+    productos con stock bajo.
+
+    Query parameters opcionales:
+      - category: sólo esa categoría (agregados y stock bajo)
+      - low_stock_limit: productos con stock bajo a devolver (20, máximo 50)
+
+    Los agregados van por detrás del catálogo como mucho un intervalo de la
+    regla programada de EventBridge, que invoca esta misma función para
+    refrescarlos (refreshed_at indica cuándo se calcularon). El ETag cambia
+    con cada refresco, no con cada escritura en productos.
+    """
+    try:
+        if event.get('source') == 'aws.events':
+            return refresh(event)
+
+        params = event.get('queryStringParameters') or {}
+        category = params.get('category')
+
+        try:
+            limit = parse_limit(params.get('low_stock_limit'))
+        except ValueError as validation_error:
+            return error_response(400, f'Parámetros inválidos: {str(validation_error)}')
+
+        # Las vistas materializadas se replican como cualquier tabla; el refresco va a la primaria
+        conn = get_read_connection()
+
+        try:
+            version, refreshed_at = query(conn, STATE_QUERY)[0]
+            etag = make_etag(version, 'stats', refreshed_at, category, limit)
+            if is_not_modified(event, etag):
+                release_connection(conn)
+                log_pool_stats('getStats')
+                return not_modified(etag, READ_HEADERS)
+
+            with span('query'):
+                category_rows = query(conn, CATEGORY_QUERY)
+                if category:
+                    category_rows = [row for row in category_rows if row[0] == category]
+                    low_stock_rows = query(conn, CATEGORY_LOW_STOCK_QUERY, (category, limit)) if limit else []
+                else:
+                    low_stock_rows = query(conn, LOW_STOCK_QUERY, (limit,)) if limit else []
+        except Exception:
+            release_connection(conn, discard=True)
+            raise
+
+        release_connection(conn)
+        log_pool_stats('getStats')
+
+        if category and not category_rows:
+            return error_response(404, 'Categoría no encontrada')
+
+        with span('serialize'):
+            totals, categories = summarize(category_rows)
+            response = json_response(200, {
+                'totals': totals,
+                'categories': categories,
+                'low_stock': list(map(to_low_stock, low_stock_rows)),
+                'refreshed_at': refreshed_at.isoformat() if refreshed_at else None
+            }, headers=READ_HEADERS)
+
+        response['headers'].update({'ETag': etag, 'Cache-Control': 'no-cache'})
+        return compress_response(event, response)
+
+    except Exception as e:
+        return server_error('getStats', e)
@@ -0,0 +1,40 @@
+import time
+from db_pool import get_connection, release_connection
+from data_access import query, warm_up
+from responses import NO_STORE_HEADERS, json_response
+from tracing import traced, span
+
+# Fase init: conexión abierta antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('ping', "SELECT 1")
+
+@traced('ping')
+def lambda_handler(event, context):
+    """
+    Lambda function: ping
+    Comprobación ligera del backend: SELECT 1 sobre la conexión reutilizada,
+    sin tocar la tabla productos
+    """
+    start = time.perf_counter()
+    try:
+        conn = get_connection()
+        
+        try:
+            with span('query'):
+                query(conn, "SELECT 1")
+        except Exception:
+            release_connection(conn, discard=True)
+            raise
+        
+        release_connection(conn)
+        
+        return json_response(200, {
+            'status': 'ok',
+            'db_latency_ms': round((time.perf_counter() - start) * 1000, 2)
+        }, headers=NO_STORE_HEADERS)
+        
+    except Exception as e:
+        print(f"ERROR in ping: {str(e)}")
+        return json_response(503, {
+            'status': 'unavailable',
+            'error': str(e)
+        }, headers=NO_STORE_HEADERS)
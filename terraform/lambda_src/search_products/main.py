@@ -0,0 +1,194 @@
+import os
+import re
+from db_pool import get_read_connection, release_connection, log_pool_stats
+from compression import compress_response
+from data_access import query, warm_up
+from etag import VERSION_QUERY, get_catalog_version, make_etag, is_not_modified, not_modified
+from responses import READ_HEADERS, json_response, error_response, server_error
+from tracing import traced, span
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+MAX_TERMS = 8
+# La última palabra se busca como prefijo a partir de esta longitud: un
+# prefijo de una o dos letras recorre casi todo el índice GIN
+MIN_PREFIX_LENGTH = 3
+
+# Filas candidatas que se puntúan como máximo. Una búsqueda muy general
+# ("vitamina") encaja con cientos de miles de filas y ordenarlas todas por
+# relevancia cuesta cientos de ms; se puntúa una muestra acotada: primero
+# las que coinciden en el nombre (pesos A y B del search_vector) y sólo si
+# no llegan al límite las que coinciden únicamente en la categoría (C). Entre
+# candidatas del mismo tipo la muestra es arbitraria, así que por encima del
+# límite el orden es aproximado (``approximate`` en la respuesta).
+MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', '1000'))
+
+# Segunda pasada con pg_trgm para erratas cuando el texto completo no llena la página
+FUZZY_ENABLED = os.environ.get('SEARCH_FUZZY', 'true').lower() in ('true', '1', 'yes')
+
+RESULT_FIELDS = ('id', 'name', 'category', 'price', 'stock')
+
+# Texto completo en español e inglés. Parámetros: la búsqueda, la misma
+# restringida al nombre (``:AB``), el límite de candidatas y el de resultados.
+# La última columna es el número de candidatas puntuadas.
+FULLTEXT_QUERY = """
+    WITH query AS (
+        SELECT to_tsquery('spanish', %s) || to_tsquery('english', %s) AS ts,
+               to_tsquery('spanish', %s) || to_tsquery('english', %s) AS name_ts
+    ), name_matches AS (
+        SELECT p.id, p.name, p.category, p.price, p.stock, p.search_vector
+        FROM productos p, query
+        WHERE p.search_vector @@ query.name_ts
+        LIMIT %s
+    ), candidates AS (
+        SELECT * FROM name_matches
+        UNION ALL
+        (SELECT p.id, p.name, p.category, p.price, p.stock, p.search_vector
+         FROM productos p, query
+         WHERE p.search_vector @@ query.ts AND NOT p.search_vector @@ query.name_ts
+         LIMIT GREATEST(%s - (SELECT COUNT(*) FROM name_matches), 0))
+    )
+    SELECT c.id, c.name, c.category, c.price, c.stock,
+           ts_rank_cd(c.search_vector, query.ts) AS rank,
+           (SELECT COUNT(*) FROM candidates) AS candidates
+    FROM candidates c, query
+    ORDER BY rank DESC, c.id
+    LIMIT %s
+"""
+
+# Similitud de trigramas por palabra (operador <% de pg_trgm, indexado con GIN)
+FUZZY_QUERY = """
+    SELECT id, name, category, price, stock, word_similarity(%s, name) AS rank
+    FROM productos
+    WHERE %s <%% name AND NOT (id = ANY(CAST(%s AS INTEGER[])))
+    ORDER BY rank DESC, id
+    LIMIT %s
+"""
+
+def parse_terms(raw):
+    """
+    Normaliza la búsqueda a palabras alfanuméricas. Sólo letras, dígitos y _
+    llegan a to_tsquery, así que el usuario no puede inyectar su sintaxis.
+    """
+    text = (raw or '').strip()
+    if not text:
+        raise ValueError('q es obligatorio')
+    if len(text) > MAX_QUERY_LENGTH:
+        raise ValueError(f'q no puede superar {MAX_QUERY_LENGTH} caracteres')
+
+    terms = re.findall(r'\w+', text.lower())[:MAX_TERMS]
+    if not terms:
+        raise ValueError('q debe contener letras o números')
+    return text, terms
+
+def build_tsquery(terms, prefix=False, weights=''):
+    """
+    Todas las palabras completas o, con ``prefix``, la última como prefijo
+    porque es la que se está escribiendo (vitam -> vitamina, vitaminas...).
+    ``weights`` restringe cada palabra a esas partes del search_vector
+    ('AB': el nombre).
+    """
+    suffixes = [weights] * (len(terms) - 1) + [('*' if prefix else '') + weights]
+    return ' & '.join(f'{term}:{suffix}' if suffix else term for term, suffix in zip(terms, suffixes))
+
+def fulltext_search(conn, terms, limit, prefix=False):
+    """Resultados por texto completo y si se ha llegado al límite de candidatas"""
+    tsquery = build_tsquery(terms, prefix)
+    name_tsquery = build_tsquery(terms, prefix, weights='AB')
+    rows = query(conn, FULLTEXT_QUERY,
+                 (tsquery, tsquery, name_tsquery, name_tsquery, MAX_CANDIDATES, MAX_CANDIDATES, limit))
+    approximate = bool(rows) and rows[0][6] >= MAX_CANDIDATES
+    return [to_result(row, 'fulltext') for row in rows], approximate
+
+def parse_limit(raw):
+    """Número de resultados acotado a MAX_LIMIT"""
+    if raw is None:
+        return DEFAULT_LIMIT
+    limit = int(raw)
+    if limit <= 0:
+        raise ValueError('limit debe ser mayor que 0')
+    return min(limit, MAX_LIMIT)
+
+def to_result(row, match):
+    result = dict(zip(RESULT_FIELDS, row[:5]))
+    result['price'] = float(result['price'])
+    result['rank'] = round(float(row[5]), 4)
+    result['match'] = match
+    return result
+
+# Fase init: conexión y sentencias preparadas antes de la primera invocación (DB_CONNECT_ON_INIT)
+warm_up('searchProducts', VERSION_QUERY, FULLTEXT_QUERY, *([FUZZY_QUERY] if FUZZY_ENABLED else []),
+        read_only=True)
+
+@traced('searchProducts')
+def lambda_handler(event, context):
+    """
+    Lambda function: searchProducts
+    Búsqueda de productos por nombre y categoría, ordenada por relevancia.
+
+    Query parameters:
+      - q: texto a buscar (obligatorio). La última palabra se busca como prefijo.
+      - limit: máximo de resultados (por defecto 10, máximo 50)
+
+    Primero se busca por texto completo (tsvector + GIN). Si no se llena el
+    límite, se completa con coincidencias aproximadas por trigramas (erratas).
+    Se puntúan como mucho SEARCH_MAX_CANDIDATES filas, las que coinciden en el
+    nombre primero; si hay más, el orden es aproximado y la respuesta lleva
+    ``approximate: true``.
+    Con If-None-Match y el catálogo sin cambios se devuelve 304 sin buscar.
+    """
+    try:
+        params = event.get('queryStringParameters') or {}
+
+        try:
+            text, terms = parse_terms(params.get('q'))
+            limit = parse_limit(params.get('limit'))
+        except ValueError as validation_error:
+            return error_response(400, f'Parámetros inválidos: {str(validation_error)}')
+
+        # Sólo lectura: réplica si la hay
+        conn = get_read_connection()
+
+        version = get_catalog_version(conn)
+        etag = make_etag(version, 'search', text, limit, FUZZY_ENABLED) if version is not None else None
+        if is_not_modified(event, etag):
+            release_connection(conn)
+            log_pool_stats('searchProducts')
+            return not_modified(etag, READ_HEADERS)
+
+        try:
+            # Palabras exactas primero: un prefijo sobre un término muy común
+            # recorre toda su lista en el GIN y es un orden de magnitud más lento
+            with span('query'):
+                results, approximate = fulltext_search(conn, terms, limit)
+
+                if len(results) < limit and len(terms[-1]) >= MIN_PREFIX_LENGTH:
+                    results, approximate = fulltext_search(conn, terms, limit, prefix=True)
+
+                if FUZZY_ENABLED and len(results) < limit:
+                    found = [r['id'] for r in results]
+                    rows = query(conn, FUZZY_QUERY, (text, text, found, limit - len(results)))
+                    results.extend(to_result(row, 'fuzzy') for row in rows)
+        except Exception:
+            release_connection(conn, discard=True)
+            raise
+
+        release_connection(conn)
+        log_pool_stats('searchProducts')
+
+        with span('serialize'):
+            response = json_response(200, {
+                'query': text,
+                'results': results,
+                'count': len(results),
+                'approximate': approximate
+            }, headers=READ_HEADERS)
+
+        if etag:
+            response['headers'].update({'ETag': etag, 'Cache-Control': 'no-cache'})
+
+        return compress_response(event, response)
+
+    except Exception as e:
+        return server_error('searchProducts', e)
@@ -243,6 +243,29 @@ resource "aws_db_instance" "main_database" {
   }
 }
 
+# Réplica de lectura: getProducts, getItem (GET), searchProducts y getStats
+# leen de ella; las escrituras y las compras van siempre a main_database
+resource "aws_db_instance" "read_replica" {
+  count                   = var.db_read_replica ? 1 : 0
+  identifier              = "${var.project_name}-newdb-456-replica"
+  replicate_source_db     = aws_db_instance.main_database.identifier
+  instance_class          = var.db_replica_instance_class
+  storage_type            = "gp2"
+  publicly_accessible     = true
+  vpc_security_group_ids  = [aws_security_group.rds_sg.id]
+  skip_final_snapshot     = true
+  backup_retention_period = 0
+
+  tags = {
+    Name    = "${var.project_name}-read-replica"
+    Project = var.project_name
+  }
+}
+
+locals {
+  db_read_host = var.db_read_replica ? aws_db_instance.read_replica[0].address : ""
+}
+
 # --- AWS: IAM Rol y Política para las Lambdas ---
 resource "aws_iam_role" "lambda_exec_role" {
   name = "${var.project_name}-lambda-execution-role"
@@ -278,6 +301,41 @@ resource "aws_iam_role_policy_attachment" "lambda_vpc_execution" {
 
 # --- AWS: Empaquetado y creación de las Funciones Lambda ---
 
+# Lambda Layer: código compartido (conexiones, acceso a datos, respuestas...)
+# y sus dependencias (pg8000, Brotli). Las funciones sólo empaquetan su
+# main.py: las dependencias se instalan una vez, en la capa, con ruedas
+# para el runtime de Lambda (Linux x86_64, CPython 3.11), recortadas y con
+# el bytecode ya compilado (ver scripts/build_lambda_layer.py).
+resource "null_resource" "common_layer_build" {
+  triggers = {
+    requirements = filesha1("${path.module}/lambda_src/common/requirements.txt")
+    build_script = filesha1("${path.module}/../scripts/build_lambda_layer.py")
+    sources = sha1(join("", [
+      for f in sort(fileset("${path.module}/lambda_src/common/python", "*.py")) :
+      filesha1("${path.module}/lambda_src/common/python/${f}")
+    ]))
+  }
+
+  provisioner "local-exec" {
+    command = "python ${path.module}/../scripts/build_lambda_layer.py --output ${path.module}/build/common_layer"
+  }
+}
+
+data "archive_file" "common_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/build/common_layer"
+  output_path = "${path.module}/common_layer.zip"
+
+  depends_on = [null_resource.common_layer_build]
+}
+
+resource "aws_lambda_layer_version" "common" {
+  filename            = data.archive_file.common_layer.output_path
+  layer_name          = "${var.project_name}-common"
+  source_code_hash    = data.archive_file.common_layer.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
 # Lambda: GetProducts
 data "archive_file" "get_products" {
   type        = "zip"
@@ -292,6 +350,7 @@ resource "aws_lambda_function" "get_products" {
   handler         = "main.lambda_handler"
   source_code_hash = data.archive_file.get_products.output_base64sha256
   runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
   timeout         = var.lambda_timeout
   memory_size     = var.lambda_memory_size
 
@@ -306,6 +365,13 @@ resource "aws_lambda_function" "get_products" {
       DB_USER     = var.db_username
       DB_PASSWORD = var.db_password
       DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+
+      # Lecturas del catálogo a la réplica (vacío: a la primaria)
+      DB_READ_HOST       = local.db_read_host
+      DB_REPLICA_MAX_LAG = var.db_replica_max_lag
     }
   }
 
@@ -329,6 +395,7 @@ resource "aws_lambda_function" "get_item" {
   handler         = "main.lambda_handler"
   source_code_hash = data.archive_file.get_item.output_base64sha256
   runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
   timeout         = var.lambda_timeout
   memory_size     = var.lambda_memory_size
 
@@ -343,6 +410,13 @@ resource "aws_lambda_function" "get_item" {
       DB_USER     = var.db_username
       DB_PASSWORD = var.db_password
       DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+
+      # Lecturas del catálogo a la réplica (vacío: a la primaria)
+      DB_READ_HOST       = local.db_read_host
+      DB_REPLICA_MAX_LAG = var.db_replica_max_lag
     }
   }
 
@@ -366,6 +440,7 @@ resource "aws_lambda_function" "add_product" {
   handler         = "main.lambda_handler"
   source_code_hash = data.archive_file.add_product.output_base64sha256
   runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
   timeout         = var.lambda_timeout
   memory_size     = var.lambda_memory_size
 
@@ -380,6 +455,9 @@ resource "aws_lambda_function" "add_product" {
       DB_USER     = var.db_username
       DB_PASSWORD = var.db_password
       DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
     }
   }
 
@@ -389,11 +467,216 @@ resource "aws_lambda_function" "add_product" {
   }
 }
 
+# Lambda: Checkout (pedido de varias líneas en una transacción)
+data "archive_file" "checkout" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_src/checkout"
+  output_path = "${path.module}/checkout.zip"
+}
+
+resource "aws_lambda_function" "checkout" {
+  filename         = data.archive_file.checkout.output_path
+  function_name    = "${var.project_name}-checkout"
+  role            = aws_iam_role.lambda_exec_role.arn
+  handler         = "main.lambda_handler"
+  source_code_hash = data.archive_file.checkout.output_base64sha256
+  runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
+  timeout         = var.lambda_timeout
+  memory_size     = var.lambda_memory_size
+
+  vpc_config {
+    subnet_ids         = [aws_subnet.private_1.id, aws_subnet.private_2.id]
+    security_group_ids = [aws_security_group.lambda_sg.id]
+  }
+
+  environment {
+    variables = {
+      DB_HOST     = aws_db_instance.main_database.address
+      DB_USER     = var.db_username
+      DB_PASSWORD = var.db_password
+      DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+    }
+  }
+
+  tags = {
+    Name    = "${var.project_name}-checkout"
+    Project = var.project_name
+  }
+}
+
+# Lambda: SearchProducts (búsqueda de texto completo + trigramas)
+data "archive_file" "search_products" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_src/search_products"
+  output_path = "${path.module}/search_products.zip"
+}
+
+resource "aws_lambda_function" "search_products" {
+  filename         = data.archive_file.search_products.output_path
+  function_name    = "${var.project_name}-searchProducts"
+  role            = aws_iam_role.lambda_exec_role.arn
+  handler         = "main.lambda_handler"
+  source_code_hash = data.archive_file.search_products.output_base64sha256
+  runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
+  timeout         = var.lambda_timeout
+  memory_size     = var.lambda_memory_size
+
+  vpc_config {
+    subnet_ids         = [aws_subnet.private_1.id, aws_subnet.private_2.id]
+    security_group_ids = [aws_security_group.lambda_sg.id]
+  }
+
+  environment {
+    variables = {
+      DB_HOST     = aws_db_instance.main_database.address
+      DB_USER     = var.db_username
+      DB_PASSWORD = var.db_password
+      DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+
+      # Lecturas del catálogo a la réplica (vacío: a la primaria)
+      DB_READ_HOST       = local.db_read_host
+      DB_REPLICA_MAX_LAG = var.db_replica_max_lag
+    }
+  }
+
+  tags = {
+    Name    = "${var.project_name}-searchProducts"
+    Project = var.project_name
+  }
+}
+
+# Lambda: Ping (health check ligero del backend)
+data "archive_file" "ping" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_src/ping"
+  output_path = "${path.module}/ping.zip"
+}
+
+resource "aws_lambda_function" "ping" {
+  filename         = data.archive_file.ping.output_path
+  function_name    = "${var.project_name}-ping"
+  role            = aws_iam_role.lambda_exec_role.arn
+  handler         = "main.lambda_handler"
+  source_code_hash = data.archive_file.ping.output_base64sha256
+  runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
+  timeout         = 10
+  memory_size     = var.lambda_memory_size
+
+  vpc_config {
+    subnet_ids         = [aws_subnet.private_1.id, aws_subnet.private_2.id]
+    security_group_ids = [aws_security_group.lambda_sg.id]
+  }
+
+  environment {
+    variables = {
+      DB_HOST     = aws_db_instance.main_database.address
+      DB_USER     = var.db_username
+      DB_PASSWORD = var.db_password
+      DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+    }
+  }
+
+  tags = {
+    Name    = "${var.project_name}-ping"
+    Project = var.project_name
+  }
+}
+
+# Lambda: GetStats (agregados del catálogo desde vistas materializadas)
+data "archive_file" "get_stats" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda_src/get_stats"
+  output_path = "${path.module}/get_stats.zip"
+}
+
+resource "aws_lambda_function" "get_stats" {
+  filename         = data.archive_file.get_stats.output_path
+  function_name    = "${var.project_name}-getStats"
+  role            = aws_iam_role.lambda_exec_role.arn
+  handler         = "main.lambda_handler"
+  source_code_hash = data.archive_file.get_stats.output_base64sha256
+  runtime         = "python3.11"
+  layers          = [aws_lambda_layer_version.common.arn]
+  timeout         = var.lambda_timeout
+  memory_size     = var.lambda_memory_size
+
+  vpc_config {
+    subnet_ids         = [aws_subnet.private_1.id, aws_subnet.private_2.id]
+    security_group_ids = [aws_security_group.lambda_sg.id]
+  }
+
+  environment {
+    variables = {
+      DB_HOST     = aws_db_instance.main_database.address
+      DB_USER     = var.db_username
+      DB_PASSWORD = var.db_password
+      DB_NAME     = aws_db_instance.main_database.db_name
+
+      DB_HEALTH_CHECK_INTERVAL = var.db_health_check_interval
+      DB_CONNECT_ON_INIT       = var.lambda_connect_on_init
+
+      # Lecturas del catálogo a la réplica (vacío: a la primaria)
+      DB_READ_HOST       = local.db_read_host
+      DB_REPLICA_MAX_LAG = var.db_replica_max_lag
+    }
+  }
+
+  tags = {
+    Name    = "${var.project_name}-getStats"
+    Project = var.project_name
+  }
+}
+
+# Refresco programado de las vistas materializadas: la misma Lambda recibe el
+# evento y sólo recalcula si el catálogo cambió desde el refresco anterior
+resource "aws_cloudwatch_event_rule" "stats_refresh" {
+  name                = "${var.project_name}-stats-refresh"
+  description         = "Refresca productos_category_stats y productos_low_stock"
+  schedule_expression = var.stats_refresh_schedule
+
+  tags = {
+    Name    = "${var.project_name}-stats-refresh"
+    Project = var.project_name
+  }
+}
+
+resource "aws_cloudwatch_event_target" "stats_refresh" {
+  rule = aws_cloudwatch_event_rule.stats_refresh.name
+  arn  = aws_lambda_function.get_stats.arn
+}
+
+resource "aws_lambda_permission" "events_invoke_get_stats" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_stats.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.stats_refresh.arn
+}
+
 # --- AWS: API Gateway ---
 resource "aws_api_gateway_rest_api" "api" {
   name        = "${var.project_name}-ecommerce-api"
   description = "API Gateway para el e-commerce DP-3"
 
+  # Las Lambdas devuelven gzip/brotli en base64 (isBase64Encoded); con */* API
+  # Gateway lo entrega como binario. Los bodies de entrada llegan también en
+  # base64 y se leen con compression.request_body. Las integraciones MOCK
+  # (OPTIONS de CORS) necesitan content_handling = "CONVERT_TO_TEXT": si no,
+  # su request_template no se aplica al body binario y el preflight falla.
+  binary_media_types = ["*/*"]
+
   endpoint_configuration {
     types = ["REGIONAL"]
   }
@@ -450,6 +733,29 @@ resource "aws_api_gateway_integration" "add_post_lambda" {
   uri                     = aws_lambda_function.add_product.invoke_arn
 }
 
+# Recurso /add/bulk (carga masiva CSV / JSON Lines, misma Lambda AddProduct)
+resource "aws_api_gateway_resource" "add_bulk" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_resource.add.id
+  path_part   = "bulk"
+}
+
+resource "aws_api_gateway_method" "add_bulk_post" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.add_bulk.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "add_bulk_post_lambda" {
+  rest_api_id             = aws_api_gateway_rest_api.api.id
+  resource_id             = aws_api_gateway_resource.add_bulk.id
+  http_method             = aws_api_gateway_method.add_bulk_post.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.add_product.invoke_arn
+}
+
 # Recurso /item
 resource "aws_api_gateway_resource" "item" {
   rest_api_id = aws_api_gateway_rest_api.api.id
@@ -489,6 +795,98 @@ resource "aws_api_gateway_integration" "item_post_lambda" {
   uri                     = aws_lambda_function.get_item.invoke_arn
 }
 
+# Recurso /checkout
+resource "aws_api_gateway_resource" "checkout" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "checkout"
+}
+
+resource "aws_api_gateway_method" "checkout_post" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.checkout.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "checkout_post_lambda" {
+  rest_api_id             = aws_api_gateway_rest_api.api.id
+  resource_id             = aws_api_gateway_resource.checkout.id
+  http_method             = aws_api_gateway_method.checkout_post.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.checkout.invoke_arn
+}
+
+# Recurso /search
+resource "aws_api_gateway_resource" "search" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "search"
+}
+
+resource "aws_api_gateway_method" "search_get" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.search.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "search_get_lambda" {
+  rest_api_id             = aws_api_gateway_rest_api.api.id
+  resource_id             = aws_api_gateway_resource.search.id
+  http_method             = aws_api_gateway_method.search_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.search_products.invoke_arn
+}
+
+# Recurso /ping
+resource "aws_api_gateway_resource" "ping" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "ping"
+}
+
+resource "aws_api_gateway_method" "ping_get" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.ping.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "ping_get_lambda" {
+  rest_api_id             = aws_api_gateway_rest_api.api.id
+  resource_id             = aws_api_gateway_resource.ping.id
+  http_method             = aws_api_gateway_method.ping_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.ping.invoke_arn
+}
+
+# Recurso /stats
+resource "aws_api_gateway_resource" "stats" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_rest_api.api.root_resource_id
+  path_part   = "stats"
+}
+
+resource "aws_api_gateway_method" "stats_get" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.stats.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "stats_get_lambda" {
+  rest_api_id             = aws_api_gateway_rest_api.api.id
+  resource_id             = aws_api_gateway_resource.stats.id
+  http_method             = aws_api_gateway_method.stats_get.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = aws_lambda_function.get_stats.invoke_arn
+}
+
 # Habilitación CORS para todos los recursos
 resource "aws_api_gateway_method" "products_options" {
   rest_api_id   = aws_api_gateway_rest_api.api.id
@@ -503,6 +901,9 @@ resource "aws_api_gateway_integration" "products_options" {
   http_method = aws_api_gateway_method.products_options.http_method
   type        = "MOCK"
 
+  # Con binary_media_types = */* la petición llega como binario
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = "{\"statusCode\": 200}"
   }
@@ -527,6 +928,8 @@ resource "aws_api_gateway_integration_response" "products_options" {
   http_method = aws_api_gateway_method.products_options.http_method
   status_code = aws_api_gateway_method_response.products_options.status_code
 
+  content_handling = "CONVERT_TO_TEXT"
+
   response_parameters = {
     "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS,POST'"
@@ -559,6 +962,38 @@ resource "aws_lambda_permission" "api_gateway_invoke_get_item" {
   source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
 }
 
+resource "aws_lambda_permission" "api_gateway_invoke_checkout" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.checkout.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_search_products" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.search_products.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_ping" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ping.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+}
+
+resource "aws_lambda_permission" "api_gateway_invoke_get_stats" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_stats.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+}
+
 # Deployment del API
 resource "aws_api_gateway_deployment" "api" {
   rest_api_id = aws_api_gateway_rest_api.api.id
@@ -566,8 +1001,13 @@ resource "aws_api_gateway_deployment" "api" {
   depends_on = [
     aws_api_gateway_integration.products_get_lambda,
     aws_api_gateway_integration.add_post_lambda,
+    aws_api_gateway_integration.add_bulk_post_lambda,
     aws_api_gateway_integration.item_get_lambda,
     aws_api_gateway_integration.item_post_lambda,
+    aws_api_gateway_integration.checkout_post_lambda,
+    aws_api_gateway_integration.search_get_lambda,
+    aws_api_gateway_integration.ping_get_lambda,
+    aws_api_gateway_integration.stats_get_lambda,
     aws_api_gateway_integration.products_options
   ]
 
@@ -579,11 +1019,29 @@ resource "aws_api_gateway_deployment" "api" {
       aws_api_gateway_resource.add.id,
       aws_api_gateway_method.add_post.id,
       aws_api_gateway_integration.add_post_lambda.id,
+      aws_api_gateway_resource.add_bulk.id,
+      aws_api_gateway_method.add_bulk_post.id,
+      aws_api_gateway_integration.add_bulk_post_lambda.id,
       aws_api_gateway_resource.item.id,
       aws_api_gateway_method.item_get.id,
       aws_api_gateway_method.item_post.id,
       aws_api_gateway_integration.item_get_lambda.id,
       aws_api_gateway_integration.item_post_lambda.id,
+      aws_api_gateway_resource.checkout.id,
+      aws_api_gateway_method.checkout_post.id,
+      aws_api_gateway_integration.checkout_post_lambda.id,
+      aws_api_gateway_resource.search.id,
+      aws_api_gateway_method.search_get.id,
+      aws_api_gateway_integration.search_get_lambda.id,
+      aws_api_gateway_resource.ping.id,
+      aws_api_gateway_method.ping_get.id,
+      aws_api_gateway_integration.ping_get_lambda.id,
+      aws_api_gateway_resource.stats.id,
+      aws_api_gateway_method.stats_get.id,
+      aws_api_gateway_integration.stats_get_lambda.id,
+      aws_api_gateway_rest_api.api.binary_media_types,
+      aws_api_gateway_integration.products_options.content_handling,
+      aws_api_gateway_integration_response.products_options.content_handling,
     ]))
   }
 
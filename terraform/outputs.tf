@@ -13,6 +13,11 @@ output "rds_public_endpoint" {
   value       = aws_db_instance.main_database.address
 }
 
+output "rds_read_replica_endpoint" {
+  description = "Endpoint de la réplica de lectura (vacío si db_read_replica = false)"
+  value       = local.db_read_host
+}
+
 output "rds_port" {
   description = "Puerto de la base de datos PostgreSQL"
   value       = aws_db_instance.main_database.port
@@ -33,6 +38,26 @@ output "lambda_add_product_arn" {
   value       = aws_lambda_function.add_product.arn
 }
 
+output "lambda_checkout_arn" {
+  description = "ARN de la función Lambda Checkout"
+  value       = aws_lambda_function.checkout.arn
+}
+
+output "lambda_search_products_arn" {
+  description = "ARN de la función Lambda SearchProducts"
+  value       = aws_lambda_function.search_products.arn
+}
+
+output "lambda_ping_arn" {
+  description = "ARN de la función Lambda Ping (health check del backend)"
+  value       = aws_lambda_function.ping.arn
+}
+
+output "lambda_get_stats_arn" {
+  description = "ARN de la función Lambda GetStats (agregados del catálogo)"
+  value       = aws_lambda_function.get_stats.arn
+}
+
 # GCP Outputs
 output "cloud_run_url" {
   description = "URL del servicio Cloud Run completo (aplicación principal)"
@@ -159,6 +159,42 @@ variable "lambda_memory_size" {
   default     = 128
 }
 
+variable "db_health_check_interval" {
+  description = "Segundos de inactividad tras los que las Lambdas verifican (SELECT 1) la conexión reutilizada"
+  type        = number
+  default     = 30
+}
+
+variable "lambda_connect_on_init" {
+  description = "Abrir la conexión a RDS y preparar las sentencias en la fase init de cada Lambda (antes de la primera invocación)"
+  type        = bool
+  default     = true
+}
+
+variable "db_read_replica" {
+  description = "Crear una réplica de lectura de RDS para las consultas del catálogo"
+  type        = bool
+  default     = false
+}
+
+variable "db_replica_instance_class" {
+  description = "Tipo de instancia de la réplica de lectura"
+  type        = string
+  default     = "db.t3.micro"
+}
+
+variable "db_replica_max_lag" {
+  description = "Segundos de retraso de la réplica a partir de los cuales las Lambdas leen de la primaria"
+  type        = number
+  default     = 5
+}
+
+variable "stats_refresh_schedule" {
+  description = "Frecuencia de refresco de las vistas materializadas de /stats (expresión de EventBridge)"
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
 # Tags comunes
 variable "common_tags" {
   description = "Tags comunes para todos los recursos"